@@ -0,0 +1,87 @@
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from .metrics import count_cancellation
+
+# Worker-wide totals for runs cancelled because their client went away
+_cancel_stats: Dict[str, Any] = {
+    "runs_cancelled": 0,
+    "searches_abandoned": 0,
+    "llm_calls_abandoned": 0,
+    "prompt_tokens_abandoned": 0,
+    "work_s_abandoned": 0.0,
+    "sections_saved": 0,
+    "completion_tokens_saved": 0,
+}
+
+# Per-run work ledger; set by the API layer around runs a client can
+# cancel, and shared (like payload tracking) by every task of the run
+_run_work: ContextVar[Optional[Dict[str, Any]]] = ContextVar("run_work", default=None)
+
+
+def start_work_tracking() -> Dict[str, Any]:
+    """
+    Start a work ledger for the current run (context-local): sections the
+    run started writing and calls that were still in flight when it was
+    cancelled.
+    """
+    work: Dict[str, Any] = {
+        "started": time.perf_counter(),
+        "sections": set(),
+        "searches": 0,
+        "llm_calls": 0,
+        "prompt_tokens": 0,
+    }
+    _run_work.set(work)
+    return work
+
+
+def note_section(key: str) -> None:
+    work = _run_work.get()
+    if work is not None:
+        work["sections"].add(key)
+
+
+def note_abandoned(kind: str, prompt_chars: int = 0) -> None:
+    """A search or LLM call of this run was cancelled while in flight."""
+    work = _run_work.get()
+    if work is None:
+        return
+    if kind == "tavily":
+        work["searches"] += 1
+    else:
+        work["llm_calls"] += 1
+        work["prompt_tokens"] += prompt_chars // 4
+
+
+def record_cancellation(endpoint: str, work: Dict[str, Any], unwritten: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Account for a run cancelled by its client. unwritten maps the planned
+    sections it never started to their completion token budgets.
+    """
+    report = {
+        "abandoned": {
+            "searches": work["searches"],
+            "llm_calls": work["llm_calls"],
+            "prompt_tokens": work["prompt_tokens"],
+            "work_s": round(time.perf_counter() - work["started"], 3),
+        },
+        "saved": {
+            "sections": len(unwritten),
+            "completion_tokens": sum(unwritten.values()),
+        },
+    }
+    _cancel_stats["runs_cancelled"] += 1
+    _cancel_stats["searches_abandoned"] += work["searches"]
+    _cancel_stats["llm_calls_abandoned"] += work["llm_calls"]
+    _cancel_stats["prompt_tokens_abandoned"] += work["prompt_tokens"]
+    _cancel_stats["work_s_abandoned"] += report["abandoned"]["work_s"]
+    _cancel_stats["sections_saved"] += len(unwritten)
+    _cancel_stats["completion_tokens_saved"] += sum(unwritten.values())
+    count_cancellation(endpoint, report["abandoned"], report["saved"])
+    return report
+
+
+def cancellation_stats() -> Dict[str, Any]:
+    return {**_cancel_stats, "work_s_abandoned": round(_cancel_stats["work_s_abandoned"], 3)}
@@ -0,0 +1,541 @@
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from .evidence_store import get_store, peek_store
+
+load_dotenv()
+
+CHECKPOINTS_ENABLED = os.getenv("CHECKPOINTS_ENABLED", "true").lower() in ("1", "true", "yes")
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", ".cache/checkpoints.sqlite3")
+# Unfinished runs older than this can no longer be resumed
+CHECKPOINT_RETENTION_S = float(os.getenv("CHECKPOINT_RETENTION_S", str(24 * 3600)))
+CHECKPOINT_GC_INTERVAL_S = float(os.getenv("CHECKPOINT_GC_INTERVAL_S", "600"))
+# A run's claim on its thread, renewed by every checkpoint it writes; a
+# crashed worker's claim lapses after this long
+CHECKPOINT_RUN_LEASE_S = float(os.getenv("CHECKPOINT_RUN_LEASE_S", "600"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_id TEXT,
+    checkpoint_type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_created ON checkpoints (created_at);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    value_type TEXT NOT NULL,
+    value BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    value_type TEXT NOT NULL,
+    value BLOB,
+    task_path TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS evidence (
+    thread_id TEXT NOT NULL,
+    evidence_id INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    url TEXT,
+    snippet TEXT NOT NULL,
+    as_of TEXT,
+    topic TEXT,
+    score REAL,
+    PRIMARY KEY (thread_id, evidence_id)
+);
+CREATE TABLE IF NOT EXISTS run_leases (
+    thread_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+# Types the checkpoint may contain besides builtins
+_STATE_TYPES = [
+    ("app.state", "ResearchState"),
+    ("app.state", "EvidenceItem"),
+    ("app.state", "SectionDraft"),
+    ("app.state", "DiscrepancyFlag"),
+]
+
+
+class SqliteCheckpointer(BaseCheckpointSaver[str]):
+    """
+    LangGraph checkpointer backed by a local SQLite file.
+
+    Threads are graph runs (thread_id = run id). Besides the usual
+    checkpoints / channel blobs / pending writes, each thread keeps the
+    rows of its EvidenceStore, because state only holds evidence ids; a
+    resumed run (even in a fresh process) gets its store back before the
+    first node executes. Threads untouched for CHECKPOINT_RETENTION_S are
+    garbage-collected.
+
+    The file is shared by every worker on the host, so a run claims its
+    thread (claim_run) before reading or resuming it; a second worker
+    with the same run id must not resume, or delete, a live thread.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_PATH, retention_s: float = CHECKPOINT_RETENTION_S):
+        super().__init__(serde=JsonPlusSerializer(allowed_msgpack_modules=_STATE_TYPES))
+        self.path = path
+        self.retention_s = retention_s
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._evidence_saved: Dict[str, int] = {}
+        self._last_gc = 0.0
+        self.stats: Dict[str, int] = {
+            "checkpoints": 0,
+            "writes": 0,
+            "evidence_rows": 0,
+            "restored_runs": 0,
+            "threads_collected": 0,
+            "runs_claimed": 0,
+            "claims_refused": 0,
+        }
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    # ------------- Evidence rows -------------
+
+    def _new_evidence(self, thread_id: str) -> List[Tuple]:
+        # Runs on the event loop thread, where nodes mutate the store
+        store = peek_store(thread_id)
+        if store is None:
+            return []
+        rows = store.rows(self._evidence_saved.get(thread_id, 0))
+        if rows:
+            self._evidence_saved[thread_id] = len(store)
+        return rows
+
+    def _save_evidence_locked(self, conn: sqlite3.Connection, thread_id: str, rows: List[Tuple]) -> None:
+        if not rows:
+            return
+        conn.executemany(
+            "INSERT OR IGNORE INTO evidence "
+            "(thread_id, evidence_id, source, url, snippet, as_of, topic, score) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(thread_id, *row) for row in rows],
+        )
+        self.stats["evidence_rows"] += len(rows)
+
+    def _restore_evidence(self, thread_id: str, rows: Optional[List[Tuple]]) -> None:
+        if not rows or peek_store(thread_id) is not None:
+            return
+        store = get_store(thread_id)
+        for _, source, url, snippet, as_of, topic, score in rows:
+            store.add(source, snippet, url, as_of, topic, score)
+        self._evidence_saved[thread_id] = len(store)
+        self.stats["restored_runs"] += 1
+
+    # ------------- Reads -------------
+
+    def _to_tuple(self, conn: sqlite3.Connection, thread_id: str, ns: str, row: Tuple) -> CheckpointTuple:
+        checkpoint_id, parent_id, c_type, c_blob, m_type, m_blob = row
+        checkpoint: Checkpoint = self.serde.loads_typed((c_type, c_blob))
+
+        channel_values: Dict[str, Any] = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            blob = conn.execute(
+                "SELECT value_type, value FROM blobs "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, ns, channel, str(version)),
+            ).fetchone()
+            if blob is not None and blob[0] != "empty":
+                channel_values[channel] = self.serde.loads_typed(blob)
+
+        writes = conn.execute(
+            "SELECT task_id, idx, channel, value_type, value, task_path FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, ns, checkpoint_id),
+        ).fetchall()
+        writes.sort(key=lambda w: writes_sort_key(w[5], w[0], w[1]))
+
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint_id}},
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=self.serde.loads_typed((m_type, m_blob)),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": parent_id}}
+                if parent_id
+                else None
+            ),
+            pending_writes=[(w[0], w[2], self.serde.loads_typed((w[3], w[4]))) for w in writes],
+        )
+
+    def _load_tuple(self, config: RunnableConfig) -> Tuple[Optional[CheckpointTuple], Optional[List[Tuple]]]:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        query = (
+            "SELECT checkpoint_id, parent_id, checkpoint_type, checkpoint, metadata_type, metadata "
+            "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+        )
+        with self._lock:
+            conn = self._get_conn()
+            if checkpoint_id:
+                row = conn.execute(query + "AND checkpoint_id = ?", (thread_id, ns, checkpoint_id)).fetchone()
+            else:
+                row = conn.execute(query + "ORDER BY checkpoint_id DESC LIMIT 1", (thread_id, ns)).fetchone()
+            if row is None:
+                return None, None
+
+            evidence = None
+            if peek_store(thread_id) is None:
+                evidence = conn.execute(
+                    "SELECT evidence_id, source, url, snippet, as_of, topic, score FROM evidence "
+                    "WHERE thread_id = ? ORDER BY evidence_id",
+                    (thread_id,),
+                ).fetchall()
+            return self._to_tuple(conn, thread_id, ns, row), evidence
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        tup, evidence = self._load_tuple(config)
+        self._restore_evidence(config["configurable"]["thread_id"], evidence)
+        return tup
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        tup, evidence = await asyncio.to_thread(self._load_tuple, config)
+        self._restore_evidence(config["configurable"]["thread_id"], evidence)
+        return tup
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if config is not None:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            ns = config["configurable"].get("checkpoint_ns")
+            if ns is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        with self._lock:
+            conn = self._get_conn()
+            rows = conn.execute(
+                "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, checkpoint_type, "
+                f"checkpoint, metadata_type, metadata FROM checkpoints {where}"
+                "ORDER BY checkpoint_id DESC",
+                params,
+            ).fetchall()
+            tuples: List[CheckpointTuple] = []
+            for thread_id, ns, *row in rows:
+                if limit is not None and len(tuples) >= limit:
+                    break
+                if filter:
+                    metadata = self.serde.loads_typed((row[4], row[5]))
+                    if not all(metadata.get(k) == v for k, v in filter.items()):
+                        continue
+                tuples.append(self._to_tuple(conn, thread_id, ns, tuple(row)))
+        yield from tuples
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        tuples = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for tup in tuples:
+            yield tup
+
+    # ------------- Writes -------------
+
+    def _put_locked(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+        evidence: List[Tuple],
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        values: Dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+
+        blobs = [
+            (thread_id, ns, channel, str(version), *(
+                self.serde.dumps_typed(values[channel]) if channel in values else ("empty", None)
+            ))
+            for channel, version in new_versions.items()
+        ]
+        c_type, c_blob = self.serde.dumps_typed(c)
+        m_type, m_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self._lock:
+            conn = self._get_conn()
+            self._save_evidence_locked(conn, thread_id, evidence)
+            conn.executemany(
+                "INSERT OR REPLACE INTO blobs (thread_id, checkpoint_ns, channel, version, value_type, value) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                blobs,
+            )
+            self._renew_locked(conn, thread_id)
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_id, "
+                "checkpoint_type, checkpoint, metadata_type, metadata, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id, ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                    c_type, c_blob, m_type, m_blob, time.time(),
+                ),
+            )
+            conn.commit()
+            self.stats["checkpoints"] += 1
+
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        evidence = self._new_evidence(config["configurable"]["thread_id"])
+        result = self._put_locked(config, checkpoint, metadata, new_versions, evidence)
+        self._maybe_collect()
+        return result
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        evidence = self._new_evidence(config["configurable"]["thread_id"])
+        result = await asyncio.to_thread(self._put_locked, config, checkpoint, metadata, new_versions, evidence)
+        if time.monotonic() - self._last_gc > CHECKPOINT_GC_INTERVAL_S:
+            await asyncio.to_thread(self._maybe_collect)
+        return result
+
+    def _put_writes_locked(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str,
+        evidence: List[Tuple],
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            rows.append(
+                (thread_id, ns, checkpoint_id, task_id, write_idx, channel, *self.serde.dumps_typed(value), task_path)
+            )
+        # Special writes (errors, interrupts) may be overwritten; regular ones are write-once
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+
+        with self._lock:
+            conn = self._get_conn()
+            # Evidence first: these writes reference the new rows by id
+            self._save_evidence_locked(conn, thread_id, evidence)
+            self._renew_locked(conn, thread_id)
+            conn.executemany(
+                f"{verb} INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, "
+                "value_type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+            self.stats["writes"] += len(rows)
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        evidence = self._new_evidence(config["configurable"]["thread_id"])
+        self._put_writes_locked(config, writes, task_id, task_path, evidence)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        evidence = self._new_evidence(config["configurable"]["thread_id"])
+        await asyncio.to_thread(self._put_writes_locked, config, writes, task_id, task_path, evidence)
+
+    # ------------- Run leases -------------
+
+    def claim_run(self, thread_id: str, owner: str, lease_s: float = CHECKPOINT_RUN_LEASE_S) -> bool:
+        """
+        Claim a thread for one run. False while another owner holds an
+        unexpired claim on it; the same owner may claim again.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute(
+                "DELETE FROM run_leases WHERE thread_id = ? AND (expires_at <= ? OR owner = ?)",
+                (thread_id, now, owner),
+            )
+            claimed = conn.execute(
+                "INSERT OR IGNORE INTO run_leases (thread_id, owner, expires_at) VALUES (?, ?, ?)",
+                (thread_id, owner, now + lease_s),
+            ).rowcount == 1
+            conn.commit()
+        self.stats["runs_claimed" if claimed else "claims_refused"] += 1
+        return claimed
+
+    async def aclaim_run(self, thread_id: str, owner: str, lease_s: float = CHECKPOINT_RUN_LEASE_S) -> bool:
+        return await asyncio.to_thread(self.claim_run, thread_id, owner, lease_s)
+
+    def release_run(self, thread_id: str, owner: str) -> None:
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute("DELETE FROM run_leases WHERE thread_id = ? AND owner = ?", (thread_id, owner))
+            conn.commit()
+
+    async def arelease_run(self, thread_id: str, owner: str) -> None:
+        await asyncio.to_thread(self.release_run, thread_id, owner)
+
+    def _renew_locked(self, conn: sqlite3.Connection, thread_id: str) -> None:
+        # Only the claiming run writes checkpoints for a thread
+        conn.execute(
+            "UPDATE run_leases SET expires_at = ? WHERE thread_id = ?",
+            (time.time() + CHECKPOINT_RUN_LEASE_S, thread_id),
+        )
+
+    # ------------- Cleanup -------------
+
+    def _delete_locked(self, conn: sqlite3.Connection, thread_ids: List[str]) -> None:
+        params = [(t,) for t in thread_ids]
+        for table in ("checkpoints", "blobs", "writes", "evidence"):
+            conn.executemany(f"DELETE FROM {table} WHERE thread_id = ?", params)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            conn = self._get_conn()
+            self._delete_locked(conn, [thread_id])
+            conn.commit()
+        self._evidence_saved.pop(thread_id, None)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def collect_garbage(self) -> int:
+        """
+        Drop every thread whose newest checkpoint is past the retention
+        period. Returns how many threads were removed.
+        """
+        cutoff = time.time() - self.retention_s
+        with self._lock:
+            conn = self._get_conn()
+            stale = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?",
+                    (cutoff,),
+                )
+            ]
+            if stale:
+                self._delete_locked(conn, stale)
+            conn.execute("DELETE FROM run_leases WHERE expires_at <= ?", (time.time(),))
+            conn.commit()
+            self._last_gc = time.monotonic()
+        for thread_id in stale:
+            self._evidence_saved.pop(thread_id, None)
+        self.stats["threads_collected"] += len(stale)
+        if stale:
+            print(f"[Checkpoints] Collected {len(stale)} expired runs.")
+        return len(stale)
+
+    def _maybe_collect(self) -> None:
+        if time.monotonic() - self._last_gc > CHECKPOINT_GC_INTERVAL_S:
+            self.collect_garbage()
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Same scheme as the in-memory saver: zero-padded counter + random tail
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def snapshot(self) -> Dict[str, Any]:
+        snap: Dict[str, Any] = {**self.stats, "retention_s": self.retention_s}
+        try:
+            with self._lock:
+                snap["threads"] = self._get_conn().execute(
+                    "SELECT COUNT(DISTINCT thread_id) FROM checkpoints"
+                ).fetchone()[0]
+        except sqlite3.Error:
+            pass
+        return snap
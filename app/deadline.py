@@ -0,0 +1,89 @@
+import asyncio
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, List, Optional, Tuple, TypeVar
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Default latency budget for a research request in seconds (0 = none);
+# callers can pass their own (ResearchRequest.deadline_s)
+RESEARCH_DEADLINE_S = float(os.getenv("RESEARCH_DEADLINE_S", "0"))
+# Kept back from every call for curation, QA and building the response
+DEADLINE_RESERVE_S = float(os.getenv("DEADLINE_RESERVE_S", "0.25"))
+# Share of the budget (after the reserve) searches may use; the rest is
+# left for writing sections, so one slow search can't starve them
+DEADLINE_SEARCH_SHARE = float(os.getenv("DEADLINE_SEARCH_SHARE", "0.6"))
+
+T = TypeVar("T")
+
+# (search cutoff, deadline) of the current request in time.monotonic()
+# terms; context-local like payload tracking, so graph tasks and tool
+# calls inherit it
+_deadline: ContextVar[Optional[Tuple[float, float]]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """A call was cut off, or never started, because the request deadline passed."""
+
+
+def start_deadline(budget_s: Optional[float]) -> Optional[float]:
+    """
+    Set the deadline for the current request (budget_s from now, falling
+    back to RESEARCH_DEADLINE_S); None/0 means no deadline.
+    """
+    budget = budget_s if budget_s is not None else RESEARCH_DEADLINE_S
+    if not budget or budget <= 0:
+        _deadline.set(None)
+        return None
+    now = time.monotonic()
+    usable = max(0.0, budget - DEADLINE_RESERVE_S)
+    _deadline.set((now + usable * DEADLINE_SEARCH_SHARE, now + budget))
+    return now + budget
+
+
+def remaining(search: bool = False) -> Optional[float]:
+    """
+    Seconds a call may still take, or None when there is no deadline.
+    Searches stop at the end of their share of the budget.
+    """
+    limits = _deadline.get()
+    if limits is None:
+        return None
+    search_cutoff, deadline = limits
+    left = deadline - time.monotonic() - DEADLINE_RESERVE_S
+    if search:
+        left = min(left, search_cutoff - time.monotonic())
+    return max(0.0, left)
+
+
+async def run_with_deadline(aw: Awaitable[T], what: str, search: bool = False) -> T:
+    """
+    Await `aw`, cancelling it if it would outlive the request deadline (or,
+    for a search, the search share of it).
+    """
+    left = remaining(search)
+    if left is None:
+        return await aw
+    if left <= 0:
+        if asyncio.iscoroutine(aw):
+            aw.close()
+        raise DeadlineExceeded(what)
+    try:
+        return await asyncio.wait_for(aw, left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(what) from None
+
+
+async def within_deadline(aw: Awaitable[T], default: T, timed_out: List[Dict[str, Any]], **source: Any) -> T:
+    """
+    Await `aw`; on DeadlineExceeded record `source` in timed_out and return
+    `default`, so a node can carry on with whatever else arrived.
+    """
+    try:
+        return await aw
+    except DeadlineExceeded:
+        timed_out.append(source)
+        return default
@@ -0,0 +1,100 @@
+import heapq
+import math
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .evidence_store import EvidenceStore
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have",
+    "in", "is", "it", "its", "of", "on", "or", "that", "the", "this", "to", "was",
+    "were", "will", "with",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS and len(t) > 1]
+
+
+class EvidenceIndex:
+    """
+    Per-run retrieval index over curated evidence.
+
+    Built once: topic -> evidence ids, plus a BM25 inverted index over
+    snippets. search() only touches the postings of the query terms and the
+    requested topics, so each section's lookup does not rescan all evidence.
+    Results are EvidenceStore ids, which is what SectionDraft.evidence_refs
+    records.
+    """
+
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, store: EvidenceStore, ids: List[int]):
+        self.store = store
+        self.ids = ids
+        self.by_topic: Dict[Optional[str], List[int]] = defaultdict(list)
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_len: Dict[int, int] = {}
+
+        for evidence_id in ids:
+            self.by_topic[store.topic(evidence_id)].append(evidence_id)
+
+            tokens = tokenize(store.snippet[evidence_id])
+            self.doc_len[evidence_id] = len(tokens)
+            counts: Dict[str, int] = defaultdict(int)
+            for tok in tokens:
+                counts[tok] += 1
+            for tok, tf in counts.items():
+                self.postings[tok].append((evidence_id, tf))
+
+        self.avg_len = (sum(self.doc_len.values()) / len(self.doc_len)) if self.doc_len else 0.0
+
+    def _idf(self, term: str) -> float:
+        n = len(self.ids)
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def candidates(self, topics: Iterable[str]) -> List[int]:
+        ids: List[int] = []
+        for topic in topics:
+            ids.extend(self.by_topic.get(topic, ()))
+        return sorted(set(ids))
+
+    def search(self, query: str, topics: List[str], k: int) -> List[int]:
+        """
+        Top-k evidence ids within `topics` (all evidence if empty), ranked by
+        BM25 against `query`, then by provider score, then by content (ids
+        depend on the order topic nodes finished in).
+        """
+        if topics:
+            allowed: Optional[Set[int]] = set(self.candidates(topics))
+            if not allowed:
+                return []
+        else:
+            allowed = None
+
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf(term)
+            for evidence_id, tf in self.postings.get(term, ()):
+                if allowed is not None and evidence_id not in allowed:
+                    continue
+                norm = self.K1 * (1 - self.B + self.B * self.doc_len[evidence_id] / (self.avg_len or 1))
+                scores[evidence_id] += idf * tf * (self.K1 + 1) / (tf + norm)
+
+        # Topic matches with no term overlap still qualify as filler
+        pool = allowed if allowed is not None else self.ids
+
+        def rank(evidence_id: int) -> Tuple[float, float, str, str, int]:
+            return (
+                -scores.get(evidence_id, 0.0),
+                -(self.store.score(evidence_id) or 0.0),
+                self.store.url[evidence_id] or "",
+                self.store.snippet[evidence_id],
+                evidence_id,
+            )
+
+        return heapq.nsmallest(k, pool, key=rank)
@@ -0,0 +1,195 @@
+import math
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .state import EvidenceItem
+
+# How many finished runs' stores we keep around for callers that never
+# release them (scripts, notebooks); API runs pin theirs while they run
+# and release explicitly.
+_MAX_STORES = 256
+
+
+class EvidenceStore:
+    """
+    Run-scoped, column-oriented evidence table.
+
+    Rows get stable integer ids; graph state only carries those ids.
+    Source and topic strings are interned into small integer codes and
+    scores live in a float array (NaN = missing), so a row costs a few
+    machine words plus its url/snippet/as_of strings. Adding the same
+    content twice returns the existing id, which keeps reducers idempotent.
+    """
+
+    __slots__ = (
+        "_labels",
+        "_label_codes",
+        "_source",
+        "_topic",
+        "_score",
+        "url",
+        "snippet",
+        "as_of",
+        "_row_ids",
+        "_merged_into",
+    )
+
+    def __init__(self):
+        self._labels: List[Optional[str]] = []
+        self._label_codes: Dict[Optional[str], int] = {}
+        self._source = array("H")
+        self._topic = array("H")
+        self._score = array("d")
+        self.url: List[Optional[str]] = []
+        self.snippet: List[str] = []
+        self.as_of: List[Optional[str]] = []
+        self._row_ids: Dict[Tuple, int] = {}
+        # Near-duplicate rows -> the merged row curation made for them
+        self._merged_into: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.snippet)
+
+    def _code(self, label: Optional[str]) -> int:
+        code = self._label_codes.get(label)
+        if code is None:
+            code = self._label_codes[label] = len(self._labels)
+            self._labels.append(label)
+        return code
+
+    def add(
+        self,
+        source: str,
+        snippet: str,
+        url: Optional[str] = None,
+        as_of: Optional[str] = None,
+        topic: Optional[str] = None,
+        score: Optional[float] = None,
+    ) -> int:
+        row_key = (source, url, snippet, as_of, topic, score)
+        existing = self._row_ids.get(row_key)
+        if existing is not None:
+            return existing
+
+        evidence_id = len(self.snippet)
+        self._source.append(self._code(source))
+        self._topic.append(self._code(topic))
+        self._score.append(math.nan if score is None else float(score))
+        self.url.append(url)
+        self.snippet.append(snippet)
+        self.as_of.append(as_of)
+        self._row_ids[row_key] = evidence_id
+        return evidence_id
+
+    def add_item(self, ev: EvidenceItem) -> int:
+        return self.add(ev.source, ev.snippet, ev.url, ev.as_of, ev.topic, ev.score)
+
+    def add_merged(self, members: Iterable[int], best_id: int, as_of: Optional[str], score: Optional[float]) -> int:
+        """
+        Row standing for a group of near-duplicates: best_id's content with
+        the group's freshest date and best score. Every member resolves to
+        it from then on (see canonical).
+        """
+        merged_id = self.add(
+            self.source(best_id), self.snippet[best_id], self.url[best_id], as_of, self.topic(best_id), score
+        )
+        for evidence_id in members:
+            if evidence_id != merged_id:
+                self._merged_into[evidence_id] = merged_id
+        return merged_id
+
+    def canonical(self, evidence_id: int) -> int:
+        """The merged row an id was folded into, or the id itself."""
+        while evidence_id in self._merged_into:
+            evidence_id = self._merged_into[evidence_id]
+        return evidence_id
+
+    def source(self, evidence_id: int) -> str:
+        return self._labels[self._source[evidence_id]]
+
+    def topic(self, evidence_id: int) -> Optional[str]:
+        return self._labels[self._topic[evidence_id]]
+
+    def score(self, evidence_id: int) -> Optional[float]:
+        value = self._score[evidence_id]
+        return None if math.isnan(value) else value
+
+    def ids_for_topic(self, ids: Iterable[int], topic: str) -> List[int]:
+        code = self._label_codes.get(topic)
+        if code is None:
+            return []
+        return [i for i in ids if self._topic[i] == code]
+
+    def item(self, evidence_id: int) -> EvidenceItem:
+        """
+        Materialize one row; only meant for the API boundary.
+        """
+        return EvidenceItem(
+            source=self.source(evidence_id),
+            url=self.url[evidence_id],
+            snippet=self.snippet[evidence_id],
+            as_of=self.as_of[evidence_id],
+            topic=self.topic(evidence_id),
+            score=self.score(evidence_id),
+        )
+
+    def items(self, ids: Iterable[int]) -> List[EvidenceItem]:
+        return [self.item(i) for i in ids]
+
+    def rows(self, start: int = 0) -> List[Tuple]:
+        """
+        (id, source, url, snippet, as_of, topic, score) for rows >= start.
+        Re-adding them in id order to an empty store reproduces the same ids.
+        """
+        return [
+            (
+                i,
+                self.source(i),
+                self.url[i],
+                self.snippet[i],
+                self.as_of[i],
+                self.topic(i),
+                self.score(i),
+            )
+            for i in range(start, len(self.snippet))
+        ]
+
+
+_stores: "OrderedDict[str, EvidenceStore]" = OrderedDict()
+# Runs in progress; their stores are never evicted
+_pinned: Set[str] = set()
+
+
+def get_store(run_id: str) -> EvidenceStore:
+    """
+    Return the evidence store for a run, creating it on first use.
+    """
+    store = _stores.get(run_id)
+    if store is None:
+        store = _stores[run_id] = EvidenceStore()
+        if len(_stores) > _MAX_STORES:
+            _evict()
+    else:
+        _stores.move_to_end(run_id)
+    return store
+
+
+def _evict() -> None:
+    # Least recently used first; with every store pinned the table grows
+    for run_id in [r for r in _stores if r not in _pinned][: len(_stores) - _MAX_STORES]:
+        del _stores[run_id]
+
+
+def peek_store(run_id: str) -> Optional[EvidenceStore]:
+    return _stores.get(run_id)
+
+
+def pin_store(run_id: str) -> None:
+    """Keep the run's store (now or once created) until release_store."""
+    _pinned.add(run_id)
+
+
+def release_store(run_id: str) -> None:
+    _pinned.discard(run_id)
+    _stores.pop(run_id, None)
@@ -1,6 +1,12 @@
-from langgraph.graph import StateGraph, END
+import os
+from typing import Callable, Dict, List
 
-from app.state import ResearchState
+from dotenv import load_dotenv
+from langgraph.graph import StateGraph, START, END
+
+from app.metrics import instrument_node
+from app.plans import planned_sections
+from app.state import BranchOutput, ResearchState
 from app.nodes.planner import planner_node
 from app.nodes.fundamentals import fundamentals_node
 from app.nodes.leadership import leadership_node
@@ -8,44 +14,130 @@ from app.nodes.aum import aum_node
 from app.nodes.outlook_strategy import outlook_strategy_node
 from app.nodes.culture_careers import culture_careers_node
 from app.nodes.curation import curation_node
-from app.nodes.section_writer import section_writer_node
+from app.nodes.section_writer import SECTION_SPECS, section_dependencies, section_node, section_writer_node
 from app.nodes.qa_final import qa_final_node
 
+load_dotenv()
 
-def build_graph():
-    graph = StateGraph(ResearchState)
+# "sections": each section is curated and written as soon as the topic
+# nodes it reads from are done. "barrier": every topic node, then one
+# curation pass, then all sections (the original layout).
+GRAPH_SCHEDULING = os.getenv("GRAPH_SCHEDULING", "sections").lower()
 
-    # Nodes
-    graph.add_node("planner", planner_node)
-    graph.add_node("fundamentals", fundamentals_node)
-    graph.add_node("leadership", leadership_node)
-    graph.add_node("aum", aum_node)
-    graph.add_node("outlook_strategy", outlook_strategy_node)
-    graph.add_node("culture_careers", culture_careers_node)
-    graph.add_node("curation", curation_node)
-    graph.add_node("section_writer", section_writer_node)
-    graph.add_node("qa_final", qa_final_node)
-
-    # Entry
-    graph.set_entry_point("planner")
+TOPIC_AGENTS: Dict[str, Callable] = {
+    "fundamentals": fundamentals_node,
+    "leadership": leadership_node,
+    "aum": aum_node,
+    "outlook_strategy": outlook_strategy_node,
+    "culture_careers": culture_careers_node,
+}
+
+
+def _add(graph: StateGraph, name: str, fn: Callable) -> None:
+    # Nodes are timed for /metrics unless METRICS_ENABLED=false
+    graph.add_node(name, instrument_node(name, fn))
+
+
+def _barrier_edges(graph: StateGraph) -> None:
+    _add(graph, "curation", curation_node)
+    _add(graph, "section_writer", section_writer_node)
+
+    # Planner → topic agents → curation
+    for topic, fn in TOPIC_AGENTS.items():
+        _add(graph, topic, fn)
+        graph.add_edge("planner", topic)
+        graph.add_edge(topic, "curation")
 
-    # Planner → topic agents
-    graph.add_edge("planner", "fundamentals")
-    graph.add_edge("planner", "leadership")
-    graph.add_edge("planner", "aum")
-    graph.add_edge("planner", "outlook_strategy")
-    graph.add_edge("planner", "culture_careers")
-
-    # Topic agents → curation
-    graph.add_edge("fundamentals", "curation")
-    graph.add_edge("leadership", "curation")
-    graph.add_edge("aum", "curation")
-    graph.add_edge("outlook_strategy", "curation")
-    graph.add_edge("culture_careers", "curation")
-
-    # Tail
     graph.add_edge("curation", "section_writer")
     graph.add_edge("section_writer", "qa_final")
+
+
+def _section_router(keys: List[str], group: str) -> Callable[[ResearchState], List[str]]:
+    def route(state: ResearchState) -> List[str]:
+        # The plan and generation_mode are per request, so the fan-out is
+        # decided at run time; sections the plan leaves out never start
+        planned = planned_sections(state.plan, keys)
+        if not planned:
+            return [END]
+        if state.generation_mode == "combined" and len(planned) > 1:
+            return [group]
+        return [f"section_{key}" for key in planned]
+
+    return route
+
+
+def _add_sections(branch: StateGraph, source: str, keys: List[str], group: str) -> None:
+    for key in keys:
+        _add(branch, f"section_{key}", section_node([key]))
+        branch.add_edge(f"section_{key}", END)
+    targets = [f"section_{key}" for key in keys]
+    if len(keys) > 1:
+        _add(branch, group, section_node(keys))
+        branch.add_edge(group, END)
+        targets.append(group)
+    branch.add_conditional_edges(source, _section_router(keys, group), targets + [END])
+
+
+def _section_edges(graph: StateGraph) -> None:
+    """
+    One branch subgraph per topic node: the search, then every section that
+    only reads that topic (one node per section, or a single combined node
+    for generation_mode="combined"). LangGraph steps are global within a
+    graph, so the branches are subgraphs to let each one advance on its
+    own. Sections with no topic node get a branch of their own; sections
+    with several wait for all of their branches.
+    """
+    deps = {key: section_dependencies(spec) for key, spec in SECTION_SPECS.items()}
+    tails: List[str] = []
+
+    for topic, fn in TOPIC_AGENTS.items():
+        branch = StateGraph(ResearchState, output_schema=BranchOutput)
+        _add(branch, topic, fn)
+        branch.set_entry_point(topic)
+        sections = [key for key, nodes in deps.items() if nodes == [topic]]
+        if sections:
+            _add_sections(branch, topic, sections, f"sections_{topic}")
+        else:
+            branch.add_edge(topic, END)
+
+        graph.add_node(f"branch_{topic}", branch.compile())
+        graph.add_edge("planner", f"branch_{topic}")
+        tails.append(f"branch_{topic}")
+
+    unsourced = [key for key, nodes in deps.items() if not nodes]
+    if unsourced:
+        branch = StateGraph(ResearchState, output_schema=BranchOutput)
+        _add_sections(branch, START, unsourced, "sections_unsourced")
+        graph.add_node("branch_unsourced", branch.compile())
+        graph.add_edge("planner", "branch_unsourced")
+        tails.append("branch_unsourced")
+
+    for key, nodes in deps.items():
+        if len(nodes) > 1:
+            _add(graph, f"section_{key}", section_node([key]))
+            graph.add_edge([f"branch_{node}" for node in nodes], f"section_{key}")
+            tails.append(f"section_{key}")
+
+    # qa_final assembles the memo once every branch and section is in
+    graph.add_edge(tails, "qa_final")
+
+
+def build_graph(checkpointer=None):
+    """
+    Compile the research graph. With a checkpointer, every invocation needs
+    configurable.thread_id (the run id) and can be resumed after a failure.
+    """
+    graph = StateGraph(ResearchState)
+
+    _add(graph, "planner", planner_node)
+    _add(graph, "qa_final", qa_final_node)
+    graph.set_entry_point("planner")
+
+    if GRAPH_SCHEDULING == "barrier":
+        _barrier_edges(graph)
+    else:
+        _section_edges(graph)
+
     graph.add_edge("qa_final", END)
 
-    return graph.compile()
+    return graph.compile(checkpointer=checkpointer)
@@ -0,0 +1,155 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HTTP_TIMEOUT_S = float(os.getenv("HTTP_TIMEOUT_S", "60"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY_S = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_S", "30"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "20"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() in ("1", "true", "yes")
+
+_client: Optional[httpx.AsyncClient] = None
+_http2_active = False
+_host_slots: Dict[str, asyncio.Semaphore] = {}
+_host_in_flight: Dict[str, int] = {}
+
+_stats: Dict[str, int] = {
+    "requests": 0,
+    "new_connections": 0,
+    "reused_connections": 0,
+}
+
+
+def _http2_available() -> bool:
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        print("[HTTP] HTTP2_ENABLED set but 'h2' is not installed – using HTTP/1.1.")
+        return False
+    return True
+
+
+def _new_client() -> httpx.AsyncClient:
+    global _http2_active
+
+    _http2_active = _http2_available()
+    return httpx.AsyncClient(
+        timeout=HTTP_TIMEOUT_S,
+        http2=_http2_active,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_S,
+        ),
+    )
+
+
+async def init_http_client() -> httpx.AsyncClient:
+    """
+    Create the process-wide AsyncClient (called from the FastAPI lifespan).
+    """
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = _new_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared client, creating it lazily when running outside the
+    FastAPI app (scripts, notebooks).
+    """
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = _new_client()
+    return _client
+
+
+@asynccontextmanager
+async def _host_slot(host: str):
+    sem = _host_slots.get(host)
+    if sem is None:
+        sem = _host_slots[host] = asyncio.Semaphore(HTTP_MAX_PER_HOST)
+
+    async with sem:
+        _host_in_flight[host] = _host_in_flight.get(host, 0) + 1
+        try:
+            yield
+        finally:
+            _host_in_flight[host] -= 1
+
+
+def _connection_trace() -> Tuple[Callable[[str, Dict[str, Any]], Awaitable[None]], Dict[str, bool]]:
+    seen = {"opened": False}
+
+    async def trace(event_name: str, info: Dict[str, Any]) -> None:
+        # httpcore only opens a TCP connection when nothing reusable is pooled
+        if event_name == "connection.connect_tcp.complete":
+            seen["opened"] = True
+
+    return trace, seen
+
+
+def _count_request(opened: bool) -> None:
+    _stats["requests"] += 1
+    _stats["new_connections" if opened else "reused_connections"] += 1
+
+
+@asynccontextmanager
+async def http_stream(method: str, url: str, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+    """
+    Send a request through the shared pool, respecting the per-host
+    connection cap. The body is not read up front, so callers can consume
+    large responses incrementally.
+    """
+    client = get_http_client()
+    trace, seen = _connection_trace()
+
+    async with _host_slot(urlsplit(url).netloc):
+        async with client.stream(method, url, extensions={"trace": trace}, **kwargs) as resp:
+            _count_request(seen["opened"])
+            yield resp
+
+
+def http_pool_stats() -> Dict[str, Any]:
+    """
+    Snapshot of pool occupancy and connection reuse, for sizing the limits.
+    """
+    stats: Dict[str, Any] = {
+        **_stats,
+        "http2": _http2_active,
+        "limits": {
+            "max_connections": HTTP_MAX_CONNECTIONS,
+            "max_keepalive": HTTP_MAX_KEEPALIVE,
+            "max_per_host": HTTP_MAX_PER_HOST,
+        },
+        "in_flight_per_host": {h: n for h, n in _host_in_flight.items() if n},
+    }
+
+    # httpcore pool internals; best-effort only
+    pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None) or []
+    stats["pool_connections"] = len(connections)
+    stats["pool_idle"] = sum(1 for c in connections if c.is_idle())
+
+    return stats
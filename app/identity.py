@@ -0,0 +1,155 @@
+import asyncio
+import os
+import re
+import sqlite3
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+from .kv_store import SqliteKV
+
+load_dotenv()
+
+# Persistent alias index: name and domain variants -> canonical company key,
+# shared by every worker on the host
+COMPANY_ALIAS_PATH = os.getenv("COMPANY_ALIAS_PATH", ".cache/company_aliases.sqlite3")
+COMPANY_ALIAS_MAX_BYTES = int(float(os.getenv("COMPANY_ALIAS_MAX_MB", "16")) * 1024 * 1024)
+# Resolutions remembered in-process, so a request doesn't hit SQLite per lookup
+COMPANY_ALIAS_MEMORY_ITEMS = int(os.getenv("COMPANY_ALIAS_MEMORY_ITEMS", "1024"))
+
+# Trailing legal-form tokens, after punctuation folding ("L.L.C." -> "llc")
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "llc", "llp", "lp",
+    "ltd", "limited", "plc", "gmbh", "ag", "sa", "nv", "bv", "se", "spa", "srl", "sarl",
+    "pte", "pty", "oy", "ab", "kk",
+}
+
+_store = SqliteKV(COMPANY_ALIAS_PATH, COMPANY_ALIAS_MAX_BYTES)
+_memory: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+
+_stats: Dict[str, int] = {
+    "lookups": 0,
+    "memory_hits": 0,
+    "alias_hits": 0,
+    "new_companies": 0,
+    "aliases_added": 0,
+}
+
+
+# ------------- Normalization -------------
+
+
+def _fold(text: str) -> str:
+    # Accents, case and punctuation; dots and apostrophes join ("S.A.", "Moody's")
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    text = text.replace("&", " and ")
+    text = re.sub(r"[.'’]", "", text)
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+def normalize_name(name: str) -> str:
+    """"BlackRock, Inc.", "blackrock inc" and "BLACKROCK" all give "blackrock"."""
+    tokens = _fold(name or "").split()
+    if len(tokens) > 1 and tokens[0] == "the":
+        tokens = tokens[1:]
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def canonical_domain(website: Optional[str]) -> Optional[str]:
+    """"https://www.BlackRock.com/us/" -> "blackrock.com"; None when there is no usable host."""
+    raw = (website or "").strip().lower()
+    if not raw or raw in ("n/a", "na", "none", "-"):
+        return None
+    if "://" not in raw:
+        raw = "http://" + raw
+    try:
+        host = urlsplit(raw).hostname or ""
+    except ValueError:
+        return None
+    host = host.rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    return host if "." in host else None
+
+
+# ------------- Alias index -------------
+
+
+def _resolve_sync(name: str, domain: Optional[str], typed: str) -> Dict[str, Any]:
+    """
+    Canonical key for a (normalized name, domain) pair, and the one
+    spelling of the company that searches and prompts use. With a domain
+    the key is always the domain's, so "Apollo" at apollo.com and at
+    apollo.io stay apart; the name alias is only linked to it. Without
+    one, a known name is adopted.
+    """
+    name_alias = f"alias:name:{name}"
+    domain_alias = f"alias:domain:{domain}" if domain else None
+
+    if domain_alias:
+        key = _store.get(domain_alias)
+        if key is None:
+            key = f"domain:{domain}"
+            _store.put(domain_alias, key, "alias")
+            _stats["new_companies"] += 1
+            _stats["aliases_added"] += 1
+        else:
+            _stats["alias_hits"] += 1
+        if _store.get(name_alias) is None:
+            _store.put(name_alias, key, "alias")
+            _stats["aliases_added"] += 1
+    else:
+        key = _store.get(name_alias)
+        if key is None:
+            key = f"name:{name}"
+            _store.put(name_alias, key, "alias")
+            _stats["new_companies"] += 1
+            _stats["aliases_added"] += 1
+        else:
+            _stats["alias_hits"] += 1
+
+    # First spelling seen wins, so every variant shares search, LLM and
+    # memo cache entries
+    spelling = _store.get(f"spelling:{key}")
+    if spelling is None:
+        spelling = typed
+        _store.put(f"spelling:{key}", spelling, "spelling")
+    return {"key": key, "name": spelling, "domain": domain}
+
+
+async def resolve_identity(name: str, website: Optional[str] = None) -> Dict[str, Any]:
+    """
+    {"key", "name", "domain"} for a company as typed: the canonical
+    company key, the company's canonical spelling, and the canonical
+    website domain. Searches, prompts and the memo use that spelling, so
+    "BlackRock, Inc." and "blackrock inc" hit the same cache entries.
+    """
+    _stats["lookups"] += 1
+    typed = (name or "").strip() or "Unknown Company"
+    normalized = normalize_name(typed) or "unknown company"
+    domain = canonical_domain(website)
+    memo_key = (normalized, domain or "")
+    cached = _memory.get(memo_key)
+    if cached is not None:
+        _memory.move_to_end(memo_key)
+        _stats["memory_hits"] += 1
+        return dict(cached)
+
+    try:
+        identity = await asyncio.to_thread(_resolve_sync, normalized, domain, typed)
+    except sqlite3.Error as e:
+        print(f"[Identity] Alias index unavailable: {e}")
+        identity = {"key": f"domain:{domain}" if domain else f"name:{normalized}", "name": typed, "domain": domain}
+    _memory[memo_key] = identity
+    while len(_memory) > COMPANY_ALIAS_MEMORY_ITEMS:
+        _memory.popitem(last=False)
+    return dict(identity)
+
+
+def identity_stats() -> Dict[str, Any]:
+    return {**_stats, "memory_items": len(_memory), "store": _store.snapshot()}
@@ -0,0 +1,193 @@
+import asyncio
+import math
+import statistics
+import time
+import uuid
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity; carries a retry hint."""
+
+    def __init__(self, retry_after_s: int):
+        super().__init__(f"Job queue is full, retry in {retry_after_s}s")
+        self.retry_after_s = retry_after_s
+
+
+class Job:
+    __slots__ = (
+        "id",
+        "key",
+        "payload",
+        "status",
+        "created_at",
+        "started_at",
+        "finished_at",
+        "result",
+        "error",
+    )
+
+    def __init__(self, key: str, payload: Any):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.payload = payload
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+
+    @property
+    def pending(self) -> bool:
+        return self.status in ("queued", "running")
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class JobManager:
+    """
+    Bounded asyncio worker pool in front of an async runner.
+
+    Submissions beyond `max_queue` are rejected (callers turn that into
+    429 + Retry-After). A submission whose key matches a queued or running
+    job returns that job instead of enqueuing a duplicate.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[Any], Awaitable[Any]],
+        workers: int,
+        max_queue: int,
+        result_ttl_s: float,
+    ):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.result_ttl_s = result_ttl_s
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: Dict[str, Job] = {}
+        self._pending_by_key: Dict[str, Job] = {}
+        self._running = 0
+
+        self._wait_times: Deque[float] = deque(maxlen=1000)
+        self._run_times: Deque[float] = deque(maxlen=1000)
+        self.stats: Dict[str, int] = {
+            "submitted": 0,
+            "deduplicated": 0,
+            "rejected": 0,
+            "succeeded": 0,
+            "failed": 0,
+        }
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, key: str, payload: Any) -> Job:
+        if self._queue is None:
+            raise RuntimeError("JobManager.start() has not been called")
+
+        self._prune()
+
+        existing = self._pending_by_key.get(key)
+        if existing is not None and existing.pending:
+            self.stats["deduplicated"] += 1
+            return existing
+
+        job = Job(key, payload)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise QueueFullError(self._retry_after_s())
+
+        self._jobs[job.id] = job
+        self._pending_by_key[key] = job
+        self.stats["submitted"] += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        while True:
+            job: Job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            self._wait_times.append(job.started_at - job.created_at)
+            self._running += 1
+            try:
+                job.result = await self.runner(job.payload)
+                job.status = "succeeded"
+                self.stats["succeeded"] += 1
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "Cancelled"
+                raise
+            except Exception as e:
+                job.status = "failed"
+                job.error = f"{type(e).__name__}: {e}"
+                self.stats["failed"] += 1
+            finally:
+                job.finished_at = time.time()
+                self._run_times.append(job.finished_at - job.started_at)
+                self._running -= 1
+                if self._pending_by_key.get(job.key) is job:
+                    del self._pending_by_key[job.key]
+                self._queue.task_done()
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.result_ttl_s
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _retry_after_s(self) -> int:
+        # Rough time for the backlog to drain through the worker pool
+        avg_run = statistics.fmean(self._run_times) if self._run_times else 30.0
+        depth = self._queue.qsize() if self._queue is not None else 0
+        return max(1, math.ceil(depth * avg_run / self.workers))
+
+    def snapshot(self) -> Dict[str, Any]:
+        waits = list(self._wait_times)
+        runs = list(self._run_times)
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "running": self._running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "wait_time_s": {
+                "avg": round(statistics.fmean(waits), 3) if waits else 0.0,
+                "p50": round(_percentile(waits, 50), 3),
+                "p95": round(_percentile(waits, 95), 3),
+                "max": round(max(waits), 3) if waits else 0.0,
+            },
+            "run_time_s": {
+                "avg": round(statistics.fmean(runs), 3) if runs else 0.0,
+                "p95": round(_percentile(runs, 95), 3),
+            },
+        }
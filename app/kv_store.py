@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    tag TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_kv_lru ON kv (last_access);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SqliteKV:
+    """
+    Small persistent key/value table with LRU eviction by total size.
+
+    WAL mode lets several uvicorn workers on the same host share the file.
+    Methods are synchronous; async callers should wrap them in
+    asyncio.to_thread.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "writes": 0,
+            "evictions": 0,
+        }
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str, ttl_s: Optional[float] = None) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            row = conn.execute("SELECT value, created_at FROM kv WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+
+            value, created_at = row
+            if ttl_s is not None and now - created_at > ttl_s:
+                conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+                conn.commit()
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            conn.execute("UPDATE kv SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.stats["hits"] += 1
+        return value
+
+    def put(self, key: str, value: str, tag: str = "") -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, tag, value, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, tag, value, len(value), now, now),
+            )
+            self._evict_locked(conn)
+            conn.commit()
+            self.stats["writes"] += 1
+
+    def claim(self, key: str, ttl_s: float) -> bool:
+        """
+        Take a lease on `key` for ttl_s seconds, e.g. so only one worker
+        runs a background job; False while another unexpired lease holds it.
+        Leases live in their own table, out of reach of LRU eviction.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires_at < ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO leases (key, expires_at) VALUES (?, ?)", (key, now + ttl_s)
+            )
+            conn.commit()
+        return cursor.rowcount == 1
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute("DELETE FROM leases WHERE key = ?", (key,))
+            conn.commit()
+
+    def _evict_locked(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM kv").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Least-recently-used first until we are back under the bound
+        victims: List[str] = []
+        for key, size in conn.execute("SELECT key, size FROM kv ORDER BY last_access ASC"):
+            if total <= self.max_bytes:
+                break
+            victims.append(key)
+            total -= size
+
+        conn.executemany("DELETE FROM kv WHERE key = ?", [(k,) for k in victims])
+        self.stats["evictions"] += len(victims)
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        snap: Dict[str, Any] = {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "max_bytes": self.max_bytes,
+        }
+        try:
+            with self._lock:
+                entries, size = self._get_conn().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM kv"
+                ).fetchone()
+            snap["entries"] = entries
+            snap["bytes"] = size
+        except sqlite3.Error:
+            pass
+        return snap
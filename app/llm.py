@@ -1,15 +1,66 @@
+import asyncio
+import hashlib
+import json
 import os
-from typing import Optional
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import aclosing, closing
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
+import httpx
 from dotenv import load_dotenv
 from huggingface_hub import InferenceClient
 
+from .cancellation import note_abandoned
+from .deadline import DeadlineExceeded, run_with_deadline
+from .kv_store import SqliteKV
+from .metrics import count_llm_error, observe_llm
+from .ratelimit import (
+    RETRY_MAX_ATTEMPTS,
+    RETRYABLE_STATUS,
+    backoff_delay,
+    hf_limiter,
+    parse_retry_after,
+)
+
+try:
+    from huggingface_hub import AsyncInferenceClient
+except ImportError:  # older huggingface_hub: fall back to a worker thread
+    AsyncInferenceClient = None
+
 load_dotenv()
 
 HF_API_KEY = os.getenv("HF_API_KEY")
 HF_MODEL_ID = os.getenv("HF_MODEL_ID", "meta-llama/Meta-Llama-3-8B-Instruct")
+# OpenAI-compatible endpoint (TGI, local stand-in) used instead of HF_MODEL_ID
+HF_BASE_URL = os.getenv("HF_BASE_URL")
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3")
+LLM_CACHE_MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "128")) * 1024 * 1024)
+LLM_CACHE_MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "256"))
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", str(30 * 24 * 3600)))
 
 _client: Optional[InferenceClient] = None
+_async_client: Optional[Any] = None
+_async_client_failed = False
+
+# Two-tier completion cache: in-process LRU in front of a shared SQLite file
+_memory_cache: "OrderedDict[str, str]" = OrderedDict()
+_disk_cache = SqliteKV(LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES)
+_cache_stats: Dict[str, int] = {
+    "memory_hits": 0,
+    "disk_hits": 0,
+    "misses": 0,
+    "bytes_saved": 0,
+}
+
+
+def _client_target() -> Dict[str, str]:
+    # The HF clients accept either a model id or a base URL, not both
+    return {"base_url": HF_BASE_URL} if HF_BASE_URL else {"model": HF_MODEL_ID}
 
 
 def _get_client() -> Optional[InferenceClient]:
@@ -26,39 +77,432 @@ def _get_client() -> Optional[InferenceClient]:
         return None
 
     try:
-        _client = InferenceClient(
-            model=HF_MODEL_ID,
-            token=HF_API_KEY,
-        )
+        _client = InferenceClient(**_client_target(), token=HF_API_KEY)
         return _client
     except Exception as e:
         print(f"[HF LLM] Failed to init InferenceClient: {e}")
         return None
 
 
+def _get_async_client() -> Optional[Any]:
+    """
+    Lazily create a single AsyncInferenceClient, or None when unavailable
+    (callers then use the sync client in an executor).
+    """
+    global _async_client, _async_client_failed
+
+    if _async_client is not None:
+        return _async_client
+
+    if not HF_API_KEY or AsyncInferenceClient is None or _async_client_failed:
+        return None
+
+    try:
+        _async_client = AsyncInferenceClient(**_client_target(), token=HF_API_KEY)
+        return _async_client
+    except Exception as e:
+        print(f"[HF LLM] Failed to init AsyncInferenceClient, using thread fallback: {e}")
+        _async_client_failed = True
+        return None
+
+
+def _messages(system_prompt: str, user_prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+# ------------- Completion cache -------------
+
+
+def completion_cache_key(
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int,
+    temperature: float,
+) -> str:
+    # The endpoint actually called: a base URL replaces HF_MODEL_ID, and
+    # serves whatever model it was started with
+    raw = json.dumps([_client_target(), HF_MODEL_ID, system_prompt, user_prompt, max_tokens, temperature])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _is_sentinel(text: str) -> bool:
+    # "[HF LLM ERROR]" / "[HF LLM NOT CONFIGURED]" must never be served from cache
+    return text.startswith("[HF LLM")
+
+
+def _memory_get(key: str) -> Optional[str]:
+    text = _memory_cache.get(key)
+    if text is not None:
+        _memory_cache.move_to_end(key)
+        _cache_stats["memory_hits"] += 1
+    return text
+
+
+def _memory_put(key: str, text: str) -> None:
+    _memory_cache[key] = text
+    _memory_cache.move_to_end(key)
+    while len(_memory_cache) > LLM_CACHE_MEMORY_ITEMS:
+        _memory_cache.popitem(last=False)
+
+
+def _disk_get(key: str) -> Optional[str]:
+    try:
+        text = _disk_cache.get(key, LLM_CACHE_TTL_S)
+    except sqlite3.Error as e:
+        print(f"[HF LLM] Cache read failed: {e}")
+        text = None
+
+    if text is None or not text.strip():
+        # Blank completions stored before they were refused count as misses
+        _cache_stats["misses"] += 1
+        return None
+
+    _cache_stats["disk_hits"] += 1
+    _memory_put(key, text)
+    return text
+
+
+def _cache_put(key: str, text: str) -> None:
+    # A blank completion is as useless to replay as a sentinel
+    if not text.strip() or _is_sentinel(text):
+        return
+    _memory_put(key, text)
+    try:
+        _disk_cache.put(key, text, HF_MODEL_ID)
+    except sqlite3.Error as e:
+        print(f"[HF LLM] Cache write failed: {e}")
+
+
+def _cache_get_sync(key: str) -> Tuple[Optional[str], str]:
+    """(cached text, tier) where tier is "memory", "disk" or "miss"."""
+    text = _memory_get(key)
+    if text is not None:
+        return text, "memory"
+    text = _disk_get(key)
+    return text, "disk" if text is not None else "miss"
+
+
+async def _cache_get(key: str) -> Tuple[Optional[str], str]:
+    text = _memory_get(key)
+    if text is not None:
+        return text, "memory"
+    text = await asyncio.to_thread(_disk_get, key)
+    return text, "disk" if text is not None else "miss"
+
+
+def _record_saving(system_prompt: str, user_prompt: str, text: str) -> str:
+    # Prompt bytes we did not send plus completion bytes we did not wait for
+    saved = (system_prompt + user_prompt + text).encode("utf-8")
+    _cache_stats["bytes_saved"] += len(saved)
+    return text
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    hits = _cache_stats["memory_hits"] + _cache_stats["disk_hits"]
+    lookups = hits + _cache_stats["misses"]
+    stats: Dict[str, Any] = {
+        **_cache_stats,
+        "enabled": LLM_CACHE_ENABLED,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "memory_items": len(_memory_cache),
+    }
+    if LLM_CACHE_ENABLED:
+        stats["disk"] = _disk_cache.snapshot()
+    return stats
+
+
+# ------------- Generation -------------
+
+
 def generate_section_with_hf(
     system_prompt: str,
     user_prompt: str,
     max_tokens: int = 600,
     temperature: float = 0.3,
+    use_cache: bool = True,
 ) -> str:
     """
     Call Hugging Face chat-completion model and return plain text.
+    Completions are cached by (model, prompts, max_tokens, temperature)
+    unless use_cache is False.
     """
-    client = _get_client()
-    if client is None:
-        return "[HF LLM NOT CONFIGURED]"
+    started = time.perf_counter()
+    prompt_chars = len(system_prompt) + len(user_prompt)
+    key, cache = None, "off"
+    if use_cache and LLM_CACHE_ENABLED:
+        key = completion_cache_key(system_prompt, user_prompt, max_tokens, temperature)
+        cached, cache = _cache_get_sync(key)
+        if cached is not None:
+            observe_llm("sync", cache, started, prompt_chars, cached)
+            return _record_saving(system_prompt, user_prompt, cached)
 
-    try:
+    text = _chat_completion_sync(system_prompt, user_prompt, max_tokens, temperature)
+    if key is not None:
+        _cache_put(key, text)
+    observe_llm("sync", cache, started, prompt_chars, text)
+    return text
+
+
+def _error_status(e: Exception) -> Tuple[Optional[int], Optional[float]]:
+    """
+    (HTTP status, Retry-After seconds) of a provider error, when known.
+    """
+    response = getattr(e, "response", None)
+    status = getattr(response, "status_code", None)
+    headers = getattr(response, "headers", None) or {}
+    return status, parse_retry_after(headers.get("Retry-After"))
+
+
+def _is_retryable(e: Exception, status: Optional[int]) -> bool:
+    return status in RETRYABLE_STATUS or isinstance(e, (httpx.TransportError, TimeoutError))
+
+
+def _estimate_tokens(system_prompt: str, user_prompt: str, max_tokens: int) -> float:
+    # ~4 characters per token is close enough for budgeting tokens/min
+    return (len(system_prompt) + len(user_prompt)) / 4 + max_tokens
+
+
+def _raw_chat_sync(
+    client: InferenceClient,
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int,
+    temperature: float,
+    cancelled: Optional[threading.Event] = None,
+) -> str:
+    if cancelled is None:
         response = client.chat_completion(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+            messages=_messages(system_prompt, user_prompt),
             max_tokens=max_tokens,
             temperature=temperature,
         )
         return response.choices[0].message.content.strip()
-    except Exception as e:
-        print(f"[HF LLM] Error during generation: {e}")
-        return "[HF LLM ERROR]"
+
+    # A thread can't be cancelled, so it streams and stops reading once the
+    # awaiting caller is
+    parts: List[str] = []
+    with closing(
+        client.chat_completion(
+            messages=_messages(system_prompt, user_prompt),
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+        )
+    ) as stream:
+        for chunk in stream:
+            if cancelled.is_set():
+                break
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+    return "".join(parts).strip()
+
+
+def _chat_completion_sync(
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int,
+    temperature: float,
+) -> str:
+    client = _get_client()
+    if client is None:
+        return "[HF LLM NOT CONFIGURED]"
+
+    # Sync callers can't share the async limiter, but still back off on 429/5xx
+    for attempt in range(RETRY_MAX_ATTEMPTS):
+        try:
+            return _raw_chat_sync(client, system_prompt, user_prompt, max_tokens, temperature)
+        except Exception as e:
+            status, retry_after = _error_status(e)
+            count_llm_error(e, status)
+            if not _is_retryable(e, status) or attempt + 1 >= RETRY_MAX_ATTEMPTS:
+                print(f"[HF LLM] Error during generation: {e}")
+                return "[HF LLM ERROR]"
+            time.sleep(backoff_delay(attempt, retry_after))
+    return "[HF LLM ERROR]"
+
+
+async def agenerate_section_with_hf(
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int = 600,
+    temperature: float = 0.3,
+    use_cache: bool = True,
+) -> str:
+    """
+    Async variant of generate_section_with_hf that never blocks the event loop.
+    """
+    started = time.perf_counter()
+    prompt_chars = len(system_prompt) + len(user_prompt)
+    key, cache = None, "off"
+    if use_cache and LLM_CACHE_ENABLED:
+        key = completion_cache_key(system_prompt, user_prompt, max_tokens, temperature)
+        cached, cache = await _cache_get(key)
+        if cached is not None:
+            observe_llm("async", cache, started, prompt_chars, cached)
+            return _record_saving(system_prompt, user_prompt, cached)
+
+    try:
+        text = await run_with_deadline(
+            _chat_completion_async(system_prompt, user_prompt, max_tokens, temperature), "hf_llm"
+        )
+    except DeadlineExceeded:
+        observe_llm("async", cache, started, prompt_chars, "[HF LLM TIMEOUT]")
+        raise
+    except asyncio.CancelledError:
+        note_abandoned("llm", prompt_chars)
+        raise
+    if key is not None:
+        await asyncio.to_thread(_cache_put, key, text)
+    observe_llm("async", cache, started, prompt_chars, text)
+    return text
+
+
+async def _chat_completion_async(
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int,
+    temperature: float,
+) -> str:
+    client = _get_async_client()
+    sync_client = _get_client() if client is None else None
+    if client is None and sync_client is None:
+        return "[HF LLM NOT CONFIGURED]"
+
+    tokens = _estimate_tokens(system_prompt, user_prompt, max_tokens)
+    for attempt in range(RETRY_MAX_ATTEMPTS):
+        try:
+            async with hf_limiter.slot(tokens):
+                if client is not None:
+                    response = await client.chat_completion(
+                        messages=_messages(system_prompt, user_prompt),
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                    )
+                    text = response.choices[0].message.content.strip()
+                else:
+                    cancelled = threading.Event()
+                    try:
+                        text = await asyncio.to_thread(
+                            _raw_chat_sync,
+                            sync_client,
+                            system_prompt,
+                            user_prompt,
+                            max_tokens,
+                            temperature,
+                            cancelled,
+                        )
+                    finally:
+                        # No-op once the thread is done; stops it otherwise
+                        cancelled.set()
+            hf_limiter.on_success()
+            return text
+        except Exception as e:
+            status, retry_after = _error_status(e)
+            count_llm_error(e, status)
+            if not _is_retryable(e, status) or attempt + 1 >= RETRY_MAX_ATTEMPTS:
+                print(f"[HF LLM] Error during generation: {e}")
+                return "[HF LLM ERROR]"
+            if status == 429:
+                hf_limiter.on_throttle()
+            await hf_limiter.backoff(attempt, retry_after)
+    return "[HF LLM ERROR]"
+
+
+async def astream_section_with_hf(
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int = 600,
+    temperature: float = 0.3,
+    use_cache: bool = True,
+) -> AsyncIterator[str]:
+    """
+    Stream a completion as text deltas. Cached completions (and the thread
+    fallback) arrive as a single chunk; the full text is cached afterwards.
+    """
+    started = time.perf_counter()
+    prompt_chars = len(system_prompt) + len(user_prompt)
+    key, cache = None, "off"
+    if use_cache and LLM_CACHE_ENABLED:
+        key = completion_cache_key(system_prompt, user_prompt, max_tokens, temperature)
+        cached, cache = await _cache_get(key)
+        if cached is not None:
+            observe_llm("stream", cache, started, prompt_chars, cached)
+            yield _record_saving(system_prompt, user_prompt, cached)
+            return
+
+    client = _get_async_client()
+    if client is None:
+        try:
+            text = await run_with_deadline(
+                _chat_completion_async(system_prompt, user_prompt, max_tokens, temperature), "hf_llm"
+            )
+        except DeadlineExceeded:
+            observe_llm("stream", cache, started, prompt_chars, "[HF LLM TIMEOUT]")
+            raise
+        except asyncio.CancelledError:
+            note_abandoned("llm", prompt_chars)
+            raise
+        observe_llm("stream", cache, started, prompt_chars, text)
+        yield text
+        return
+
+    tokens = _estimate_tokens(system_prompt, user_prompt, max_tokens)
+    parts: List[str] = []
+    for attempt in range(RETRY_MAX_ATTEMPTS):
+        try:
+            async with hf_limiter.slot(tokens):
+                stream = await run_with_deadline(
+                    client.chat_completion(
+                        messages=_messages(system_prompt, user_prompt),
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        stream=True,
+                    ),
+                    "hf_llm",
+                )
+                # Each chunk waits at most until the request deadline; the
+                # caller keeps whatever text arrived before it. Closed on
+                # every exit, so a cancelled run stops reading the response
+                async with aclosing(stream):
+                    while True:
+                        try:
+                            chunk = await run_with_deadline(stream.__anext__(), "hf_llm")
+                        except StopAsyncIteration:
+                            break
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            parts.append(delta)
+                            yield delta
+            hf_limiter.on_success()
+            break
+        except DeadlineExceeded:
+            observe_llm("stream", cache, started, prompt_chars, "".join(parts) + "[HF LLM TIMEOUT]")
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            # Cancelled mid-call, or the consumer stopped iterating
+            note_abandoned("llm", prompt_chars)
+            raise
+        except Exception as e:
+            status, retry_after = _error_status(e)
+            # Only retry before anything was streamed to the caller
+            count_llm_error(e, status)
+            if parts or not _is_retryable(e, status) or attempt + 1 >= RETRY_MAX_ATTEMPTS:
+                print(f"[HF LLM] Error during streaming generation: {e}")
+                # Partial text is kept but marked, so the draft gets low confidence
+                marker = "\n[HF LLM ERROR]" if parts else "[HF LLM ERROR]"
+                observe_llm("stream", cache, started, prompt_chars, "".join(parts) + marker)
+                yield marker
+                return
+            if status == 429:
+                hf_limiter.on_throttle()
+            await hf_limiter.backoff(attempt, retry_after)
+
+    text = "".join(parts).strip()
+    if key is not None:
+        await asyncio.to_thread(_cache_put, key, text)
+    observe_llm("stream", cache, started, prompt_chars, text)
@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .kv_store import SqliteKV
+
+load_dotenv()
+
+# Finished memos, keyed on the normalized request, shared by every worker
+# on the host through one SQLite file
+MEMO_CACHE_ENABLED = os.getenv("MEMO_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+MEMO_CACHE_PATH = os.getenv("MEMO_CACHE_PATH", ".cache/memo_cache.sqlite3")
+MEMO_CACHE_MAX_BYTES = int(float(os.getenv("MEMO_CACHE_MAX_MB", "64")) * 1024 * 1024)
+# Served as is while younger than this (the news search TTL by default)
+MEMO_CACHE_TTL_S = float(os.getenv("MEMO_CACHE_TTL_S", str(6 * 3600)))
+# Grace window after the TTL: still served at once, while one background
+# run refreshes it; older memos count as misses
+MEMO_CACHE_STALE_S = float(os.getenv("MEMO_CACHE_STALE_S", str(24 * 3600)))
+# Upper bound on a background refresh; a crashed worker's lease expires
+MEMO_REFRESH_LEASE_S = float(os.getenv("MEMO_REFRESH_LEASE_S", "600"))
+
+_store = SqliteKV(MEMO_CACHE_PATH, MEMO_CACHE_MAX_BYTES)
+
+_stats: Dict[str, int] = {
+    "hits": 0,
+    "stale_hits": 0,
+    "misses": 0,
+    "bypassed": 0,
+    "writes": 0,
+    "skipped_incomplete": 0,
+    "refreshes_started": 0,
+    "refreshes_failed": 0,
+}
+
+
+def memo_cache_key(request_key: str) -> str:
+    return hashlib.sha256(request_key.encode("utf-8")).hexdigest()
+
+
+def count_bypass() -> None:
+    _stats["bypassed"] += 1
+
+
+async def get_cached_memo(key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+    """(cached response, age in seconds), or None on a miss or an expired memo."""
+    if not MEMO_CACHE_ENABLED:
+        return None
+    try:
+        raw = await asyncio.to_thread(_store.get, key, MEMO_CACHE_TTL_S + MEMO_CACHE_STALE_S)
+    except sqlite3.Error as e:
+        print(f"[Memo cache] Read failed: {e}")
+        return None
+    if raw is None:
+        _stats["misses"] += 1
+        return None
+    entry = json.loads(raw)
+    age = max(0.0, time.time() - entry["saved_at"])
+    _stats["hits" if age <= MEMO_CACHE_TTL_S else "stale_hits"] += 1
+    return entry["response"], age
+
+
+def is_stale(age_s: float) -> bool:
+    return age_s > MEMO_CACHE_TTL_S
+
+
+def _cacheable(response: Dict[str, Any]) -> bool:
+    """
+    Only complete memos are worth serving to anyone else: none cut short
+    by a deadline, no "[HF LLM ...]" sentinel text, no failed or
+    low-confidence sections.
+    """
+    run_stats = response.get("run_stats") or {}
+    if run_stats.get("timed_out") or (run_stats.get("sections") or {}).get("low_confidence"):
+        return False
+    return "[HF LLM" not in (response.get("final_report_markdown") or "")
+
+
+async def put_cached_memo(key: str, response: Dict[str, Any]) -> None:
+    if not MEMO_CACHE_ENABLED:
+        return
+    if not _cacheable(response):
+        _stats["skipped_incomplete"] += 1
+        return
+    value = json.dumps({"saved_at": time.time(), "response": response})
+    try:
+        await asyncio.to_thread(_store.put, key, value, "memo")
+        _stats["writes"] += 1
+    except sqlite3.Error as e:
+        print(f"[Memo cache] Write failed: {e}")
+
+
+async def claim_refresh(key: str) -> bool:
+    """Only one worker refreshes a stale memo at a time."""
+    try:
+        claimed = await asyncio.to_thread(_store.claim, f"refresh:{key}", MEMO_REFRESH_LEASE_S)
+    except sqlite3.Error as e:
+        print(f"[Memo cache] Could not take refresh lease: {e}")
+        return False
+    if claimed:
+        _stats["refreshes_started"] += 1
+    return claimed
+
+
+async def release_refresh(key: str, failed: bool = False) -> None:
+    if failed:
+        _stats["refreshes_failed"] += 1
+    try:
+        await asyncio.to_thread(_store.release, f"refresh:{key}")
+    except sqlite3.Error as e:
+        print(f"[Memo cache] Could not release refresh lease: {e}")
+
+
+def memo_cache_stats() -> Dict[str, Any]:
+    stats: Dict[str, Any] = {
+        "enabled": MEMO_CACHE_ENABLED,
+        "ttl_s": MEMO_CACHE_TTL_S,
+        "stale_s": MEMO_CACHE_STALE_S,
+        **_stats,
+    }
+    if MEMO_CACHE_ENABLED:
+        stats["store"] = _store.snapshot()
+    return stats
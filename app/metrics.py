@@ -0,0 +1,279 @@
+import functools
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Lets clients ask for a per-request trace (X-Debug-Trace: 1)
+DEBUG_TRACE_ENABLED = os.getenv("DEBUG_TRACE_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "200"))
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+# ------------- Prometheus-style metrics -------------
+
+
+def _labels_text(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels_text(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = _LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple, value: float) -> None:
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            else:
+                row[len(self.buckets)] += 1
+            row[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, row in sorted(self._values.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, row):
+                    cumulative += count
+                    le = _labels_text(self.labelnames, labels, f'le="{bound:g}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative:g}")
+                total = cumulative + row[len(self.buckets)]
+                inf = _labels_text(self.labelnames, labels, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf} {total:g}")
+                lines.append(f"{self.name}_sum{_labels_text(self.labelnames, labels)} {row[-1]:g}")
+                lines.append(f"{self.name}_count{_labels_text(self.labelnames, labels)} {total:g}")
+        return lines
+
+
+node_duration = Histogram(
+    "research_node_duration_seconds", "Wall time of one graph node execution.", ["node", "outcome"]
+)
+node_errors = Counter("research_node_errors_total", "Graph node failures by error class.", ["node", "error"])
+
+search_duration = Histogram(
+    "tavily_search_duration_seconds", "Tavily search latency as seen by the caller.", ["topic", "outcome"]
+)
+search_results = Histogram(
+    "tavily_search_results", "Results returned per Tavily search.", ["topic"], buckets=_COUNT_BUCKETS
+)
+search_cache = Counter("tavily_search_cache_total", "Search cache lookups.", ["topic", "result"])
+search_bytes = Counter("tavily_search_response_bytes_total", "Response bytes read from Tavily.", ["topic"])
+search_errors = Counter("tavily_search_errors_total", "Failed Tavily searches by error class.", ["topic", "error"])
+
+llm_duration = Histogram(
+    "llm_call_duration_seconds", "Section generation latency, including cache lookups.", ["mode", "cache"]
+)
+llm_calls = Counter("llm_calls_total", "Section generation calls.", ["mode", "cache", "outcome"])
+llm_tokens = Counter("llm_tokens_total", "Estimated tokens (~4 chars/token) sent and received.", ["kind"])
+llm_errors = Counter("llm_errors_total", "Provider errors during generation, per attempt.", ["error", "status"])
+
+cancelled_runs = Counter(
+    "research_cancelled_runs_total", "Runs cancelled because the client disconnected.", ["endpoint"]
+)
+cancel_abandoned = Counter(
+    "research_cancel_abandoned_total", "Work in flight when a run was cancelled.", ["kind"]
+)
+cancel_saved = Counter(
+    "research_cancel_saved_total", "Planned work never started because a run was cancelled.", ["kind"]
+)
+
+_REGISTRY = [
+    node_duration,
+    node_errors,
+    search_duration,
+    search_results,
+    search_cache,
+    search_bytes,
+    search_errors,
+    llm_duration,
+    llm_calls,
+    llm_tokens,
+    llm_errors,
+    cancelled_runs,
+    cancel_abandoned,
+    cancel_saved,
+]
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ------------- Per-request trace -------------
+
+_trace: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("debug_trace", default=None)
+
+
+def start_trace() -> List[Dict[str, Any]]:
+    """
+    Collect spans for the current request (context-local, like payload
+    tracking); tasks and threads spawned from here append to the same list.
+    """
+    spans: List[Dict[str, Any]] = []
+    _trace.set(spans)
+    return spans
+
+
+def _span(kind: str, started: float, **fields: Any) -> None:
+    spans = _trace.get()
+    if spans is None or len(spans) >= TRACE_MAX_SPANS:
+        return
+    spans.append({"kind": kind, "ms": round((time.perf_counter() - started) * 1000, 1), **fields})
+
+
+# ------------- Hooks -------------
+
+
+def instrument_node(name: str, fn: Callable) -> Callable:
+    """
+    Wrap an async graph node with timing; returns the node unchanged when
+    metrics are disabled, so there is no per-call cost at all.
+    """
+    if not METRICS_ENABLED:
+        return fn
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        error = None
+        try:
+            return await fn(*args, **kwargs)
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            node_duration.observe((name, "error" if error else "ok"), time.perf_counter() - started)
+            if error:
+                node_errors.inc((name, error))
+            _span("node", started, name=name, **({"error": error} if error else {}))
+
+    return wrapper
+
+
+def observe_search(
+    topic: str,
+    query: str,
+    started: float,
+    results: Optional[int] = None,
+    error: Optional[BaseException] = None,
+) -> None:
+    if not METRICS_ENABLED:
+        return
+    search_duration.observe((topic, "error" if error else "ok"), time.perf_counter() - started)
+    if error is not None:
+        search_errors.inc((topic, type(error).__name__))
+        _span("tavily", started, topic=topic, query=query, error=type(error).__name__)
+        return
+    search_results.observe((topic,), results or 0)
+    _span("tavily", started, topic=topic, query=query, results=results)
+
+
+def count_search_cache(topic: str, hit: bool) -> None:
+    if METRICS_ENABLED:
+        search_cache.inc((topic, "hit" if hit else "miss"))
+
+
+def count_search_bytes(topic: str, received: int) -> None:
+    if METRICS_ENABLED:
+        search_bytes.inc((topic,), received)
+
+
+def observe_llm(mode: str, cache: str, started: float, prompt_chars: int, text: str) -> None:
+    """
+    One generation call. cache is "memory" / "disk" / "miss" / "off";
+    the outcome comes from the "[HF LLM ...]" sentinels ("[HF LLM TIMEOUT]"
+    is only passed in here, never returned to callers).
+    """
+    if not METRICS_ENABLED:
+        return
+    if text.startswith("[HF LLM NOT CONFIGURED"):
+        outcome = "not_configured"
+    elif text.endswith("[HF LLM TIMEOUT]"):
+        outcome = "timeout"
+    elif "[HF LLM ERROR]" in text:
+        outcome = "error"
+    else:
+        outcome = "ok"
+    llm_duration.observe((mode, cache), time.perf_counter() - started)
+    llm_calls.inc((mode, cache, outcome))
+    prompt_tokens = prompt_chars // 4
+    completion_tokens = len(text) // 4
+    if cache in ("miss", "off"):
+        llm_tokens.inc(("prompt",), prompt_tokens)
+        llm_tokens.inc(("completion",), completion_tokens)
+    _span(
+        "llm",
+        started,
+        mode=mode,
+        cache=cache,
+        outcome=outcome,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+    )
+
+
+def count_llm_error(error: BaseException, status: Optional[int]) -> None:
+    if METRICS_ENABLED:
+        llm_errors.inc((type(error).__name__, str(status) if status else "none"))
+
+
+def count_cancellation(endpoint: str, abandoned: Dict[str, float], saved: Dict[str, float]) -> None:
+    if not METRICS_ENABLED:
+        return
+    cancelled_runs.inc((endpoint,))
+    for kind, amount in abandoned.items():
+        cancel_abandoned.inc((kind,), amount)
+    for kind, amount in saved.items():
+        cancel_saved.inc((kind,), amount)
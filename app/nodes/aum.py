@@ -1,22 +1,51 @@
-from ..state import ResearchState, EvidenceItem
-from ..tools import tavily_aum_search, with_manager_aums_tool
+from typing import Any, Dict, List
 
+from ..deadline import within_deadline
+from ..evidence_store import get_store
+from ..plans import search_options, topic_planned
+from ..refresh import fetch_stamp, reuse_topic
+from ..state import ResearchState
+from ..tools import tavily_aum_search, with_manager_aums_tool, result_snippet
 
-async def aum_node(state: ResearchState) -> ResearchState:
+
+async def aum_node(state: ResearchState) -> Dict[str, Any]:
     company = state.identity_basics.get("name") or ""
     if not company:
-        return state
+        return {}
+
+    # Execution plan (planner_node): this memo depth skips the topic
+    if not topic_planned(state.plan, "aum"):
+        return {}
+
+    # Refresh mode: keep the previous run's evidence while it is fresh
+    reused = reuse_topic(state, "aum")
+    if reused is not None:
+        return reused
+
+    store = get_store(state.run_id)
+    # Searches cut off by the request deadline; the node keeps what arrived
+    timed_out: List[Dict[str, Any]] = []
+
+    aum_data: List[int] = []
 
     # Web-based AUM hints
-    results = await tavily_aum_search(company)
+    results = await within_deadline(
+        tavily_aum_search(company, **search_options(state.plan)),
+        [],
+        timed_out,
+        source="tavily",
+        node="aum",
+        search="aum",
+    )
     for res in results:
-        state.aum_data.append(
-            EvidenceItem(
+        aum_data.append(
+            store.add(
                 source="tavily",
                 url=res.get("url"),
-                snippet=res.get("content") or res.get("raw_content", "")[:800],
+                snippet=result_snippet(res),
                 as_of=res.get("published_date"),
                 topic="aum",
+                score=res.get("score"),
             )
         )
 
@@ -25,8 +54,8 @@ async def aum_node(state: ResearchState) -> ResearchState:
     if manager_id:
         aums = await with_manager_aums_tool(manager_id)
         for rec in aums:
-            state.aum_data.append(
-                EvidenceItem(
+            aum_data.append(
+                store.add(
                     source="with_intelligence",
                     url=None,
                     snippet=str(rec),
@@ -35,4 +64,8 @@ async def aum_node(state: ResearchState) -> ResearchState:
                 )
             )
 
-    return state
+    # Delta update: only the fields this node produced
+    return {
+        "aum_data": aum_data,
+        **fetch_stamp("aum", timed_out),
+    }
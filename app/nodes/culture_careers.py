@@ -1,22 +1,54 @@
-from ..state import ResearchState, EvidenceItem
-from ..tools import tavily_culture_reviews_search
+from typing import Any, Dict, List
 
+from ..deadline import within_deadline
+from ..evidence_store import get_store
+from ..plans import search_options, topic_planned
+from ..refresh import fetch_stamp, reuse_topic
+from ..state import ResearchState
+from ..tools import tavily_culture_reviews_search, result_snippet
 
-async def culture_careers_node(state: ResearchState) -> ResearchState:
+
+async def culture_careers_node(state: ResearchState) -> Dict[str, Any]:
     company = state.identity_basics.get("name") or ""
     if not company:
-        return state
+        return {}
+
+    # Execution plan (planner_node): this memo depth skips the topic
+    if not topic_planned(state.plan, "culture_careers"):
+        return {}
+
+    # Refresh mode: keep the previous run's evidence while it is fresh
+    reused = reuse_topic(state, "culture_careers")
+    if reused is not None:
+        return reused
+
+    store = get_store(state.run_id)
+    # Searches cut off by the request deadline; the node keeps what arrived
+    timed_out: List[Dict[str, Any]] = []
+
+    company_culture_data: List[int] = []
 
-    results = await tavily_culture_reviews_search(company)
+    results = await within_deadline(
+        tavily_culture_reviews_search(company, **search_options(state.plan)),
+        [],
+        timed_out,
+        source="tavily",
+        node="culture_careers",
+        search="culture reviews",
+    )
     for res in results:
-        state.company_culture_data.append(
-            EvidenceItem(
+        company_culture_data.append(
+            store.add(
                 source="tavily",
                 url=res.get("url"),
-                snippet=res.get("content") or res.get("raw_content", "")[:800],
+                snippet=result_snippet(res),
                 as_of=res.get("published_date"),
                 topic="culture_careers",
+                score=res.get("score"),
             )
         )
 
-    return state
+    return {
+        "company_culture_data": company_culture_data,
+        **fetch_stamp("culture_careers", timed_out),
+    }
@@ -1,25 +1,184 @@
-from typing import Set
-from ..state import ResearchState, EvidenceItem
+import heapq
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from ..evidence_store import EvidenceStore, get_store
+from ..state import ResearchState
 
+# Jaccard similarity of word shingles above which two snippets are duplicates
+NEAR_DUP_THRESHOLD = float(os.getenv("CURATION_NEAR_DUP_THRESHOLD", "0.8"))
+SHINGLE_SIZE = 3
+SKETCH_SIZE = 16
+# Snippets compared pairwise per sketch value; later ones sharing the value
+# are only compared with the bucket's first member, so boilerplate shared
+# by every snippet costs linear, not quadratic, comparisons.
+MAX_BUCKET_SIZE = int(os.getenv("CURATION_MAX_BUCKET_SIZE", "32"))
 
-async def curation_node(state: ResearchState) -> ResearchState:
-    seen: Set[str] = set()
+_WORD_RE = re.compile(r"\w+")
+
+
+def _shingles(text: str) -> Set[int]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {hash(" ".join(words))} if words else set()
+    return {
+        hash(" ".join(words[i : i + SHINGLE_SIZE]))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def _parse_as_of(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _near_duplicate_groups(snippets: List[str]) -> List[List[int]]:
+    """
+    Group positions whose snippets are near-duplicates.
+
+    Each snippet gets a bottom-k MinHash sketch (the SKETCH_SIZE smallest
+    shingle hashes). Snippets that share a sketch value become candidate
+    pairs, which are confirmed with exact Jaccard on the shingle sets, so
+    we never compare every pair. Past MAX_BUCKET_SIZE members a bucket's
+    newcomers are paired with its first member only.
+    """
+    shingles = [_shingles(text) for text in snippets]
+
+    buckets: Dict[int, List[int]] = defaultdict(list)
+    overflow: List[Tuple[int, int]] = []
+    for pos, sh in enumerate(shingles):
+        for value in heapq.nsmallest(SKETCH_SIZE, sh):
+            bucket = buckets[value]
+            if len(bucket) < MAX_BUCKET_SIZE:
+                bucket.append(pos)
+            else:
+                overflow.append((bucket[0], pos))
+
+    parent = list(range(len(snippets)))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    checked: Set[Tuple[int, int]] = set()
+
+    def compare(a: int, b: int) -> None:
+        if (a, b) in checked or find(a) == find(b):
+            return
+        checked.add((a, b))
+        sa, sb = shingles[a], shingles[b]
+        union = len(sa | sb)
+        if union and len(sa & sb) / union >= NEAR_DUP_THRESHOLD:
+            parent[find(b)] = find(a)
+
+    for members in buckets.values():
+        for i, a in enumerate(members):
+            for b in members[i + 1 :]:
+                compare(a, b)
+    for a, b in overflow:
+        compare(a, b)
 
-    def add_unique(items):
-        for ev in items:
-            key = ev.url or ev.snippet[:80]
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for pos in range(len(snippets)):
+        groups[find(pos)].append(pos)
+    return list(groups.values())
+
+
+def _collapse(store: EvidenceStore, ids: List[int]) -> Tuple[List[int], Dict[str, int]]:
+    kept: List[Tuple[int, int]] = []
+    removed = 0
+    removed_chars = 0
+    min_time = datetime.min.replace(tzinfo=timezone.utc)
+
+    for group in _near_duplicate_groups([store.snippet[i] for i in ids]):
+        if len(group) == 1:
+            kept.append((group[0], ids[group[0]]))
+            continue
+
+        members = [ids[pos] for pos in group]
+        dated = [(_parse_as_of(store.as_of[i]), store.as_of[i]) for i in members]
+        freshest = max(dated, key=lambda d: d[0] or min_time)[1]
+        scores = [store.score(i) for i in members]
+        best_score = max((sc for sc in scores if sc is not None), default=None)
+
+        # Highest-scoring copy wins; the earliest one if nobody has a score
+        best = max(range(len(members)), key=lambda m: (scores[m] or 0.0, -m))
+        best_id = members[best]
+        merged_id = store.add_merged(members, best_id, as_of=freshest, score=best_score)
+        kept.append((min(group), merged_id))
+
+        for evidence_id in members:
+            if evidence_id != best_id:
+                removed += 1
+                removed_chars += len(store.snippet[evidence_id])
+
+    kept.sort(key=lambda pair: pair[0])
+    stats = {
+        "near_duplicates_removed": removed,
+        # ~4 characters per token
+        "estimated_tokens_removed": removed_chars // 4,
+    }
+    return [evidence_id for _, evidence_id in kept], stats
+
+
+def curate(store: EvidenceStore, id_lists: List[List[int]]) -> Tuple[List[int], Dict[str, int]]:
+    """
+    URL dedupe (first list wins) followed by near-duplicate collapsing;
+    shared by the curation node and the per-section nodes. Rows an earlier
+    call already merged are replaced by their merged row up front, so every
+    section of a run cites the same id for the same evidence and repeated
+    calls add no rows.
+    """
+    seen: Set[str] = set()
+    curated: List[int] = []
+    for ids in id_lists:
+        for evidence_id in ids:
+            evidence_id = store.canonical(evidence_id)
+            key = store.url[evidence_id] or store.snippet[evidence_id][:80]
             if key in seen:
                 continue
             seen.add(key)
-            state.curated_evidence.append(ev)
-
-    add_unique(state.fundamentals_data)
-    add_unique(state.positioning_data)
-    add_unique(state.leadership_data)
-    add_unique(state.aum_data)
-    add_unique(state.founding_story_data)
-    add_unique(state.outlook_data)
-    add_unique(state.career_growth_data)
-    add_unique(state.company_culture_data)
-
-    return state
+            curated.append(evidence_id)
+
+    # Syndicated / mirrored copies survive the URL check; collapse them too
+    return _collapse(store, curated)
+
+
+async def curation_node(state: ResearchState) -> Dict[str, Any]:
+    store = get_store(state.run_id)
+    curated, stats = curate(
+        store,
+        [
+            state.fundamentals_data,
+            state.positioning_data,
+            state.leadership_data,
+            state.aum_data,
+            state.founding_story_data,
+            state.outlook_data,
+            state.career_growth_data,
+            state.company_culture_data,
+        ],
+    )
+    if stats["near_duplicates_removed"]:
+        print(
+            f"[Curation] Removed {stats['near_duplicates_removed']} near-duplicate "
+            f"snippets (~{stats['estimated_tokens_removed']} tokens)."
+        )
+
+    return {
+        "curated_evidence": curated,
+        "run_stats": {"curation": stats},
+    }
@@ -1,35 +1,83 @@
-from ..state import ResearchState, EvidenceItem
-from ..tools import tavily_overview_search, tavily_strategy_news_search
+import asyncio
+from typing import Any, Dict, List
 
+from ..deadline import within_deadline
+from ..evidence_store import get_store
+from ..plans import search_options, topic_planned
+from ..refresh import fetch_stamp, reuse_topic
+from ..state import ResearchState
+from ..tools import tavily_overview_search, tavily_strategy_news_search, result_snippet
 
-async def fundamentals_node(state: ResearchState) -> ResearchState:
+
+async def fundamentals_node(state: ResearchState) -> Dict[str, Any]:
     company = state.identity_basics.get("name") or ""
     if not company:
-        return state
+        return {}
+
+    # Execution plan (planner_node): this memo depth skips the topic
+    if not topic_planned(state.plan, "fundamentals"):
+        return {}
+
+    # Refresh mode: keep the previous run's evidence while it is fresh
+    reused = reuse_topic(state, "fundamentals")
+    if reused is not None:
+        return reused
+
+    store = get_store(state.run_id)
+    # Searches cut off by the request deadline; the node keeps what arrived
+    timed_out: List[Dict[str, Any]] = []
+
+    # Both at once: the strategy news query is the same one outlook_strategy
+    # runs, and only overlapping calls share a single search (singleflight)
+    options = search_options(state.plan)
+    overview_results, strategy_results = await asyncio.gather(
+        within_deadline(
+            tavily_overview_search(company, **options),
+            [],
+            timed_out,
+            source="tavily",
+            node="fundamentals",
+            search="overview",
+        ),
+        within_deadline(
+            tavily_strategy_news_search(company, **options),
+            [],
+            timed_out,
+            source="tavily",
+            node="fundamentals",
+            search="strategy news",
+        ),
+    )
 
-    overview_results = await tavily_overview_search(company)
-    strategy_results = await tavily_strategy_news_search(company)
+    fundamentals_data: List[int] = []
+    positioning_data: List[int] = []
 
     for res in overview_results:
-        state.fundamentals_data.append(
-            EvidenceItem(
+        fundamentals_data.append(
+            store.add(
                 source="tavily",
                 url=res.get("url"),
-                snippet=res.get("content") or res.get("raw_content", "")[:800],
+                snippet=result_snippet(res),
                 as_of=res.get("published_date"),
                 topic="fundamentals",
+                score=res.get("score"),
             )
         )
 
     for res in strategy_results:
-        state.positioning_data.append(
-            EvidenceItem(
+        positioning_data.append(
+            store.add(
                 source="tavily",
                 url=res.get("url"),
-                snippet=res.get("content") or res.get("raw_content", "")[:800],
+                snippet=result_snippet(res),
                 as_of=res.get("published_date"),
                 topic="market_positioning",
+                score=res.get("score"),
             )
         )
 
-    return state
+    return {
+        "fundamentals_data": fundamentals_data,
+        "positioning_data": positioning_data,
+        **fetch_stamp("fundamentals", timed_out),
+    }
@@ -1,23 +1,55 @@
-from ..state import ResearchState, EvidenceItem
-from ..tools import tavily_leadership_search
+from typing import Any, Dict, List
 
+from ..deadline import within_deadline
+from ..evidence_store import get_store
+from ..plans import search_options, topic_planned
+from ..refresh import fetch_stamp, reuse_topic
+from ..state import ResearchState
+from ..tools import tavily_leadership_search, result_snippet
 
-async def leadership_node(state: ResearchState) -> ResearchState:
+
+async def leadership_node(state: ResearchState) -> Dict[str, Any]:
     company = state.identity_basics.get("name") or ""
     if not company:
-        return state
+        return {}
+
+    # Execution plan (planner_node): this memo depth skips the topic
+    if not topic_planned(state.plan, "leadership"):
+        return {}
+
+    # Refresh mode: keep the previous run's evidence while it is fresh
+    reused = reuse_topic(state, "leadership")
+    if reused is not None:
+        return reused
+
+    store = get_store(state.run_id)
+    # Searches cut off by the request deadline; the node keeps what arrived
+    timed_out: List[Dict[str, Any]] = []
+
+    leadership_data: List[int] = []
 
-    results = await tavily_leadership_search(company)
+    results = await within_deadline(
+        tavily_leadership_search(company, **search_options(state.plan)),
+        [],
+        timed_out,
+        source="tavily",
+        node="leadership",
+        search="leadership",
+    )
 
     for res in results:
-        state.leadership_data.append(
-            EvidenceItem(
+        leadership_data.append(
+            store.add(
                 source="tavily",
                 url=res.get("url"),
-                snippet=res.get("content") or res.get("raw_content", "")[:800],
+                snippet=result_snippet(res),
                 as_of=res.get("published_date"),
                 topic="leadership",
+                score=res.get("score"),
             )
         )
 
-    return state
+    return {
+        "leadership_data": leadership_data,
+        **fetch_stamp("leadership", timed_out),
+    }
@@ -1,22 +1,54 @@
-from ..state import ResearchState, EvidenceItem
-from ..tools import tavily_strategy_news_search
+from typing import Any, Dict, List
 
+from ..deadline import within_deadline
+from ..evidence_store import get_store
+from ..plans import search_options, topic_planned
+from ..refresh import fetch_stamp, reuse_topic
+from ..state import ResearchState
+from ..tools import tavily_strategy_news_search, result_snippet
 
-async def outlook_strategy_node(state: ResearchState) -> ResearchState:
+
+async def outlook_strategy_node(state: ResearchState) -> Dict[str, Any]:
     company = state.identity_basics.get("name") or ""
     if not company:
-        return state
+        return {}
+
+    # Execution plan (planner_node): this memo depth skips the topic
+    if not topic_planned(state.plan, "outlook_strategy"):
+        return {}
+
+    # Refresh mode: keep the previous run's evidence while it is fresh
+    reused = reuse_topic(state, "outlook_strategy")
+    if reused is not None:
+        return reused
+
+    store = get_store(state.run_id)
+    # Searches cut off by the request deadline; the node keeps what arrived
+    timed_out: List[Dict[str, Any]] = []
+
+    outlook_data: List[int] = []
 
-    results = await tavily_strategy_news_search(company)
+    results = await within_deadline(
+        tavily_strategy_news_search(company, **search_options(state.plan)),
+        [],
+        timed_out,
+        source="tavily",
+        node="outlook_strategy",
+        search="strategy news",
+    )
     for res in results:
-        state.outlook_data.append(
-            EvidenceItem(
+        outlook_data.append(
+            store.add(
                 source="tavily",
                 url=res.get("url"),
-                snippet=res.get("content") or res.get("raw_content", "")[:800],
+                snippet=result_snippet(res),
                 as_of=res.get("published_date"),
                 topic="outlook",
+                score=res.get("score"),
             )
         )
 
-    return state
+    return {
+        "outlook_data": outlook_data,
+        **fetch_stamp("outlook_strategy", timed_out),
+    }
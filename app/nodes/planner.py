@@ -1,8 +1,13 @@
 # app/nodes/planner.py
+import uuid
+from typing import Any, Dict
+
+from ..identity import resolve_identity
+from ..plans import build_plan
 from ..state import ResearchState
 
 
-async def planner_node(state: ResearchState) -> ResearchState:
+async def planner_node(state: ResearchState) -> Dict[str, Any]:
     """
     Initialize or normalize identity_basics using what we already have.
     No Bullhorn / ATS / employee-id logic.
@@ -11,12 +16,19 @@ async def planner_node(state: ResearchState) -> ResearchState:
     # What we got from the API (set in main.py)
     basics = dict(state.identity_basics) if state.identity_basics else {}
 
-    name = basics.get("name") or "Unknown Company"
-    website = basics.get("website") or "N/A"
     industry = basics.get("industry") or "N/A"
 
+    # One key per company for caches and dedupe: legal suffixes, case and
+    # punctuation folded, website reduced to its domain, and variants
+    # mapped to a canonical company key through the alias index. Searches
+    # and prompts use the key's canonical spelling, so every variant
+    # builds the same queries and prompts (and hits the same cache entries).
+    identity = await resolve_identity(basics.get("name") or "", basics.get("website"))
+    name = identity["name"]
+    website = identity["domain"] or "N/A"
+
     # Normalize and enrich identity_basics
-    state.identity_basics = {
+    identity_basics = {
         **basics,
         "name": name,
         "website": website,
@@ -24,9 +36,21 @@ async def planner_node(state: ResearchState) -> ResearchState:
     }
 
     # Simple description other nodes can reuse
-    state.ats_description = (
+    ats_description = (
         f"{name} is a company in the {industry} sector. "
         f"Website: {website}."
     )
 
-    return state
+    # Which topics, searches and sections this memo depth pays for
+    plan = state.plan or build_plan(state.memo_depth)
+
+    return {
+        # Evidence store key; the API sets one per request, scripts may not
+        "run_id": state.run_id or uuid.uuid4().hex,
+        "identity_basics": identity_basics,
+        # Canonical company key; caches and dedupe key on this, not the name
+        "external_ids": {"company_key": identity["key"]},
+        "ats_description": ats_description,
+        "plan": plan,
+        "run_stats": {"plan": plan, "company_key": identity["key"]},
+    }
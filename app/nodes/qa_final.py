@@ -1,10 +1,23 @@
+from typing import Any, Dict, List
+
+from ..evidence_store import get_store
+from ..plans import topic_planned
+from ..refresh import save_snapshot
 from ..state import ResearchState, DiscrepancyFlag
+from .section_writer import SECTION_SPECS
+
+
+# Sections below this confidence are reported in run_stats
+LOW_CONFIDENCE = 0.5
 
 
-async def qa_final_node(state: ResearchState) -> ResearchState:
-    # Simple QA: warn if no AUM evidence
-    if not any(ev.topic == "aum" for ev in state.curated_evidence):
-        state.discrepancy_flags.append(
+async def qa_final_node(state: ResearchState) -> Dict[str, Any]:
+    new_flags: List[DiscrepancyFlag] = []
+
+    # Simple QA: warn if no AUM evidence (unless the plan skipped AUM)
+    store = get_store(state.run_id)
+    if topic_planned(state.plan, "aum") and not store.ids_for_topic(state.curated_evidence, "aum"):
+        new_flags.append(
             DiscrepancyFlag(
                 section_key="financial_capacity",
                 field="aum",
@@ -14,8 +27,29 @@ async def qa_final_node(state: ResearchState) -> ResearchState:
             )
         )
 
-    # For now just copy drafts
-    state.cleaned_drafts = dict(state.drafts)
+    # Everything the request deadline cut off, so the memo says what is missing
+    for entry in state.timed_out:
+        if entry.get("source") == "hf_llm":
+            section_key, message = entry["section"], "Section generation hit the request deadline."
+        else:
+            section_key = entry.get("node", "")
+            message = f"{entry.get('source')} {entry.get('search')} search hit the request deadline."
+        new_flags.append(
+            DiscrepancyFlag(
+                section_key=section_key,
+                field="deadline",
+                message=message,
+                severity="warning",
+                sources=[entry.get("source", "")],
+            )
+        )
+
+    # Sections may finish in any order; the memo follows SECTION_SPECS
+    order = {key: i for i, key in enumerate(SECTION_SPECS)}
+    cleaned_drafts = dict(
+        sorted(state.drafts.items(), key=lambda item: order.get(item[0], len(order)))
+    )
+    discrepancy_flags = list(state.discrepancy_flags) + new_flags
 
     # Build markdown
     lines = []
@@ -28,18 +62,58 @@ async def qa_final_node(state: ResearchState) -> ResearchState:
     lines.append(f"- **Industry:** {state.identity_basics.get('industry', 'N/A')}")
     lines.append("")
 
-    for key, draft in state.cleaned_drafts.items():
+    for key, draft in cleaned_drafts.items():
         lines.append(f"## {draft.title}")
         lines.append(draft.text.strip())
         lines.append("")
 
-    if state.discrepancy_flags:
+    if discrepancy_flags:
         lines.append("## QA / Discrepancies")
-        for flag in state.discrepancy_flags:
+        for flag in discrepancy_flags:
             lines.append(
                 f"- **[{flag.severity.upper()}] {flag.field} ({flag.section_key})** – {flag.message}"
             )
         lines.append("")
 
-    state.final_report_markdown = "\n".join(lines)
-    return state
+    # Evidence + drafts for the next incremental refresh of this company
+    await save_snapshot(state, cleaned_drafts, store)
+
+    return {
+        "discrepancy_flags": new_flags,
+        "cleaned_drafts": cleaned_drafts,
+        "final_report_markdown": "\n".join(lines),
+        "run_stats": _section_stats(state, cleaned_drafts),
+    }
+
+
+def _section_stats(state: ResearchState, drafts: Dict[str, Any]) -> Dict[str, Any]:
+    runs = state.section_runs
+    stats: Dict[str, Any] = {
+        "sections": {
+            status: [key for key in drafts if runs.get(key, {}).get("status") == status]
+            for status in ("recomputed", "reused")
+        }
+    }
+    # generation_mode="combined": which sections came from a combined
+    # completion and which fell back to their own call
+    for generation in ("combined", "fallback"):
+        keys = [key for key in drafts if runs.get(key, {}).get("generation") == generation]
+        if keys:
+            stats["sections"][generation] = keys
+    # Per-section curation (GRAPH_SCHEDULING=sections) dedupes each
+    # section's inputs separately; the curation node reports totals otherwise
+    curation = {
+        key: {field: runs[key][field] for field in ("near_duplicates_removed", "estimated_tokens_removed")}
+        for key in drafts
+        if "near_duplicates_removed" in runs.get(key, {})
+    }
+    if curation:
+        stats["curation"] = curation
+    # Failed or weak sections (LLM errors, partial evidence); such a memo
+    # is served to this caller but not cached for others
+    low_confidence = [key for key, draft in drafts.items() if draft.confidence < LOW_CONFIDENCE]
+    if low_confidence:
+        stats["sections"]["low_confidence"] = low_confidence
+    if state.timed_out:
+        stats["timed_out"] = list(state.timed_out)
+    return stats
@@ -1,114 +1,181 @@
-from typing import List, Dict, Tuple
+import asyncio
+import json
+import os
+import re
+import weakref
+from typing import Any, Callable, List, Dict, Optional, Tuple
 
-from ..state import ResearchState, SectionDraft, EvidenceItem
-from ..llm import generate_section_with_hf
+from langchain_core.runnables import RunnableConfig
+from langgraph.config import get_stream_writer
+
+from ..state import ResearchState, SectionDraft
+from ..cancellation import note_section
+from ..deadline import DeadlineExceeded
+from ..evidence_index import EvidenceIndex
+from ..evidence_store import get_store
+from ..llm import agenerate_section_with_hf, astream_section_with_hf
+from ..plans import planned_sections, section_budget
+from ..refresh import TOPIC_NODES, section_fingerprint
+from .curation import curate
+
+# How many sections of one memo may be generated at the same time
+SECTION_CONCURRENCY = int(os.getenv("SECTION_CONCURRENCY", "4"))
+
+# Evidence snippets per section prompt (ranked, so fewer are needed)
+SECTION_MAX_EVIDENCE = int(os.getenv("SECTION_MAX_EVIDENCE", "6"))
+
+SECTION_MAX_TOKENS = 600
+
+# generation_mode="combined": sections written per completion
+SECTION_GROUP_SIZE = int(os.getenv("SECTION_GROUP_SIZE", "4"))
+
+SYSTEM_PROMPT = (
+    "You are a senior equity research analyst writing memos for a recruiting firm. "
+    "Your tone is neutral, factual and concise. "
+    "Never invent hard numbers (AUM, years, headcount) if they are not clearly "
+    "stated in the evidence. Prefer qualitative wording instead of fabricating numbers."
+)
 
 
 SECTION_SPECS: Dict[str, Dict] = {
     "overview": {
         "title": "Short Overview of the Company",
         "topics": ["fundamentals"],
+        "query": "company overview business profile headquarters clients services products",
     },
     "leadership": {
         "title": "Current Partners / Executives",
         "topics": ["leadership", "founders"],
+        "query": "chief executive officer ceo partner founder managing director president chairman leadership team",
     },
     "financial_capacity": {
         "title": "Financial / Business Capacity (AUM)",
         "topics": ["aum"],
+        "query": "assets under management aum billion million capital funds raised",
     },
     "founding_story": {
         "title": "Founding Story",
         "topics": ["founding_story", "fundamentals"],
+        "query": "founded founder history established origins started year",
     },
     "business_outlook": {
         "title": "Current Business Outlook",
         "topics": ["outlook", "aspiration"],
+        "query": "outlook growth strategy expansion plans market conditions",
     },
     "market_significance": {
         "title": "Significance in the Market",
-        "topics": ["market_significance", "positioning"],
+        "topics": ["market_significance", "positioning", "market_positioning"],
+        "query": "market position leading largest competitors share clients significance",
     },
     "aspiration": {
         "title": "Aspiration",
         "topics": ["aspiration"],
+        "query": "mission vision aims ambition values",
     },
     "future_goals": {
         "title": "Company Future and Goals",
         "topics": ["future_goals", "outlook"],
+        "query": "future goals plans expansion launch new strategy targets",
     },
     "career_growth": {
         "title": "Professional Career Growth Opportunity",
         "topics": ["career_growth"],
+        "query": "career growth training promotion development opportunities employees",
     },
     "culture": {
         "title": "Company Culture",
         "topics": ["company_culture", "culture_careers"],
+        "query": "culture employees work environment reviews values benefits",
     },
 }
 
 
+# Evidence topic label -> the topic node that produces it
+EVIDENCE_TOPIC_NODES: Dict[str, str] = {
+    "fundamentals": "fundamentals",
+    "market_positioning": "fundamentals",
+    "leadership": "leadership",
+    "aum": "aum",
+    "outlook": "outlook_strategy",
+    "culture_careers": "culture_careers",
+}
+
+
+def section_dependencies(spec: Dict) -> List[str]:
+    """Topic nodes whose evidence a section reads, in first-use order."""
+    nodes: List[str] = []
+    for topic in spec["topics"]:
+        node = EVIDENCE_TOPIC_NODES.get(topic)
+        if node is not None and node not in nodes:
+            nodes.append(node)
+    return nodes
+
+
+# Per-run section slots, so SECTION_CONCURRENCY still applies when every
+# section is its own graph node
+_run_slots: "weakref.WeakValueDictionary[str, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+
+
+def _slots_for(run_id: Optional[str]) -> asyncio.Semaphore:
+    semaphore = _run_slots.get(run_id or "")
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(max(1, SECTION_CONCURRENCY))
+        _run_slots[run_id or ""] = semaphore
+    return semaphore
+
+
+def _evidence_line(store, position: int, evidence_id: int) -> str:
+    # Labelled by position, not store id: ids depend on which topic node
+    # finished first, and the prompt must not (it keys the completion cache)
+    return (
+        f"[{position}] Source={store.source(evidence_id)}, "
+        f"Topic={store.topic(evidence_id)}, AsOf={store.as_of[evidence_id]}\n"
+        f"{store.snippet[evidence_id].strip()}"
+    )
+
+
 def _build_evidence_context(
-    all_evidence: List[EvidenceItem],
+    index: EvidenceIndex,
     topics: List[str],
-    max_items: int = 8,
+    query: str,
+    max_items: int = SECTION_MAX_EVIDENCE,
 ) -> Tuple[str, List[int]]:
+    store = index.store
     selected_lines: List[str] = []
-    used_indexes: List[int] = []
+    used_ids: List[int] = []
 
-    for idx, ev in enumerate(all_evidence):
-        if topics and ev.topic not in topics:
-            continue
-
-        line = (
-            f"[{idx}] Source={ev.source}, Topic={ev.topic}, AsOf={ev.as_of}\n"
-            f"{ev.snippet.strip()}"
-        )
-        selected_lines.append(line)
-        used_indexes.append(idx)
-
-        if len(selected_lines) >= max_items:
-            break
+    # Best-ranked evidence first, instead of the first N in insertion order
+    for position, evidence_id in enumerate(index.search(query, topics, max_items), 1):
+        selected_lines.append(_evidence_line(store, position, evidence_id))
+        used_ids.append(evidence_id)
 
     if not selected_lines:
         return "No direct evidence found for this section.", []
 
-    return "\n\n".join(selected_lines), used_indexes
+    return "\n\n".join(selected_lines), used_ids
 
 
-async def section_writer_node(state: ResearchState) -> ResearchState:
+def _identity_block(state: ResearchState) -> str:
     company_name = state.identity_basics.get("name", "the company")
     website = state.identity_basics.get("website", "N/A")
     industry = state.identity_basics.get("industry", "N/A")
     ats_desc = state.ats_description or "N/A"
 
-    system_prompt = (
-        "You are a senior equity research analyst writing memos for a recruiting firm. "
-        "Your tone is neutral, factual and concise. "
-        "Never invent hard numbers (AUM, years, headcount) if they are not clearly "
-        "stated in the evidence. Prefer qualitative wording instead of fabricating numbers."
-    )
-
-    for key, spec in SECTION_SPECS.items():
-        title = spec["title"]
-        topics = spec["topics"]
+    return f"""Company identity:
+- Name: {company_name}
+- Website: {website}
+- Industry: {industry}
+- Additional description: {ats_desc}"""
 
-        context_text, evidence_ids = _build_evidence_context(
-            state.curated_evidence,
-            topics=topics,
-            max_items=8,
-        )
 
-        user_prompt = f"""
+def _build_user_prompt(state: ResearchState, title: str, context_text: str) -> str:
+    return f"""
 You are writing ONE section of a company research memo.
 
 Section title: "{title}"
 
-Company identity:
-- Name: {company_name}
-- Website: {website}
-- Industry: {industry}
-- Additional description: {ats_desc}
+{_identity_block(state)}
 
 Use ONLY the evidence snippets below. Do not hallucinate facts
 that are not supported by the evidence.
@@ -122,20 +189,381 @@ Do NOT mention the evidence indexes or refer to 'snippets' explicitly.
 If evidence is weak or missing, write a cautious, high-level paragraph instead of guessing.
 """
 
-        text = generate_section_with_hf(
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            max_tokens=600,
-            temperature=0.35,
+
+def _build_group_prompt(state: ResearchState, store, pending: List[Tuple[str, str, List[int], str]]) -> str:
+    # Identity and shared evidence go in once for the whole group,
+    # numbered in the order the sections rank them
+    positions: Dict[int, int] = {}
+    for _, _, ids, _ in pending:
+        for evidence_id in ids:
+            positions.setdefault(evidence_id, len(positions) + 1)
+    context_text = (
+        "\n\n".join(_evidence_line(store, position, evidence_id) for evidence_id, position in positions.items())
+        or "No direct evidence found for these sections."
+    )
+    section_lines = "\n".join(
+        f'- {key}: "{title}" (evidence: {", ".join(str(positions[i]) for i in ids) or "none"})'
+        for key, title, ids, _ in pending
+    )
+    keys = ", ".join(key for key, _, _, _ in pending)
+
+    return f"""
+You are writing SEVERAL sections of a company research memo.
+
+{_identity_block(state)}
+
+Use ONLY the evidence snippets below. Do not hallucinate facts
+that are not supported by the evidence.
+
+Evidence snippets (each has an index in square brackets):
+
+{context_text}
+
+Sections to write (key: title, and the evidence most relevant to it):
+{section_lines}
+
+For each section write 1–3 short paragraphs in clear, recruiter-friendly language.
+Do NOT mention the evidence indexes or refer to 'snippets' explicitly.
+If evidence is weak or missing, write a cautious, high-level paragraph instead of guessing.
+
+Return ONLY a JSON object with exactly these keys: {keys}
+Each value is that section's text as a string, paragraphs separated by \\n\\n.
+No markdown fences and no text outside the JSON object.
+"""
+
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+
+
+def _parse_group_output(text: str, keys: List[str]) -> Dict[str, str]:
+    """
+    Section texts from a combined completion; keys that are missing or not
+    usable text are left out (and fall back to their own call).
+    """
+    if "HF LLM" in text:
+        return {}
+    body = _FENCE_RE.sub("", text.strip())
+    start, end = body.find("{"), body.rfind("}")
+    if start < 0 or end <= start:
+        return {}
+    try:
+        data = json.loads(body[start : end + 1])
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    sections: Dict[str, str] = {}
+    for key in keys:
+        value = data.get(key, data.get(SECTION_SPECS[key]["title"]))
+        if isinstance(value, list) and all(isinstance(v, str) for v in value):
+            value = "\n\n".join(value)
+        if isinstance(value, str) and value.strip():
+            sections[key] = value.strip()
+    return sections
+
+
+def _reuse_previous(
+    state: ResearchState,
+    key: str,
+    title: str,
+    evidence_ids: List[int],
+    fingerprint: str,
+    writer: Optional[Callable[[Dict[str, Any]], None]],
+) -> Optional[SectionDraft]:
+    # Refresh mode: same evidence as last time -> carry the text over verbatim
+    previous = state.previous_drafts.get(key)
+    if previous is None or previous.fingerprint != fingerprint or "HF LLM" in previous.text:
+        return None
+    if writer is not None:
+        writer({"event": "section_reused", "key": key, "title": title})
+    return previous.model_copy(update={"evidence_refs": evidence_ids})
+
+
+TIMEOUT_TEXT = "This section could not be written within the request's time budget."
+
+
+def _missing_sources(state: ResearchState, key: str) -> List[str]:
+    """Searches feeding this section that were cut off by the request deadline."""
+    nodes = section_dependencies(SECTION_SPECS[key])
+    return [
+        f"{entry.get('source')} {entry.get('search')} search"
+        for entry in state.timed_out
+        if entry.get("node") in nodes
+    ]
+
+
+def _draft(
+    state: ResearchState,
+    key: str,
+    text: str,
+    evidence_ids: List[int],
+    fingerprint: Optional[str],
+    cut_off: bool = False,
+) -> SectionDraft:
+    """
+    A fresh draft; sources or generation cut off by the request deadline
+    add caveats and lower the confidence.
+    """
+    text = text.strip()
+    confidence = 0.75 if "HF LLM" not in text else 0.2
+    caveats: List[str] = []
+
+    missing = _missing_sources(state, key)
+    if missing:
+        caveats.append(f"Partial evidence: {', '.join(missing)} timed out.")
+        confidence = min(confidence, 0.45)
+    if cut_off:
+        # Never carried over by a refresh (fingerprint=None)
+        fingerprint = None
+        if text:
+            caveats.append("Text was cut short at the request deadline.")
+            confidence = min(confidence, 0.3)
+        else:
+            text = TIMEOUT_TEXT
+            caveats.append("Not written: the request deadline passed before the model answered.")
+            confidence = 0.0
+
+    return SectionDraft(
+        title=SECTION_SPECS[key]["title"],
+        key=key,
+        text=text,
+        confidence=confidence,
+        caveats=caveats,
+        evidence_refs=evidence_ids,
+        fingerprint=fingerprint,
+    )
+
+
+def _budget(state: ResearchState, key: str) -> Tuple[int, int]:
+    # (max_tokens, max_evidence) from the execution plan, else the defaults
+    return section_budget(state.plan, key, SECTION_MAX_TOKENS, SECTION_MAX_EVIDENCE)
+
+
+def section_token_budgets(plan: Dict[str, Any]) -> Dict[str, int]:
+    """Completion token budget of every section the plan writes."""
+    return {
+        key: section_budget(plan, key, SECTION_MAX_TOKENS, SECTION_MAX_EVIDENCE)[0]
+        for key in planned_sections(plan, list(SECTION_SPECS))
+    }
+
+
+async def _write_section(
+    state: ResearchState,
+    index: EvidenceIndex,
+    key: str,
+    spec: Dict,
+    semaphore: asyncio.Semaphore,
+    writer: Optional[Callable[[Dict[str, Any]], None]] = None,
+    timed_out: Optional[List[Dict[str, Any]]] = None,
+) -> Tuple[SectionDraft, bool]:
+    """
+    Returns the draft and whether it was (re)generated by the LLM. A call
+    cut off by the request deadline is recorded in `timed_out`.
+    """
+    title = spec["title"]
+    topics = spec["topics"]
+    max_tokens, max_evidence = _budget(state, key)
+
+    context_text, evidence_ids = _build_evidence_context(
+        index,
+        topics=topics,
+        query=f"{title} {spec.get('query', '')}",
+        max_items=max_evidence,
+    )
+    fingerprint = section_fingerprint(index.store, state.identity_basics, title, evidence_ids)
+
+    previous = _reuse_previous(state, key, title, evidence_ids, fingerprint, writer)
+    if previous is not None:
+        return previous, False
+
+    note_section(key)
+    user_prompt = _build_user_prompt(state, title, context_text)
+
+    cut_off = False
+    async with semaphore:
+        if writer is None:
+            try:
+                text = await agenerate_section_with_hf(
+                    system_prompt=SYSTEM_PROMPT,
+                    user_prompt=user_prompt,
+                    max_tokens=max_tokens,
+                    temperature=0.35,
+                )
+            except DeadlineExceeded:
+                text, cut_off = "", True
+        else:
+            # Token streaming: forward each delta to the graph's custom stream
+            writer({"event": "section_started", "key": key, "title": title})
+            parts: List[str] = []
+            try:
+                async for delta in astream_section_with_hf(
+                    system_prompt=SYSTEM_PROMPT,
+                    user_prompt=user_prompt,
+                    max_tokens=max_tokens,
+                    temperature=0.35,
+                ):
+                    parts.append(delta)
+                    writer({"event": "section_token", "key": key, "text": delta})
+            except DeadlineExceeded:
+                # Keep whatever streamed before the deadline
+                cut_off = True
+            text = "".join(parts)
+            writer({"event": "section_finished", "key": key})
+
+    if cut_off and timed_out is not None:
+        timed_out.append({"source": "hf_llm", "section": key})
+    return _draft(state, key, text, evidence_ids, fingerprint, cut_off), True
+
+
+async def _write_group(
+    state: ResearchState,
+    index: EvidenceIndex,
+    keys: List[str],
+    semaphore: asyncio.Semaphore,
+    writer: Optional[Callable[[Dict[str, Any]], None]] = None,
+    timed_out: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Tuple[SectionDraft, bool, str]]:
+    """
+    Write several sections with one JSON completion. Returns
+    {key: (draft, generated, mode)}; sections the completion did not
+    deliver are written one call each (mode "fallback").
+    """
+    results: Dict[str, Tuple[SectionDraft, bool, str]] = {}
+    pending: List[Tuple[str, str, List[int], str]] = []
+    for key in keys:
+        spec = SECTION_SPECS[key]
+        _, evidence_ids = _build_evidence_context(
+            index,
+            topics=spec["topics"],
+            query=f"{spec['title']} {spec.get('query', '')}",
+            max_items=_budget(state, key)[1],
         )
+        fingerprint = section_fingerprint(index.store, state.identity_basics, spec["title"], evidence_ids)
+        previous = _reuse_previous(state, key, spec["title"], evidence_ids, fingerprint, writer)
+        if previous is not None:
+            results[key] = (previous, False, "reused")
+        else:
+            note_section(key)
+            pending.append((key, spec["title"], evidence_ids, fingerprint))
 
-        state.drafts[key] = SectionDraft(
-            title=title,
-            key=key,
-            text=text.strip(),
-            confidence=0.75 if "HF LLM" not in text else 0.2,
-            caveats=[],
-            evidence_refs=evidence_ids,
+    fallback = [key for key, _, _, _ in pending]
+    if len(pending) > 1:
+        async with semaphore:
+            try:
+                text = await agenerate_section_with_hf(
+                    system_prompt=SYSTEM_PROMPT,
+                    user_prompt=_build_group_prompt(state, index.store, pending),
+                    max_tokens=sum(_budget(state, key)[0] for key, _, _, _ in pending),
+                    temperature=0.35,
+                )
+            except DeadlineExceeded:
+                # The per-section fallbacks record their own timeouts
+                text = ""
+        sections = _parse_group_output(text, fallback)
+        for key, title, evidence_ids, fingerprint in pending:
+            if key not in sections:
+                continue
+            if writer is not None:
+                writer({"event": "section_started", "key": key, "title": title})
+                writer({"event": "section_token", "key": key, "text": sections[key]})
+                writer({"event": "section_finished", "key": key})
+            results[key] = (_draft(state, key, sections[key], evidence_ids, fingerprint), True, "combined")
+        fallback = [key for key in fallback if key not in sections]
+        if fallback:
+            print(f"[SectionWriter] Combined output missing {fallback}; writing them one by one.")
+
+    written = await asyncio.gather(
+        *(
+            _write_section(state, index, key, SECTION_SPECS[key], semaphore, writer, timed_out)
+            for key in fallback
         )
+    )
+    for key, (draft, generated) in zip(fallback, written):
+        results[key] = (draft, generated, "fallback" if len(pending) > 1 else "single")
+    return results
+
+
+def _groups(keys: List[str]) -> List[List[str]]:
+    size = max(1, SECTION_GROUP_SIZE)
+    return [keys[i : i + size] for i in range(0, len(keys), size)]
+
+
+async def _write_sections(
+    state: ResearchState,
+    index: EvidenceIndex,
+    keys: List[str],
+    writer: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Drafts and section_runs for the planned sections among `keys`, in
+    either generation mode.
+    """
+    keys = planned_sections(state.plan, keys)
+    semaphore = _slots_for(state.run_id)
+    runs: Dict[str, Tuple[SectionDraft, bool, str]] = {}
+    timed_out: List[Dict[str, Any]] = []
+    if state.generation_mode == "combined":
+        for group in await asyncio.gather(
+            *(_write_group(state, index, group, semaphore, writer, timed_out) for group in _groups(keys))
+        ):
+            runs.update(group)
+    else:
+        # gather() keeps the given order, so the memo layout stays deterministic
+        results = await asyncio.gather(
+            *(
+                _write_section(state, index, key, SECTION_SPECS[key], semaphore, writer, timed_out)
+                for key in keys
+            )
+        )
+        for key, (draft, generated) in zip(keys, results):
+            runs[key] = (draft, generated, "single")
+
+    return {
+        "drafts": {key: runs[key][0] for key in keys},
+        "section_runs": {
+            key: {"status": "recomputed" if runs[key][1] else "reused", "generation": runs[key][2]}
+            for key in keys
+        },
+        "timed_out": timed_out,
+    }
+
+
+async def section_writer_node(
+    state: ResearchState,
+    config: Optional[RunnableConfig] = None,
+) -> Dict[str, Any]:
+    # One retrieval index per run, shared by every section
+    index = EvidenceIndex(get_store(state.run_id), state.curated_evidence)
+
+    # Streaming callers (POST /research/stream) ask for per-token events
+    configurable = (config or {}).get("configurable", {})
+    writer = get_stream_writer() if configurable.get("stream_tokens") else None
+
+    return await _write_sections(state, index, list(SECTION_SPECS), writer)
+
+
+def section_node(keys: List[str]) -> Callable:
+    """
+    Graph node that curates and writes sections from the evidence of the
+    topic nodes they depend on (GRAPH_SCHEDULING=sections). All keys must
+    share the same dependencies.
+    """
+    fields = [field for node in section_dependencies(SECTION_SPECS[keys[0]]) for field in TOPIC_NODES[node][0]]
+
+    async def node(state: ResearchState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+        store = get_store(state.run_id)
+        curated, stats = curate(store, [getattr(state, field) for field in fields])
+        index = EvidenceIndex(store, curated)
+
+        configurable = (config or {}).get("configurable", {})
+        writer = get_stream_writer() if configurable.get("stream_tokens") else None
+
+        update = await _write_sections(state, index, keys, writer)
+        for run in update["section_runs"].values():
+            run.update(stats)
+        update["curated_evidence"] = curated
+        return update
 
-    return state
+    node.__name__ = f"section_{'_'.join(keys)}_node"
+    return node
@@ -0,0 +1,76 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+# Per memo_depth execution plans, built by planner_node and honored by the
+# topic nodes, the graph's section routing and the section writer.
+#   topics:   topic nodes that search at all
+#   search:   Tavily options for every query of those nodes
+#   sections: SECTION_SPECS keys to write (None = all of them)
+#   max_tokens / max_evidence: per-section LLM and prompt budgets, with
+#   optional per-section overrides in section_budgets
+DEPTH_PLANS: Dict[str, Dict[str, Any]] = {
+    "brief": {
+        "topics": ["fundamentals", "leadership", "aum"],
+        "search": {"search_depth": "basic", "max_results": 4},
+        "sections": ["overview", "leadership", "financial_capacity", "market_significance"],
+        "max_tokens": 300,
+        "max_evidence": 4,
+        "section_budgets": {"overview": {"max_tokens": 400}},
+    },
+    "standard": {
+        "topics": ["fundamentals", "leadership", "aum", "outlook_strategy", "culture_careers"],
+        "search": {"search_depth": "advanced", "max_results": 8},
+        "sections": None,
+        "max_tokens": 600,
+        "max_evidence": 6,
+        "section_budgets": {},
+    },
+    "detailed": {
+        "topics": ["fundamentals", "leadership", "aum", "outlook_strategy", "culture_careers"],
+        "search": {"search_depth": "advanced", "max_results": 10},
+        "sections": None,
+        "max_tokens": 900,
+        "max_evidence": 10,
+        "section_budgets": {},
+    },
+}
+
+DEFAULT_DEPTH = "standard"
+
+
+def build_plan(memo_depth: str) -> Dict[str, Any]:
+    """
+    Execution plan for a memo depth; unknown depths get the standard plan.
+    """
+    depth = (memo_depth or "").strip().lower()
+    if depth not in DEPTH_PLANS:
+        depth = DEFAULT_DEPTH
+    return {"depth": depth, **DEPTH_PLANS[depth]}
+
+
+# ------------- Lookups (no plan = run everything with node defaults) -------------
+
+
+def topic_planned(plan: Dict[str, Any], node: str) -> bool:
+    return not plan or node in plan["topics"]
+
+
+def search_options(plan: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(plan.get("search") or {})
+
+
+def planned_sections(plan: Dict[str, Any], keys: List[str]) -> List[str]:
+    sections: Optional[List[str]] = plan.get("sections") if plan else None
+    if sections is None:
+        return list(keys)
+    return [key for key in keys if key in sections]
+
+
+def section_budget(plan: Dict[str, Any], key: str, max_tokens: int, max_evidence: int) -> Tuple[int, int]:
+    """(max_tokens, max_evidence) for one section; the arguments are the defaults."""
+    if not plan:
+        return max_tokens, max_evidence
+    override = plan.get("section_budgets", {}).get(key, {})
+    return (
+        override.get("max_tokens", plan.get("max_tokens", max_tokens)),
+        override.get("max_evidence", plan.get("max_evidence", max_evidence)),
+    )
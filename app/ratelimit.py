@@ -0,0 +1,209 @@
+import asyncio
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+RETRY_BASE_S = float(os.getenv("RETRY_BASE_S", "0.5"))
+RETRY_MAX_S = float(os.getenv("RETRY_MAX_S", "20"))
+
+# Status codes worth retrying: throttling and transient upstream failures
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Classic token bucket. `rate` tokens are added per second up to
+    `capacity`; acquire() waits (FIFO) until enough tokens are available.
+    A non-positive rate disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Take `amount` tokens; returns how long we waited."""
+        if self.rate <= 0:
+            return 0.0
+
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def available(self) -> float:
+        if self.rate <= 0:
+            return float("inf")
+        self._refill()
+        return self.tokens
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limit: +1 per window of successes, halve on throttling.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self) -> None:
+        self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def on_throttle(self) -> None:
+        self.limit = max(float(self.minimum), self.limit / 2)
+
+
+class ProviderLimiter:
+    """
+    Shared limiter for one upstream provider: request rate, optional
+    token-per-minute budget (LLMs) and adaptive concurrency.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_s: float,
+        burst: float,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        tokens_per_min: float = 0.0,
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_s, burst)
+        self.tokens = TokenBucket(tokens_per_min / 60.0, tokens_per_min) if tokens_per_min > 0 else None
+        self.concurrency = AdaptiveConcurrency(
+            initial=max(min_concurrency, max_concurrency // 2),
+            minimum=min_concurrency,
+            maximum=max_concurrency,
+        )
+        self.stats: Dict[str, float] = {
+            "requests": 0,
+            "throttled": 0,
+            "retries": 0,
+            "wait_s": 0.0,
+        }
+
+    @asynccontextmanager
+    async def slot(self, tokens: float = 0.0):
+        started = time.monotonic()
+        await self.requests.acquire(1.0)
+        if self.tokens is not None and tokens:
+            await self.tokens.acquire(tokens)
+        await self.concurrency.acquire()
+        self.stats["wait_s"] += time.monotonic() - started
+        self.stats["requests"] += 1
+        try:
+            yield
+        finally:
+            await self.concurrency.release()
+
+    def on_success(self) -> None:
+        self.concurrency.on_success()
+
+    def on_throttle(self) -> None:
+        self.stats["throttled"] += 1
+        self.concurrency.on_throttle()
+
+    async def backoff(self, attempt: int, retry_after_s: Optional[float] = None) -> None:
+        """Sleep before retry number `attempt` (0-based)."""
+        self.stats["retries"] += 1
+        await asyncio.sleep(backoff_delay(attempt, retry_after_s))
+
+    def snapshot(self) -> Dict[str, Any]:
+        snap: Dict[str, Any] = {
+            **self.stats,
+            "wait_s": round(self.stats["wait_s"], 3),
+            "requests_per_s": self.requests.rate,
+            "request_tokens_available": round(self.requests.available(), 2),
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+        }
+        if self.tokens is not None:
+            snap["llm_tokens_available"] = round(self.tokens.available(), 1)
+        return snap
+
+
+def backoff_delay(attempt: int, retry_after_s: Optional[float] = None) -> float:
+    """
+    Full-jitter exponential backoff, never shorter than Retry-After.
+    """
+    delay = random.uniform(0, min(RETRY_MAX_S, RETRY_BASE_S * (2 ** attempt)))
+    if retry_after_s is not None:
+        delay = max(delay, min(retry_after_s, RETRY_MAX_S))
+    return delay
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Retry-After may be delta-seconds or an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+tavily_limiter = ProviderLimiter(
+    "tavily",
+    requests_per_s=float(os.getenv("TAVILY_RPS", "5")),
+    burst=float(os.getenv("TAVILY_BURST", "10")),
+    max_concurrency=int(os.getenv("TAVILY_MAX_CONCURRENCY", "16")),
+)
+
+hf_limiter = ProviderLimiter(
+    "huggingface",
+    requests_per_s=float(os.getenv("HF_RPS", "2")),
+    burst=float(os.getenv("HF_BURST", "4")),
+    max_concurrency=int(os.getenv("HF_MAX_CONCURRENCY", "8")),
+    tokens_per_min=float(os.getenv("HF_TOKENS_PER_MIN", "60000")),
+)
+
+
+def rate_limit_stats() -> Dict[str, Any]:
+    return {
+        "tavily": tavily_limiter.snapshot(),
+        "huggingface": hf_limiter.snapshot(),
+    }
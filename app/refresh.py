@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .evidence_store import EvidenceStore
+from .kv_store import SqliteKV
+from .search_cache import SEARCH_CACHE_DEFAULT_TTL_S, SEARCH_CACHE_TTL_S
+from .state import ResearchState, SectionDraft
+
+load_dotenv()
+
+MEMO_SNAPSHOTS_ENABLED = os.getenv("MEMO_SNAPSHOTS_ENABLED", "true").lower() in ("1", "true", "yes")
+MEMO_SNAPSHOT_PATH = os.getenv("MEMO_SNAPSHOT_PATH", ".cache/memo_snapshots.sqlite3")
+MEMO_SNAPSHOT_MAX_BYTES = int(float(os.getenv("MEMO_SNAPSHOT_MAX_MB", "128")) * 1024 * 1024)
+
+# State fields each topic node fills, and the search topic whose TTL decides
+# when its evidence is stale (fundamentals also runs the news search).
+TOPIC_NODES: Dict[str, Tuple[List[str], str]] = {
+    "fundamentals": (["fundamentals_data", "positioning_data"], "news"),
+    "leadership": (["leadership_data"], "general"),
+    "aum": (["aum_data"], "finance"),
+    "outlook_strategy": (["outlook_data"], "news"),
+    "culture_careers": (["company_culture_data"], "general"),
+}
+
+_store = SqliteKV(MEMO_SNAPSHOT_PATH, MEMO_SNAPSHOT_MAX_BYTES)
+
+
+def topic_ttl_s(node: str) -> float:
+    search_topic = TOPIC_NODES[node][1]
+    return SEARCH_CACHE_TTL_S.get(search_topic, SEARCH_CACHE_DEFAULT_TTL_S)
+
+
+def snapshot_key(company_key: str, memo_depth: str) -> str:
+    # Canonical company key (app/identity.py), so spelling variants share snapshots
+    raw = json.dumps([company_key, memo_depth.strip().lower()])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ------------- Reuse inside the graph -------------
+
+
+def reuse_topic(state: ResearchState, node: str) -> Optional[Dict[str, Any]]:
+    """
+    The previous run's evidence for a topic node, as a state delta, if it
+    is still within the topic's TTL; None means search again.
+    """
+    prev = state.refresh_evidence.get(node)
+    if not prev or time.time() - prev["fetched_at"] > topic_ttl_s(node):
+        return None
+    return {**prev["fields"], "topic_fetched_at": {node: prev["fetched_at"]}}
+
+
+def fetch_stamp(node: str, timed_out: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    State delta marking a topic node's searches as done. Evidence cut short
+    by the request deadline is reported instead of stamped, so it is never
+    reused by a refresh.
+    """
+    if timed_out:
+        return {"timed_out": timed_out}
+    return {"topic_fetched_at": {node: time.time()}}
+
+
+def section_fingerprint(store: EvidenceStore, identity: Dict[str, Any], title: str, evidence_ids: List[int]) -> str:
+    """
+    Hash of what a section is generated from: its title, the company
+    identity and the snippets behind evidence_refs. Store ids differ per
+    run, so snippets are compared by content hash (order-insensitive).
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps([title, identity.get("name"), identity.get("website"), identity.get("industry")]).encode("utf-8"))
+    for digest in sorted(hashlib.sha1(store.snippet[i].encode("utf-8")).digest() for i in evidence_ids):
+        h.update(digest)
+    return h.hexdigest()
+
+
+# ------------- Snapshots -------------
+
+
+def _row(store: EvidenceStore, evidence_id: int) -> List[Any]:
+    # Positional arguments of EvidenceStore.add
+    return [
+        store.source(evidence_id),
+        store.snippet[evidence_id],
+        store.url[evidence_id],
+        store.as_of[evidence_id],
+        store.topic(evidence_id),
+        store.score(evidence_id),
+    ]
+
+
+def _build_snapshot(state: ResearchState, drafts: Dict[str, SectionDraft], store: EvidenceStore) -> str:
+    topics: Dict[str, Any] = {}
+    for node, (fields, _) in TOPIC_NODES.items():
+        fetched_at = state.topic_fetched_at.get(node)
+        if fetched_at is None:
+            continue
+        topics[node] = {
+            "fetched_at": fetched_at,
+            "fields": {
+                field: [_row(store, i) for i in getattr(state, field)]
+                for field in fields
+            },
+        }
+    return json.dumps(
+        {
+            "saved_at": time.time(),
+            "topics": topics,
+            "drafts": {key: draft.model_dump() for key, draft in drafts.items()},
+        }
+    )
+
+
+async def save_snapshot(state: ResearchState, drafts: Dict[str, SectionDraft], store: EvidenceStore) -> None:
+    if not MEMO_SNAPSHOTS_ENABLED:
+        return
+    company_key = state.external_ids.get("company_key")
+    if not company_key:
+        return
+    key = snapshot_key(company_key, state.memo_depth)
+    value = _build_snapshot(state, drafts, store)
+    try:
+        await asyncio.to_thread(_store.put, key, value, "memo")
+    except Exception as e:
+        print(f"[Refresh] Could not save memo snapshot: {e}")
+
+
+async def load_snapshot(company_key: str, memo_depth: str) -> Optional[Dict[str, Any]]:
+    if not MEMO_SNAPSHOTS_ENABLED:
+        return None
+    try:
+        raw = await asyncio.to_thread(_store.get, snapshot_key(company_key, memo_depth))
+    except Exception as e:
+        print(f"[Refresh] Could not load memo snapshot: {e}")
+        return None
+    return json.loads(raw) if raw is not None else None
+
+
+def apply_snapshot(
+    snapshot: Dict[str, Any],
+    store: EvidenceStore,
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, SectionDraft]]:
+    """
+    Load a snapshot's evidence into this run's store. Returns the
+    refresh_evidence and previous_drafts state fields.
+    """
+    refresh_evidence: Dict[str, Dict[str, Any]] = {}
+    for node, topic in snapshot.get("topics", {}).items():
+        refresh_evidence[node] = {
+            "fetched_at": topic["fetched_at"],
+            "fields": {
+                field: [store.add(*row) for row in rows]
+                for field, rows in topic["fields"].items()
+            },
+        }
+    drafts = {key: SectionDraft(**d) for key, d in snapshot.get("drafts", {}).items()}
+    return refresh_evidence, drafts
+
+
+def memo_snapshot_stats() -> Dict[str, Any]:
+    return {"enabled": MEMO_SNAPSHOTS_ENABLED, **_store.snapshot()}
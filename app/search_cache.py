@@ -0,0 +1,74 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from .kv_store import SqliteKV
+
+load_dotenv()
+
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", ".cache/search_cache.sqlite3")
+SEARCH_CACHE_MAX_BYTES = int(float(os.getenv("SEARCH_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+# Per-topic freshness: news goes stale much faster than company overviews
+SEARCH_CACHE_TTL_S: Dict[str, float] = {
+    "general": float(os.getenv("SEARCH_CACHE_TTL_GENERAL_S", str(7 * 24 * 3600))),
+    "finance": float(os.getenv("SEARCH_CACHE_TTL_FINANCE_S", str(24 * 3600))),
+    "news": float(os.getenv("SEARCH_CACHE_TTL_NEWS_S", str(6 * 3600))),
+}
+SEARCH_CACHE_DEFAULT_TTL_S = float(os.getenv("SEARCH_CACHE_DEFAULT_TTL_S", str(24 * 3600)))
+
+_store = SqliteKV(SEARCH_CACHE_PATH, SEARCH_CACHE_MAX_BYTES)
+
+
+def cache_key(
+    query: str,
+    topic: str,
+    max_results: int,
+    search_depth: str,
+    include_raw_content: bool = False,
+) -> str:
+    parts: List[Any] = [query, topic, max_results, search_depth]
+    if include_raw_content:
+        parts.append("raw_content")
+    raw = json.dumps(parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _ttl_for(topic: str) -> float:
+    return SEARCH_CACHE_TTL_S.get(topic, SEARCH_CACHE_DEFAULT_TTL_S)
+
+
+async def get_cached_search(key: str, topic: str) -> Optional[List[Dict[str, Any]]]:
+    if not SEARCH_CACHE_ENABLED:
+        return None
+    try:
+        value = await asyncio.to_thread(_store.get, key, _ttl_for(topic))
+    except sqlite3.Error as e:
+        print(f"[Search cache] Read failed: {e}")
+        return None
+    return json.loads(value) if value is not None else None
+
+
+async def put_cached_search(key: str, topic: str, results: List[Dict[str, Any]]) -> None:
+    if not SEARCH_CACHE_ENABLED:
+        return
+    try:
+        await asyncio.to_thread(_store.put, key, json.dumps(results), topic)
+    except sqlite3.Error as e:
+        print(f"[Search cache] Write failed: {e}")
+
+
+def search_cache_stats() -> Dict[str, Any]:
+    stats: Dict[str, Any] = {
+        "enabled": SEARCH_CACHE_ENABLED,
+        "ttl_s": dict(SEARCH_CACHE_TTL_S),
+    }
+    if SEARCH_CACHE_ENABLED:
+        stats.update(_store.snapshot())
+    return stats
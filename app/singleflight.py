@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent async calls into one execution.
+
+    Every caller with the same key awaits the same task, so they all see
+    the same result or the same exception. A caller that is cancelled only
+    stops waiting; the shared task is cancelled once its last waiter leaves.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self.stats: Dict[str, int] = {
+            "executions": 0,
+            "requests_saved": 0,
+        }
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _t, key=key, call=call: self._forget(key, call))
+            self.stats["executions"] += 1
+        else:
+            self.stats["requests_saved"] += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nobody is waiting any more; later callers start afresh
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _Call) -> None:
+        # Only drop the entry if a newer call has not replaced it
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**self.stats, "in_flight": self.in_flight()}
@@ -1,18 +1,51 @@
 # app/state.py
 from typing import List, Dict, Any, Optional, Annotated
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, create_model
 
 
 # -------- Reducers for LangGraph concurrent updates --------
 
+def _item_key(item: Any) -> Any:
+    """
+    Dedupe key for list items: evidence-store ids as they are, anything
+    else (flags, timed-out entries) by repr.
+    """
+    if isinstance(item, (int, str)):
+        return item
+    return repr(item)
+
+
 def merge_dict(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
     """Merge two dicts, with right-hand side overriding."""
+    if not right:
+        return left
     return {**left, **right}
 
 
 def extend_list(left: List[Any], right: List[Any]) -> List[Any]:
-    """Concatenate lists when multiple nodes append evidence, drafts, etc."""
-    return left + right
+    """
+    Append items from `right` that are not already in `left`.
+
+    Idempotent: re-applying an update (or a node echoing back items it
+    received) never duplicates evidence, so lists stay linear in the
+    number of distinct items produced. Evidence ids name store rows, so a
+    repeated id always collapses; other items in `right` are kept as given.
+    """
+    if not right:
+        return left
+    if not left:
+        left = []
+
+    seen = {_item_key(item) for item in left}
+    merged = list(left)
+    for item in right:
+        key = _item_key(item)
+        if key in seen:
+            continue
+        if isinstance(item, int):
+            seen.add(key)
+        merged.append(item)
+    return merged
 
 
 def choose_str(left: Optional[str], right: Optional[str]) -> Optional[str]:
@@ -38,6 +71,8 @@ class SectionDraft(BaseModel):
     confidence: float = 0.0
     caveats: List[str] = Field(default_factory=list)
     evidence_refs: List[int] = Field(default_factory=list)
+    # Hash of the inputs the text was generated from (see app/refresh.py)
+    fingerprint: Optional[str] = None
 
 
 class DiscrepancyFlag(BaseModel):
@@ -51,6 +86,11 @@ class DiscrepancyFlag(BaseModel):
 # ------------------------- Graph state -----------------------
 
 class ResearchState(BaseModel):
+    # -------- Run scope --------
+    # Key of this run's EvidenceStore (app/evidence_store.py). Evidence
+    # fields below hold integer row ids into that store, not EvidenceItems.
+    run_id: Annotated[Optional[str], choose_str] = None
+
     # -------- Identity / grounding --------
     # Identity can be enriched by multiple nodes, so use merge_dict
     identity_basics: Annotated[Dict[str, Any], merge_dict] = Field(
@@ -60,6 +100,13 @@ class ResearchState(BaseModel):
     # How detailed the memo should be; several nodes can touch this
     memo_depth: Annotated[str, choose_str] = "standard"
 
+    # "per_section": one completion per section; "combined": several
+    # sections per JSON completion (app/nodes/section_writer.py)
+    generation_mode: Annotated[str, choose_str] = "per_section"
+
+    # Execution plan for memo_depth (app/plans.py), set by planner_node
+    plan: Dict[str, Any] = Field(default_factory=dict)
+
     # Short natural-language description of the company
     ats_description: Annotated[Optional[str], choose_str] = None
 
@@ -68,52 +115,70 @@ class ResearchState(BaseModel):
         default_factory=dict
     )
 
-    # -------- Topic evidence (raw) --------
-    fundamentals_data: Annotated[List[EvidenceItem], extend_list] = Field(
+    # -------- Topic evidence (raw, as evidence-store ids) --------
+    fundamentals_data: Annotated[List[int], extend_list] = Field(
         default_factory=list
     )
-    positioning_data: Annotated[List[EvidenceItem], extend_list] = Field(
+    positioning_data: Annotated[List[int], extend_list] = Field(
         default_factory=list
     )
-    market_significance_data: Annotated[List[EvidenceItem], extend_list] = Field(
+    market_significance_data: Annotated[List[int], extend_list] = Field(
         default_factory=list
     )
-    leadership_data: Annotated[List[EvidenceItem], extend_list] = Field(
+    leadership_data: Annotated[List[int], extend_list] = Field(
         default_factory=list
     )
-    founders_data: Annotated[List[EvidenceItem], extend_list] = Field(
+    founders_data: Annotated[List[int], extend_list] = Field(
         default_factory=list
     )
-    aum_data: Annotated[List[EvidenceItem], extend_list] = Field(
+    aum_data: Annotated[List[int], extend_list] = Field(
         default_factory=list
     )
-    funds_aum_data: Annotated[List[EvidenceItem], extend_list] = Field(
+    funds_aum_data: Annotated[List[int], extend_list] = Field(
         default_factory=list
     )
-    public_equity_aum_data: Annotated[List[EvidenceItem], extend_list] = Field(
+    public_equity_aum_data: Annotated[List[int], extend_list] = Field(
         default_factory=list
     )
-    founding_story_data: Annotated[List[EvidenceItem], extend_list] = Field(
+    founding_story_data: Annotated[List[int], extend_list] = Field(
         default_factory=list
     )
-    outlook_data: Annotated[List[EvidenceItem], extend_list] = Field(
+    outlook_data: Annotated[List[int], extend_list] = Field(
         default_factory=list
     )
-    aspiration_data: Annotated[List[EvidenceItem], extend_list] = Field(
+    aspiration_data: Annotated[List[int], extend_list] = Field(
         default_factory=list
     )
-    future_goals_data: Annotated[List[EvidenceItem], extend_list] = Field(
+    future_goals_data: Annotated[List[int], extend_list] = Field(
         default_factory=list
     )
-    career_growth_data: Annotated[List[EvidenceItem], extend_list] = Field(
+    career_growth_data: Annotated[List[int], extend_list] = Field(
         default_factory=list
     )
-    company_culture_data: Annotated[List[EvidenceItem], extend_list] = Field(
+    company_culture_data: Annotated[List[int], extend_list] = Field(
         default_factory=list
     )
 
-    # -------- Curation --------
-    curated_evidence: Annotated[List[EvidenceItem], extend_list] = Field(
+    # Calls cut off by the request deadline (app/deadline.py), e.g.
+    # {"source": "tavily", "node": "aum", "search": "aum"}
+    timed_out: Annotated[List[Dict[str, Any]], extend_list] = Field(
+        default_factory=list
+    )
+
+    # When each topic node's evidence was fetched (epoch seconds)
+    topic_fetched_at: Annotated[Dict[str, float], merge_dict] = Field(
+        default_factory=dict
+    )
+
+    # -------- Incremental refresh (input only) --------
+    # Previous run's evidence per topic node, already loaded into this
+    # run's store: {node: {"fetched_at": ts, "fields": {field: [ids]}}}
+    refresh_evidence: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    # Previous run's drafts; reused when their fingerprint is unchanged
+    previous_drafts: Dict[str, SectionDraft] = Field(default_factory=dict)
+
+    # -------- Curation (evidence-store ids) --------
+    curated_evidence: Annotated[List[int], extend_list] = Field(
         default_factory=list
     )
 
@@ -121,6 +186,10 @@ class ResearchState(BaseModel):
     drafts: Annotated[Dict[str, SectionDraft], merge_dict] = Field(
         default_factory=dict
     )
+    # Per-section bookkeeping: {key: {"status": "recomputed" | "reused", ...}}
+    section_runs: Annotated[Dict[str, Dict[str, Any]], merge_dict] = Field(
+        default_factory=dict
+    )
     discrepancy_flags: Annotated[List[DiscrepancyFlag], extend_list] = Field(
         default_factory=list
     )
@@ -133,3 +202,21 @@ class ResearchState(BaseModel):
     key_facts_memory: Annotated[Dict[str, Any], merge_dict] = Field(
         default_factory=dict
     )
+
+    # Per-run counters reported by nodes (e.g. curation dedupe stats)
+    run_stats: Annotated[Dict[str, Any], merge_dict] = Field(
+        default_factory=dict
+    )
+
+
+# What a per-topic branch subgraph (app/graph.py) hands back to the main
+# graph: only reducer-merged keys, so parallel branches never collide.
+BranchOutput = create_model(
+    "BranchOutput",
+    **{
+        name: (field.annotation, field)
+        for name, field in ResearchState.model_fields.items()
+        if name.endswith("_data")
+        or name in ("topic_fetched_at", "timed_out", "curated_evidence", "drafts", "section_runs")
+    },
+)
@@ -1,61 +1,482 @@
+import asyncio
+import codecs
+import json
 import os
-from typing import List, Dict, Any
+import re
+import time
+from contextlib import aclosing
+from contextvars import ContextVar
+from typing import List, Dict, Any, Optional, Tuple
 
 import httpx
 from dotenv import load_dotenv
 
+from .cancellation import note_abandoned
+from .deadline import run_with_deadline
+from .http_client import http_stream
+from .metrics import count_search_bytes, count_search_cache, observe_search
+from .ratelimit import (
+    RETRY_MAX_ATTEMPTS,
+    RETRYABLE_STATUS,
+    parse_retry_after,
+    tavily_limiter,
+)
+from .search_cache import SEARCH_CACHE_ENABLED, cache_key, get_cached_search, put_cached_search
+from .singleflight import SingleFlight
+
 load_dotenv()
 
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 FMP_API_KEY = os.getenv("FMP_API_KEY")
 WITH_API_KEY = os.getenv("WITH_API_KEY")
+# Overridable so benchmarks can point at a local stand-in
+TAVILY_SEARCH_URL = os.getenv("TAVILY_SEARCH_URL", "https://api.tavily.com/search")
+
+# Identical in-flight searches (within a run and across concurrent runs)
+# share a single cache lookup + HTTP request.
+search_flight = SingleFlight("tavily_search")
+
+# Hedged searches: a search with no answer after this many seconds gets one
+# duplicate request and the first answer wins (0 = off). Each hedge is a
+# billed request, so set it near the search latency p95 rather than p50.
+TAVILY_HEDGE_AFTER_S = float(os.getenv("TAVILY_HEDGE_AFTER_S", "0"))
+
+_hedge_stats: Dict[str, int] = {"hedged": 0, "hedges_won": 0}
+
+
+# ------------- Payload policy -------------
+
+# Snippet budget per evidence item (~4 characters per token)
+SNIPPET_MAX_CHARS = int(os.getenv("SNIPPET_MAX_CHARS", "800"))
+# Cap on raw page text kept per result when a caller does ask for it
+RAW_CONTENT_MAX_CHARS = int(os.getenv("RAW_CONTENT_MAX_CHARS", "4000"))
+# Stop reading a search response past this size and keep what was parsed
+TAVILY_MAX_RESPONSE_BYTES = int(os.getenv("TAVILY_MAX_RESPONSE_BYTES", str(4 * 1024 * 1024)))
+
+_payload_stats: Dict[str, int] = {
+    "responses": 0,
+    "bytes_received": 0,
+    "results": 0,
+    "truncated_responses": 0,
+}
+
+# Per-run byte accounting; set by the API layer around each graph run
+_run_payload: ContextVar[Optional[Dict[str, int]]] = ContextVar("run_payload", default=None)
+# Payload of one (possibly shared) fetch; every run that waited on the
+# fetch is credited with it, not only the run that started it
+_fetch_payload: ContextVar[Optional[Dict[str, int]]] = ContextVar("fetch_payload", default=None)
+
+
+def start_payload_tracking() -> Dict[str, int]:
+    """
+    Start counting search payload for the current run (context-local).
+    """
+    stats = {"responses": 0, "bytes_received": 0, "results": 0}
+    _run_payload.set(stats)
+    return stats
+
+
+def payload_stats() -> Dict[str, Any]:
+    return {
+        **_payload_stats,
+        "hedging": {"after_s": TAVILY_HEDGE_AFTER_S, **_hedge_stats},
+        "snippet_max_chars": SNIPPET_MAX_CHARS,
+        "raw_content_max_chars": RAW_CONTENT_MAX_CHARS,
+    }
+
+
+def _bound(text: str, max_chars: int) -> str:
+    text = text.strip()
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    # Prefer ending on a word boundary when one is close by
+    space = cut.rfind(" ")
+    if space > max_chars * 0.8:
+        cut = cut[:space]
+    return cut.rstrip() + "…"
+
+
+def result_snippet(res: Dict[str, Any], max_chars: int = SNIPPET_MAX_CHARS) -> str:
+    """
+    Bounded evidence snippet: Tavily's content, else raw page text.
+    """
+    return _bound(res.get("content") or res.get("raw_content") or "", max_chars)
+
+
+def _trim_result(res: Dict[str, Any]) -> Dict[str, Any]:
+    if res.get("content"):
+        res["content"] = _bound(res["content"], SNIPPET_MAX_CHARS)
+    if res.get("raw_content"):
+        res["raw_content"] = _bound(res["raw_content"], RAW_CONTENT_MAX_CHARS)
+    return res
+
+
+# Characters that change the nesting of a JSON value, and the ones that
+# can end a string
+_STRUCTURE = re.compile(r'[\[\]{}"]')
+_STRING_END = re.compile(r'["\\]')
+
+
+class _ResultsParser:
+    """
+    Incremental parser for the "results" array of a Tavily response.
+
+    Each result object is decoded and trimmed as soon as it has fully
+    arrived, so peak memory is one result plus the read buffer rather than
+    the whole body. Bracket depth and string state carry over between
+    chunks, so every byte is scanned once and only complete objects are
+    decoded.
+    """
+
+    def __init__(self):
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0  # next character of _buf to scan
+        self._start = 0  # where the unfinished item begins in _buf
+        self._depth = 0
+        self._in_string = False
+        self._in_array = False
+        self.done = False
+        self.results: List[Dict[str, Any]] = []
+
+    def feed(self, chunk: bytes) -> None:
+        self._buf += self._utf8.decode(chunk)
+        if not self._in_array:
+            start = self._buf.find('"results"')
+            if start < 0:
+                return
+            bracket = self._buf.find("[", start)
+            if bracket < 0:
+                return
+            self._buf = self._buf[bracket + 1 :]
+            self._in_array = True
+        self._drain()
+
+    def _emit(self, text: str) -> None:
+        try:
+            obj = json.loads(text)
+        except json.JSONDecodeError:
+            return
+        if isinstance(obj, dict):
+            self.results.append(_trim_result(obj))
+
+    def _drain(self) -> None:
+        buf, i = self._buf, self._pos
+        while not self.done:
+            if self._in_string:
+                m = _STRING_END.search(buf, i)
+                if m is None:
+                    i = len(buf)
+                    break
+                if m.group() == "\\":
+                    if m.end() == len(buf):
+                        # Escape split across chunks; rescan it next time
+                        i = m.start()
+                        break
+                    i = m.end() + 1
+                    continue
+                self._in_string = False
+                i = m.end()
+                continue
+
+            m = _STRUCTURE.search(buf, i)
+            if m is None:
+                i = len(buf)
+                break
+            ch, i = m.group(), m.end()
+            if ch == '"':
+                if self._depth == 0:
+                    self._start = m.start()
+                self._in_string = True
+            elif ch in "[{":
+                if self._depth == 0:
+                    self._start = m.start()
+                self._depth += 1
+            elif self._depth == 0:
+                # The "]" closing the results array
+                self.done = True
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(buf[self._start : i])
+                    buf, i = buf[i:], 0
+
+        if self.done or (self._depth == 0 and not self._in_string):
+            # Nothing unfinished: separators and bare scalars are dropped
+            self._buf, self._pos = "", 0
+        else:
+            self._buf, self._pos = buf[self._start :], i - self._start
+            self._start = 0
+
+
+async def _read_results(resp: httpx.Response, topic: str) -> List[Dict[str, Any]]:
+    parser = _ResultsParser()
+    received = 0
+    truncated = False
+
+    # aclosing: we may stop reading early, so close the byte iterator here
+    # rather than leaving it to the garbage collector
+    async with aclosing(resp.aiter_bytes()) as chunks:
+        async for chunk in chunks:
+            received += len(chunk)
+            parser.feed(chunk)
+            if parser.done:
+                break
+            if received > TAVILY_MAX_RESPONSE_BYTES:
+                truncated = True
+                print(f"[Tavily] Response over {TAVILY_MAX_RESPONSE_BYTES} bytes – keeping {len(parser.results)} parsed results.")
+                break
+
+    _payload_stats["responses"] += 1
+    _payload_stats["bytes_received"] += received
+    _payload_stats["results"] += len(parser.results)
+    _payload_stats["truncated_responses"] += int(truncated)
+    count_search_bytes(topic, received)
+
+    fetch = _fetch_payload.get()
+    if fetch is not None:
+        fetch["responses"] += 1
+        fetch["bytes_received"] += received
+        fetch["results"] += len(parser.results)
+
+    return parser.results
+
+
+def _credit_run(receipt: Dict[str, int]) -> None:
+    run = _run_payload.get()
+    if run is not None:
+        for field, value in receipt.items():
+            run[field] += value
 
 
 # ------------- Tavily search helpers -------------
 
 
-async def _tavily_search(query: str, topic: str, max_results: int = 8) -> List[Dict[str, Any]]:
+async def _tavily_search(
+    query: str,
+    topic: str,
+    max_results: int = 8,
+    search_depth: str = "advanced",
+    include_raw_content: bool = False,
+) -> List[Dict[str, Any]]:
     """
     Generic Tavily search wrapper.
     Returns a list of dicts with url/content/etc.
+    Results are served from the persistent search cache while fresh, and
+    identical concurrent calls are coalesced into one request.
+    Raw page text is only requested when include_raw_content is set.
     """
     if not TAVILY_API_KEY:
         return []
 
-    url = "https://api.tavily.com/search"
+    key = cache_key(query, topic, max_results, search_depth, include_raw_content)
+    started = time.perf_counter()
+    try:
+        # Cut off at the search share of the request deadline (the shared
+        # fetch is cancelled once no caller is waiting for it any more)
+        results, receipt = await run_with_deadline(
+            search_flight.do(
+                key,
+                lambda: _tavily_fetch(key, query, topic, max_results, search_depth, include_raw_content),
+            ),
+            f"tavily {topic} search",
+            search=True,
+        )
+    except asyncio.CancelledError:
+        # The run was cancelled (e.g. its client disconnected); the pending
+        # request is closed once no other caller waits for it
+        note_abandoned("tavily")
+        raise
+    except Exception as e:
+        observe_search(topic, query, started, error=e)
+        raise
+    _credit_run(receipt)
+    observe_search(topic, query, started, results=len(results))
+    return results
+
+
+async def _post_search(
+    url: str,
+    payload: Dict[str, Any],
+    headers: Dict[str, str],
+    final_attempt: bool,
+) -> Tuple[int, Optional[float], List[Dict[str, Any]]]:
+    """
+    One search request: (status, Retry-After, results). Retryable statuses
+    are returned to the caller unless this is the last attempt.
+    """
+    async with http_stream("POST", url, json=payload, headers=headers) as resp:
+        if resp.status_code in RETRYABLE_STATUS and not final_attempt:
+            return resp.status_code, parse_retry_after(resp.headers.get("Retry-After")), []
+        resp.raise_for_status()
+        return resp.status_code, None, await _read_results(resp, payload["topic"])
+
+
+async def _hedged_search(
+    url: str,
+    payload: Dict[str, Any],
+    headers: Dict[str, str],
+    final_attempt: bool,
+) -> Tuple[int, Optional[float], List[Dict[str, Any]]]:
+    """
+    _post_search, plus one duplicate request if the first has not answered
+    within TAVILY_HEDGE_AFTER_S. The first successful answer wins and the
+    other request is cancelled.
+    """
+    if TAVILY_HEDGE_AFTER_S <= 0:
+        return await _post_search(url, payload, headers, final_attempt)
+
+    first = asyncio.ensure_future(_post_search(url, payload, headers, final_attempt))
+    pending = {first}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=TAVILY_HEDGE_AFTER_S)
+        if not done:
+            _hedge_stats["hedged"] += 1
+            pending.add(asyncio.ensure_future(_post_search(url, payload, headers, final_attempt)))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        _hedge_stats["hedges_won"] += 1
+                    return task.result()
+        # Every request failed: report the original one's error
+        return first.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _tavily_fetch(
+    key: str,
+    query: str,
+    topic: str,
+    max_results: int,
+    search_depth: str,
+    include_raw_content: bool,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Results of one search, from the cache or Tavily, and the payload it
+    took to get them (credited to every run that waited for it).
+    """
+    receipt = {"responses": 0, "bytes_received": 0, "results": 0}
+    cached = await get_cached_search(key, topic)
+    if SEARCH_CACHE_ENABLED:
+        count_search_cache(topic, hit=cached is not None)
+    if cached is not None:
+        return cached, receipt
+
+    # Runs in the shared task's own context copy
+    _fetch_payload.set(receipt)
+
+    url = TAVILY_SEARCH_URL
     payload = {
         "query": query,
         "topic": topic,
         "max_results": max_results,
-        "search_depth": "advanced",
-        "include_raw_content": "text",
+        "search_depth": search_depth,
+        "include_raw_content": "text" if include_raw_content else False,
     }
     headers = {"Authorization": f"Bearer {TAVILY_API_KEY}"}
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        resp = await client.post(url, json=payload, headers=headers)
-        resp.raise_for_status()
-        return resp.json().get("results", [])
+    attempt = 0
+    while True:
+        final_attempt = attempt + 1 >= RETRY_MAX_ATTEMPTS
+        try:
+            async with tavily_limiter.slot():
+                status, retry_after, results = await _hedged_search(url, payload, headers, final_attempt)
+        except httpx.TransportError:
+            if final_attempt:
+                raise
+            await tavily_limiter.backoff(attempt)
+            attempt += 1
+            continue
+
+        if status in RETRYABLE_STATUS:
+            if status == 429:
+                tavily_limiter.on_throttle()
+            await tavily_limiter.backoff(attempt, retry_after)
+            attempt += 1
+            continue
+
+        tavily_limiter.on_success()
+        break
+
+    # Empty result sets are often transient; don't pin them for a whole TTL
+    if results:
+        await put_cached_search(key, topic, results)
+    return results, receipt
 
 
-async def tavily_overview_search(company_name: str):
-    return await _tavily_search(f"{company_name} overview asset manager", "general")
+async def tavily_overview_search(
+    company_name: str,
+    include_raw_content: bool = False,
+    max_results: int = 8,
+    search_depth: str = "advanced",
+):
+    return await _tavily_search(
+        f"{company_name} overview asset manager", "general",
+        include_raw_content=include_raw_content,
+        max_results=max_results,
+        search_depth=search_depth,
+    )
 
 
-async def tavily_leadership_search(company_name: str):
-    return await _tavily_search(f"{company_name} leadership partners founders", "general")
+async def tavily_leadership_search(
+    company_name: str,
+    include_raw_content: bool = False,
+    max_results: int = 8,
+    search_depth: str = "advanced",
+):
+    return await _tavily_search(
+        f"{company_name} leadership partners founders", "general",
+        include_raw_content=include_raw_content,
+        max_results=max_results,
+        search_depth=search_depth,
+    )
 
 
-async def tavily_aum_search(company_name: str):
-    return await _tavily_search(f"{company_name} assets under management AUM", "finance")
+async def tavily_aum_search(
+    company_name: str,
+    include_raw_content: bool = False,
+    max_results: int = 8,
+    search_depth: str = "advanced",
+):
+    return await _tavily_search(
+        f"{company_name} assets under management AUM", "finance",
+        include_raw_content=include_raw_content,
+        max_results=max_results,
+        search_depth=search_depth,
+    )
 
 
-async def tavily_strategy_news_search(company_name: str):
-    return await _tavily_search(f"{company_name} strategy outlook expansion", "news")
+async def tavily_strategy_news_search(
+    company_name: str,
+    include_raw_content: bool = False,
+    max_results: int = 8,
+    search_depth: str = "advanced",
+):
+    return await _tavily_search(
+        f"{company_name} strategy outlook expansion", "news",
+        include_raw_content=include_raw_content,
+        max_results=max_results,
+        search_depth=search_depth,
+    )
 
 
-async def tavily_culture_reviews_search(company_name: str):
-    return await _tavily_search(f"{company_name} culture careers reviews glassdoor", "general")
+async def tavily_culture_reviews_search(
+    company_name: str,
+    include_raw_content: bool = False,
+    max_results: int = 8,
+    search_depth: str = "advanced",
+):
+    return await _tavily_search(
+        f"{company_name} culture careers reviews glassdoor", "general",
+        include_raw_content=include_raw_content,
+        max_results=max_results,
+        search_depth=search_depth,
+    )
 
 
 # ------------- With Intelligence stubs (safe no-op) -------------
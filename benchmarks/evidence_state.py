@@ -0,0 +1,89 @@
+"""
+Evidence in graph state: EvidenceItem lists vs EvidenceStore ids.
+
+Builds N evidence rows the way the topic nodes do (8 topics, one delta per
+node) and reports retained memory plus the time spent in the extend_list
+reducer merging the deltas into state, for both representations.
+
+    python benchmarks/evidence_state.py [N ...]
+"""
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.evidence_store import EvidenceStore  # noqa: E402
+from app.state import EvidenceItem, extend_list  # noqa: E402
+
+TOPICS = [
+    "fundamentals", "market_positioning", "leadership", "aum",
+    "outlook", "company_culture", "career_growth", "founding_story",
+]
+SOURCES = ["tavily_overview", "tavily_leadership", "tavily_aum", "tavily_news", "tavily_culture"]
+WORDS = "asset management fund capital growth strategy partner client equity market firm team".split()
+
+
+def _rows(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield {
+            "source": SOURCES[i % len(SOURCES)],
+            "url": f"https://example.com/{i}",
+            "snippet": " ".join(rng.choice(WORDS) for _ in range(110))[:800],
+            "as_of": "2024-05-01",
+            "topic": TOPICS[i % len(TOPICS)],
+            "score": rng.random(),
+        }
+
+
+def _deltas(values, parts: int = len(TOPICS)):
+    size = max(1, len(values) // parts)
+    return [values[i : i + size] for i in range(0, len(values), size)]
+
+
+def _merge(deltas):
+    state = []
+    started = time.perf_counter()
+    for delta in deltas:
+        state = extend_list(state, delta)
+    return state, time.perf_counter() - started
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    retained = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained, current
+
+
+def bench(n: int):
+    # Rows are generated inside each measurement so both sides pay for
+    # their own snippet strings
+    items, legacy_bytes = _measure(lambda: [EvidenceItem(**r) for r in _rows(n)])
+    _, legacy_merge_s = _merge(_deltas(items))
+    del items
+
+    def build_store():
+        store = EvidenceStore()
+        return store, [store.add(**r) for r in _rows(n)]
+
+    (store, ids), store_bytes = _measure(build_store)
+    _, store_merge_s = _merge(_deltas(ids))
+
+    return {
+        "items": n,
+        "legacy": {"memory_mb": round(legacy_bytes / 2**20, 2), "merge_ms": round(legacy_merge_s * 1000, 2)},
+        "store": {"memory_mb": round(store_bytes / 2**20, 2), "merge_ms": round(store_merge_s * 1000, 2)},
+    }
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [1_000, 10_000]
+    print(json.dumps([bench(n) for n in sizes], indent=2))
@@ -0,0 +1,395 @@
+"""
+Offline end-to-end benchmark of the research pipeline.
+
+Starts the local Tavily / HF stand-ins (benchmarks/stub_servers.py), then
+for every mode and concurrency level runs a fresh worker process that
+drives either graph.ainvoke directly ("graph") or POST /research through
+the ASGI app ("api"), once per section generation mode and memo depth.
+Each worker reports latency percentiles, throughput, per-node wall time,
+searches, LLM calls and estimated tokens, peak RSS and event-loop lag; the
+combined report is
+printed (and optionally written) as JSON so runs can be diffed across
+commits.
+
+    python benchmarks/pipeline.py --levels 1,10,50,200 --modes graph,api \\
+        --generation-modes per_section,combined --memo-depths brief,standard,detailed \\
+        --search-latency-ms 150 --llm-latency-ms 400 --error-rate 0.02 --out bench.json
+
+Caches, memo snapshots and provider rate limits are disabled in the
+workers so every run does the full amount of work (--rate-limits keeps the
+limits from the environment / .env).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[rank]
+
+
+def _summary(values: List[float], scale: float = 1.0, digits: int = 4) -> Dict[str, Optional[float]]:
+    def fmt(v: Optional[float]) -> Optional[float]:
+        return None if v is None else round(v * scale, digits)
+
+    return {
+        "p50": fmt(_percentile(values, 50)),
+        "p95": fmt(_percentile(values, 95)),
+        "p99": fmt(_percentile(values, 99)),
+        "max": fmt(max(values) if values else None),
+    }
+
+
+# ------------- Worker (one mode x concurrency level) -------------
+
+
+class _LoopLag:
+    """
+    Samples how late a periodic sleep wakes up; a blocked event loop shows
+    up directly as lag.
+    """
+
+    def __init__(self, interval_s: float = 0.01):
+        self.interval_s = interval_s
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval_s)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval_s))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+def _node_timer():
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class NodeTimer(BaseCallbackHandler):
+        # Called on the event loop; keeps timing overhead off executors
+        run_inline = True
+
+        def __init__(self):
+            self._started: Dict[Any, Any] = {}
+            self.durations: Dict[str, List[float]] = defaultdict(list)
+
+        def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+            node = (metadata or {}).get("langgraph_node")
+            # Only the node's own run, not runnables nested inside it
+            if node and kwargs.get("name") == node:
+                self._started[run_id] = (node, time.perf_counter())
+
+        def _finish(self, run_id) -> None:
+            started = self._started.pop(run_id, None)
+            if started is not None:
+                node, t0 = started
+                self.durations[node].append(time.perf_counter() - t0)
+
+        def on_chain_end(self, outputs, *, run_id, **kwargs):
+            self._finish(run_id)
+
+        def on_chain_error(self, error, *, run_id, **kwargs):
+            self._finish(run_id)
+
+    return NodeTimer()
+
+
+def _usage() -> Dict[str, float]:
+    from app import metrics
+
+    # Histogram rows are [per-bucket counts..., +Inf count, sum]
+    searches = sum(sum(row[:-1]) for row in metrics.search_duration._values.values())
+    calls = sum(metrics.llm_calls._values.values())
+    tokens = {labels[0]: value for labels, value in metrics.llm_tokens._values.items()}
+    return {
+        "searches": searches,
+        "llm_calls": calls,
+        "prompt_tokens": tokens.get("prompt", 0.0),
+        "completion_tokens": tokens.get("completion", 0.0),
+    }
+
+
+async def _worker(mode: str, concurrency: int, runs: int, generation_mode: str, memo_depth: str) -> Dict[str, Any]:
+    import httpx
+
+    import main
+    from app.evidence_store import release_store
+    from app.graph import build_graph
+    from app.state import ResearchState
+
+    timer = _node_timer()
+    latencies: List[float] = []
+    errors: List[str] = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def timed(i: int, call) -> None:
+        async with slots:
+            started = time.perf_counter()
+            try:
+                await call(i)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+
+    async with main.lifespan(main.app):
+        if mode == "graph":
+            graph = build_graph().with_config(callbacks=[timer])
+
+            async def call(i: int) -> None:
+                state = ResearchState(
+                    run_id=uuid.uuid4().hex,
+                    identity_basics={"name": f"Bench Co {i}", "website": "N/A", "industry": "N/A"},
+                    generation_mode=generation_mode,
+                    memo_depth=memo_depth,
+                )
+                try:
+                    await graph.ainvoke(state)
+                finally:
+                    release_store(state.run_id)
+
+            client = None
+        else:
+            main.graph_app = main.graph_app.with_config(callbacks=[timer])
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=main.app),
+                base_url="http://bench",
+                timeout=None,
+            )
+
+            async def call(i: int) -> None:
+                resp = await client.post(
+                    "/research", json={
+                        "company_name": f"Bench Co {i}",
+                        "generation_mode": generation_mode,
+                        "memo_depth": memo_depth,
+                    },
+                )
+                resp.raise_for_status()
+
+        lag = _LoopLag()
+        lag.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(timed(i, call) for i in range(runs)))
+        wall_s = time.perf_counter() - started
+        await lag.stop()
+        if client is not None:
+            await client.aclose()
+
+    peak_rss_mb = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_rss_mb = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+    usage = _usage()
+    return {
+        "mode": mode,
+        "generation_mode": generation_mode,
+        "memo_depth": memo_depth,
+        "concurrency": concurrency,
+        "runs": runs,
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "wall_s": round(wall_s, 3),
+        "throughput_runs_per_s": round(len(latencies) / wall_s, 3) if wall_s else None,
+        "latency_s": _summary(latencies),
+        "nodes": {
+            node: {
+                "count": len(values),
+                "mean_s": round(sum(values) / len(values), 4),
+                **{k: v for k, v in _summary(values).items() if k in ("p50", "p95")},
+            }
+            for node, values in sorted(timer.durations.items())
+        },
+        "per_run": {k: round(v / runs, 1) for k, v in usage.items()},
+        "peak_rss_mb": peak_rss_mb,
+        "loop_lag_ms": _summary(lag.samples, scale=1000, digits=2),
+    }
+
+
+# ------------- Driver -------------
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout_s: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"stand-in server did not start on port {port}")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _worker_env(args: argparse.Namespace, port: int, workdir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        {
+            "TAVILY_API_KEY": "bench",
+            "TAVILY_SEARCH_URL": f"http://127.0.0.1:{port}/search",
+            "HF_API_KEY": "bench",
+            "HF_BASE_URL": f"http://127.0.0.1:{port}",
+            "SEARCH_CACHE_ENABLED": "false",
+            "LLM_CACHE_ENABLED": "false",
+            "MEMO_SNAPSHOTS_ENABLED": "false",
+            "MEMO_CACHE_ENABLED": "false",
+            "CHECKPOINT_PATH": os.path.join(workdir, "checkpoints.sqlite3"),
+        }
+    )
+    if not args.rate_limits:
+        env.update(
+            {
+                "TAVILY_RPS": "0",
+                "HF_RPS": "0",
+                "HF_TOKENS_PER_MIN": "0",
+                "TAVILY_MAX_CONCURRENCY": "100000",
+                "HF_MAX_CONCURRENCY": "100000",
+            }
+        )
+    return env
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="1,10,50,200", help="comma-separated concurrency levels")
+    parser.add_argument("--modes", default="graph,api", help="graph and/or api")
+    parser.add_argument(
+        "--generation-modes", default="per_section", help="per_section and/or combined (section generation)"
+    )
+    parser.add_argument("--memo-depths", default="standard", help="memo_depth tiers, e.g. brief,standard,detailed")
+    parser.add_argument("--runs", type=int, default=0, help="runs per level (default max(20, 2 x level))")
+    parser.add_argument("--search-latency-ms", type=float, default=150)
+    parser.add_argument("--llm-latency-ms", type=float, default=400)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--results", type=int, default=8)
+    parser.add_argument("--snippet-chars", type=int, default=1200)
+    parser.add_argument("--llm-tokens", type=int, default=180)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--bad-json-rate", type=float, default=0.0, help="malformed combined-section answers")
+    parser.add_argument("--rate-limits", action="store_true", help="keep provider rate limits")
+    parser.add_argument("--out", help="also write the JSON report here")
+    parser.add_argument(
+        "--worker", nargs=5, metavar=("MODE", "CONCURRENCY", "RUNS", "GENERATION", "DEPTH"), help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+
+    if args.worker:
+        mode, concurrency, runs, generation_mode, memo_depth = args.worker
+        print(json.dumps(asyncio.run(_worker(mode, int(concurrency), int(runs), generation_mode, memo_depth))))
+        return
+
+    stub_config = {
+        "STUB_SEARCH_LATENCY_MS": args.search_latency_ms,
+        "STUB_LLM_LATENCY_MS": args.llm_latency_ms,
+        "STUB_JITTER": args.jitter,
+        "STUB_RESULTS": args.results,
+        "STUB_SNIPPET_CHARS": args.snippet_chars,
+        "STUB_LLM_TOKENS": args.llm_tokens,
+        "STUB_ERROR_RATE": args.error_rate,
+        "STUB_BAD_JSON_RATE": args.bad_json_rate,
+    }
+    port = _free_port()
+    stub = subprocess.Popen(
+        [sys.executable, str(ROOT / "benchmarks" / "stub_servers.py"), str(port)],
+        env={**os.environ, **{k: str(v) for k, v in stub_config.items()}},
+    )
+    results: List[Dict[str, Any]] = []
+    try:
+        _wait_for_port(port)
+        with tempfile.TemporaryDirectory() as workdir:
+            env = _worker_env(args, port, workdir)
+            def split(value: str) -> List[str]:
+                return [v.strip() for v in value.split(",") if v.strip()]
+
+            grid = itertools.product(
+                split(args.modes), split(args.generation_modes), split(args.memo_depths), split(args.levels)
+            )
+            for mode, generation_mode, memo_depth, level in grid:
+                runs = args.runs or max(20, 2 * int(level))
+                label = f"{mode}/{generation_mode}/{memo_depth} x{level}"
+                print(f"[Bench] {label} ({runs} runs)...", file=sys.stderr)
+                proc = subprocess.run(
+                    [sys.executable, __file__, "--worker", mode, level, str(runs), generation_mode, memo_depth],
+                    cwd=workdir,
+                    env=env,
+                    capture_output=True,
+                    text=True,
+                )
+                if proc.returncode != 0:
+                    results.append(
+                        {
+                            "mode": mode,
+                            "generation_mode": generation_mode,
+                            "memo_depth": memo_depth,
+                            "concurrency": int(level),
+                            "failed": proc.stderr[-2000:],
+                        }
+                    )
+                    continue
+                results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "stand_ins": stub_config,
+        "rate_limits": args.rate_limits,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Local stand-ins for the Tavily search API and an OpenAI-compatible HF
+chat-completion endpoint, for offline benchmarks.
+
+Latency, payload size and error rate come from environment variables, so
+the benchmark driver can start one server per process:
+
+    STUB_SEARCH_LATENCY_MS   mean search latency (default 150)
+    STUB_LLM_LATENCY_MS      mean latency of a STUB_LLM_TOKENS-sized completion;
+                             scales with output length (default 400)
+    STUB_JITTER              +/- fraction applied to latencies (default 0.2)
+    STUB_RESULTS             results per search (default 8)
+    STUB_SNIPPET_CHARS       characters of content per result (default 1200)
+    STUB_RAW_CHARS           raw_content characters when requested (default 8000)
+    STUB_LLM_TOKENS          words per completion, capped by max_tokens (default 180)
+    STUB_ERROR_RATE          share of requests answered 429/500 (default 0)
+    STUB_BAD_JSON_RATE       share of combined-section answers that are not
+                             valid JSON (default 0)
+
+    python benchmarks/stub_servers.py [port]
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+SEARCH_LATENCY_MS = float(os.getenv("STUB_SEARCH_LATENCY_MS", "150"))
+LLM_LATENCY_MS = float(os.getenv("STUB_LLM_LATENCY_MS", "400"))
+JITTER = float(os.getenv("STUB_JITTER", "0.2"))
+RESULTS = int(os.getenv("STUB_RESULTS", "8"))
+SNIPPET_CHARS = int(os.getenv("STUB_SNIPPET_CHARS", "1200"))
+RAW_CHARS = int(os.getenv("STUB_RAW_CHARS", "8000"))
+LLM_TOKENS = int(os.getenv("STUB_LLM_TOKENS", "180"))
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+BAD_JSON_RATE = float(os.getenv("STUB_BAD_JSON_RATE", "0"))
+
+# Combined-section prompts (generation_mode="combined") ask for these keys
+_JSON_KEYS_RE = re.compile(r"JSON object with exactly these keys: ([\w, ]+)")
+
+WORDS = (
+    "firm capital partners fund growth strategy investors assets management "
+    "equity credit private markets team clients portfolio returns expansion "
+    "culture employees leadership founded office global billion"
+).split()
+
+app = FastAPI(title="Benchmark stand-ins")
+
+
+def _text(chars: int, rng: random.Random) -> str:
+    out, size = [], 0
+    while size < chars:
+        word = rng.choice(WORDS)
+        out.append(word)
+        size += len(word) + 1
+    return " ".join(out)[:chars]
+
+
+async def _delay(mean_ms: float) -> None:
+    if mean_ms > 0:
+        await asyncio.sleep(mean_ms * random.uniform(1 - JITTER, 1 + JITTER) / 1000)
+
+
+def _maybe_error():
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        if random.random() < 0.5:
+            return JSONResponse({"error": "rate limited"}, status_code=429, headers={"Retry-After": "0"})
+        return JSONResponse({"error": "upstream error"}, status_code=500)
+    return None
+
+
+@app.post("/search")
+async def search(request: Request):
+    body = await request.json()
+    await _delay(SEARCH_LATENCY_MS)
+    error = _maybe_error()
+    if error is not None:
+        return error
+
+    # Deterministic per query, so dedupe behaves like it would on real data
+    rng = random.Random(body.get("query", ""))
+    results = []
+    for i in range(min(RESULTS, int(body.get("max_results") or RESULTS))):
+        res = {
+            "title": f"Result {i}",
+            "url": f"https://stub.example/{uuid.UUID(int=rng.getrandbits(128))}",
+            "content": _text(SNIPPET_CHARS, rng),
+            "score": round(rng.random(), 4),
+            "published_date": "2025-01-15",
+        }
+        if body.get("include_raw_content"):
+            res["raw_content"] = _text(RAW_CHARS, rng)
+        results.append(res)
+    return {"query": body.get("query"), "results": results}
+
+
+def _completion_text(prompt: str = "", max_tokens: int = 0) -> str:
+    rng = random.Random()
+    match = _JSON_KEYS_RE.search(prompt)
+    keys = [key.strip() for key in match.group(1).split(",") if key.strip()] if match else []
+    # Roughly 4 characters per token, like the app's own estimates; a
+    # combined answer splits max_tokens across its sections
+    chars = LLM_TOKENS * 7
+    if max_tokens:
+        chars = min(chars, max_tokens * 4 // max(1, len(keys)))
+    if not keys:
+        return _text(chars, rng)
+    text = json.dumps({key: _text(chars, rng) for key in keys})
+    if BAD_JSON_RATE and rng.random() < BAD_JSON_RATE:
+        return text[: len(text) // 2]
+    return text
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    error = _maybe_error()
+    if error is not None:
+        await _delay(LLM_LATENCY_MS / 10)
+        return error
+
+    created = int(time.time())
+    prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages") or [])
+    if not body.get("stream"):
+        # Latency grows with output length, like a real decoder
+        text = _completion_text(prompt, int(body.get("max_tokens") or 0))
+        await _delay(LLM_LATENCY_MS * max(0.25, len(text) / (LLM_TOKENS * 7)))
+        return {
+            "id": uuid.uuid4().hex,
+            "object": "chat.completion",
+            "created": created,
+            "model": body.get("model") or "stub",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(text) // 4, "total_tokens": len(text) // 4},
+        }
+
+    async def events():
+        words = _completion_text(prompt, int(body.get("max_tokens") or 0)).split(" ")
+        per_word = LLM_LATENCY_MS / max(1, len(words))
+        for word in words:
+            await _delay(per_word)
+            chunk = {
+                "id": "stub",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body.get("model") or "stub",
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8900
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
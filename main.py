@@ -1,14 +1,71 @@
 # main.py
-from typing import Optional
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import sys
+import time
+import traceback
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
+from app.cancellation import cancellation_stats, record_cancellation, start_work_tracking
+from app.checkpoints import CHECKPOINTS_ENABLED, SqliteCheckpointer
+from app.deadline import start_deadline
+from app.evidence_store import get_store, pin_store, release_store
 from app.graph import build_graph
+from app.http_client import close_http_client, http_pool_stats, init_http_client
+from app.identity import identity_stats, resolve_identity
+from app.jobs import JobManager, QueueFullError
+from app.llm import llm_cache_stats
+from app.memo_cache import (
+    MEMO_CACHE_ENABLED,
+    claim_refresh,
+    count_bypass,
+    get_cached_memo,
+    is_stale,
+    memo_cache_key,
+    memo_cache_stats,
+    put_cached_memo,
+    release_refresh,
+)
+from app.metrics import DEBUG_TRACE_ENABLED, METRICS_ENABLED, render_metrics, start_trace
+from app.nodes.section_writer import section_token_budgets
+from app.plans import build_plan
+from app.ratelimit import rate_limit_stats
+from app.refresh import apply_snapshot, load_snapshot, memo_snapshot_stats
+from app.search_cache import search_cache_stats
 from app.state import ResearchState
+from app.tools import payload_stats, search_flight, start_payload_tracking
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled HTTP client for every search tool in this worker
+    await init_http_client()
+    if checkpointer is not None:
+        await asyncio.to_thread(checkpointer.collect_garbage)
+    await job_manager.start()
+    try:
+        yield
+    finally:
+        await job_manager.stop()
+        await close_http_client()
 
-app = FastAPI(title="Deep Research Agent")
+
+app = FastAPI(title="Deep Research Agent", lifespan=lifespan)
 
 # --- CORS so the frontend (localhost:5173) can call the API ---
 app.add_middleware(
@@ -22,8 +79,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Persistent checkpoints let a failed run resume from its last finished node
+checkpointer = SqliteCheckpointer() if CHECKPOINTS_ENABLED else None
+
 # Compile the LangGraph graph once at startup
-graph_app = build_graph()
+graph_app = build_graph(checkpointer=checkpointer)
 
 
 class ResearchRequest(BaseModel):
@@ -35,10 +95,36 @@ class ResearchRequest(BaseModel):
     # How detailed the memo should be
     memo_depth: str = "standard"  # e.g. "brief" | "detailed" | custom length tags
 
+    # Checkpoint key. Defaults to a hash of the fields above, so retrying a
+    # failed request resumes it instead of searching again.
+    run_id: Optional[str] = None
+
+    # Incremental refresh: reuse the last memo's evidence for topics still
+    # within their TTL and only regenerate sections whose evidence changed
+    refresh: bool = False
+
+    # "per_section" (one LLM call per section) | "combined" (several
+    # sections per JSON completion, falling back per section)
+    generation_mode: Literal["per_section", "combined"] = "per_section"
+
+    # Latency budget in seconds (default RESEARCH_DEADLINE_S). Searches and
+    # LLM calls still running at the deadline are cancelled; the memo is
+    # returned with caveats on the affected sections
+    deadline_s: Optional[float] = None
+
+    # Skip the memo cache and run the graph; the result still refreshes it
+    bypass_cache: bool = False
+
 
 class ResearchResponse(BaseModel):
     memo_depth: str
+    run_id: Optional[str] = None
     final_report_markdown: str
+    # Per-run counters (dedupe, payload bytes, ...) for observability
+    run_stats: Dict[str, Any] = {}
+    # Memo cache: status ("hit" | "stale" | "miss" | "bypass" | "off"),
+    # age_s of the memo and whether a background refresh is running
+    cache: Optional[Dict[str, Any]] = None
 
 
 @app.get("/")
@@ -46,46 +132,644 @@ async def root():
     return {"message": "Deep Research Agent is running. Go to /docs for API UI."}
 
 
-@app.post("/research", response_model=ResearchResponse)
-async def run_research(req: ResearchRequest):
+@app.get("/stats")
+async def stats():
+    # Runtime counters for sizing pools and caches
+    return {
+        "http": http_pool_stats(),
+        "search_cache": search_cache_stats(),
+        "search_singleflight": search_flight.snapshot(),
+        "llm_cache": llm_cache_stats(),
+        "search_payload": payload_stats(),
+        "jobs": job_manager.snapshot(),
+        "rate_limits": rate_limit_stats(),
+        "checkpoints": checkpointer.snapshot() if checkpointer is not None else None,
+        "memo_snapshots": memo_snapshot_stats(),
+        "memo_cache": memo_cache_stats(),
+        "company_aliases": identity_stats(),
+        "cancellations": cancellation_stats(),
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text exposition format
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+def _wants_trace(request: Request) -> bool:
+    if not (METRICS_ENABLED and DEBUG_TRACE_ENABLED):
+        return False
+    return request.headers.get("x-debug-trace", "").lower() in ("1", "true", "yes")
+
+
+def _initial_state(req: ResearchRequest, run_id: Optional[str] = None) -> ResearchState:
     # Build initial graph state – inject identity_basics directly
-    initial_state = ResearchState(
+    return ResearchState(
+        run_id=run_id or uuid.uuid4().hex,
         identity_basics={
             "name": req.company_name,
             "website": req.website or "N/A",
             "industry": req.industry or "N/A",
         },
         memo_depth=req.memo_depth,
+        generation_mode=req.generation_mode,
         ats_description="User-provided identity; no ATS/Bullhorn used.",
     )
 
-    try:
-        # LangGraph usually gives back a plain dict, not a ResearchState instance
-        final_state = await graph_app.ainvoke(initial_state)
-
-        # Normalize to a dict so we can safely access fields
-        if isinstance(final_state, ResearchState):
-            final_state_dict = final_state.model_dump()
-        elif isinstance(final_state, dict):
-            final_state_dict = final_state
-        else:
-            raise TypeError(
-                f"Unexpected graph result type: {type(final_state).__name__}"
-            )
 
-    except Exception as e:
-        import traceback
+async def _request_key(req: ResearchRequest) -> str:
+    # Normalized request identity, used to de-duplicate identical work and
+    # as the memo cache key; the company is its canonical key, so
+    # "BlackRock, Inc." and "blackrock" share runs and cached memos
+    identity = await resolve_identity(req.company_name, req.website)
+    return json.dumps(
+        [
+            identity["key"],
+            (req.industry or "").strip().lower(),
+            req.memo_depth.strip().lower(),
+            req.refresh,
+            req.generation_mode,
+        ]
+    )
+
+
+def _peak_rss_mb() -> Optional[float]:
+    # Process-wide high-water mark (ru_maxrss is KB on Linux, bytes on macOS)
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# Run ids executing in this worker right now, with the owner token of
+# their claim on the checkpoint thread
+_active_runs: Dict[str, str] = {}
+
+
+async def _claim_run(run_id: str) -> bool:
+    owner = uuid.uuid4().hex
+    if run_id in _active_runs:
+        return False
+    _active_runs[run_id] = owner
+    if checkpointer is not None and not await checkpointer.aclaim_run(run_id, owner):
+        # Another worker is running this thread right now
+        _active_runs.pop(run_id, None)
+        return False
+    return True
+
+
+async def _start_run(
+    req: ResearchRequest,
+) -> Tuple[Optional[ResearchState], Dict[str, Any], Dict[str, Any]]:
+    """
+    Graph input, config and run info for one run. If an earlier attempt
+    with the same run id failed, the graph input is None and the run
+    resumes from that attempt's last checkpoint. Otherwise a refresh
+    request starts from the company's last memo snapshot, if any.
+    """
+    run_id = req.run_id or hashlib.sha256((await _request_key(req)).encode("utf-8")).hexdigest()[:32]
+    if not await _claim_run(run_id):
+        # An identical request is running, here or in another worker;
+        # don't resume (or later delete) its thread
+        run_id = uuid.uuid4().hex
+        await _claim_run(run_id)
+    # Live until _finish_run, whatever other runs do to the store table
+    pin_store(run_id)
+    config: Dict[str, Any] = {"configurable": {"thread_id": run_id}}
+
+    if checkpointer is not None:
+        try:
+            snapshot = await graph_app.aget_state(config)
+            if snapshot.next:
+                print(f"[Checkpoints] Resuming run {run_id} at {list(snapshot.next)}.")
+                return None, config, {"run_id": run_id, "resumed": True, "resumed_at": list(snapshot.next)}
+            if snapshot.values:
+                await checkpointer.adelete_thread(run_id)
+        except Exception:
+            await _finish_run(run_id, False)
+            raise
+
+    # A fresh run: drop evidence left over from a finished thread
+    release_store(run_id)
+    pin_store(run_id)
+    state = _initial_state(req, run_id)
+    run_info: Dict[str, Any] = {"run_id": run_id, "resumed": False}
+
+    if req.refresh:
+        identity = await resolve_identity(req.company_name, req.website)
+        snapshot = await load_snapshot(identity["key"], state.memo_depth)
+        if snapshot is not None:
+            state.refresh_evidence, state.previous_drafts = apply_snapshot(snapshot, get_store(run_id))
+            run_info["snapshot_age_s"] = round(time.time() - snapshot["saved_at"], 1)
+
+    return state, config, run_info
+
+
+async def _finish_run(run_id: str, succeeded: bool) -> None:
+    owner = _active_runs.pop(run_id, None)
+    # Evidence rows only live in memory for the duration of the run; the
+    # checkpointer reloads them if a failed run is resumed
+    release_store(run_id)
+    if checkpointer is not None and owner is not None:
+        if succeeded:
+            # Checkpoints only exist to make retries cheap
+            await checkpointer.adelete_thread(run_id)
+        await checkpointer.arelease_run(run_id, owner)
+
+
+def _refresh_report(final_state: Dict[str, Any]) -> Dict[str, Any]:
+    previous = final_state.get("refresh_evidence") or {}
+    fetched_at = final_state.get("topic_fetched_at") or {}
+    reused = [node for node, prev in previous.items() if fetched_at.get(node) == prev["fetched_at"]]
+    sections = (final_state.get("run_stats") or {}).get("sections") or {}
+    return {
+        "reused_topics": reused,
+        "refetched_topics": [node for node in fetched_at if node not in reused],
+        "recomputed_sections": sections.get("recomputed", []),
+        "reused_sections": sections.get("reused", []),
+    }
 
+
+# ------------- Memo cache -------------
+
+# Background refreshes running in this worker, by cache key
+_memo_refreshes: Dict[str, "asyncio.Task[None]"] = {}
+
+
+async def _refresh_memo(req: ResearchRequest, key: str) -> None:
+    failed = True
+    try:
+        # Incremental: evidence still within its topic TTL is reused
+        fresh = req.model_copy(update={"refresh": True, "run_id": None, "deadline_s": None})
+        result = await _run_graph(fresh)
+        await put_cached_memo(key, result.model_dump(exclude={"cache"}))
+        failed = False
+    except Exception:
         traceback.print_exc()
-        raise HTTPException(
-            status_code=500,
-            detail=f"{type(e).__name__}: {e}",
+    finally:
+        await release_refresh(key, failed)
+        _memo_refreshes.pop(key, None)
+
+
+async def _start_memo_refresh(req: ResearchRequest, key: str) -> None:
+    # One refresh per memo: per worker here, across workers via the lease
+    if key in _memo_refreshes or not await claim_refresh(key):
+        return
+    print(f"[Memo cache] Refreshing stale memo for {req.company_name!r} in the background.")
+    # A fresh context: the refresh outlives the request and must not
+    # inherit its deadline, trace or work ledger
+    _memo_refreshes[key] = asyncio.create_task(_refresh_memo(req, key), context=contextvars.Context())
+
+
+def _cache_status(req: ResearchRequest) -> str:
+    if not MEMO_CACHE_ENABLED:
+        return "off"
+    return "bypass" if req.bypass_cache else "miss"
+
+
+async def _lookup_memo(req: ResearchRequest) -> Tuple[str, Optional[ResearchResponse]]:
+    """
+    Cache key and, if there is one, the cached memo. A stale memo is
+    returned at once and refreshed in the background.
+    """
+    key = memo_cache_key(await _request_key(req))
+    if req.bypass_cache:
+        count_bypass()
+        return key, None
+    cached = await get_cached_memo(key)
+    if cached is None:
+        return key, None
+    response, age = cached
+    stale = is_stale(age)
+    if stale:
+        await _start_memo_refresh(req, key)
+    cache = {"status": "stale" if stale else "hit", "age_s": round(age, 1), "refreshing": stale}
+    return key, ResearchResponse(**response, cache=cache)
+
+
+async def _execute_research(req: ResearchRequest) -> ResearchResponse:
+    key, cached = await _lookup_memo(req)
+    if cached is not None:
+        return cached
+    result = await _run_graph(req)
+    await put_cached_memo(key, result.model_dump(exclude={"cache"}))
+    result.cache = {"status": _cache_status(req), "age_s": 0.0, "refreshing": False}
+    return result
+
+
+async def _run_graph(req: ResearchRequest) -> ResearchResponse:
+    payload = start_payload_tracking()
+    start_deadline(req.deadline_s)
+    graph_input, config, run_info = await _start_run(req)
+    run_id = run_info["run_id"]
+
+    # LangGraph usually gives back a plain dict, not a ResearchState instance
+    succeeded = False
+    try:
+        final_state = await graph_app.ainvoke(graph_input, config=config)
+        succeeded = True
+    finally:
+        await _finish_run(run_id, succeeded)
+
+    # Normalize to a dict so we can safely access fields
+    if isinstance(final_state, ResearchState):
+        final_state_dict = final_state.model_dump()
+    elif isinstance(final_state, dict):
+        final_state_dict = final_state
+    else:
+        raise TypeError(
+            f"Unexpected graph result type: {type(final_state).__name__}"
         )
 
     # Pull the markdown out of the dict (default to empty string)
     markdown = final_state_dict.get("final_report_markdown") or ""
 
+    run_stats = dict(final_state_dict.get("run_stats") or {})
+    # Worker-wide high-water mark, not this run's own footprint
+    run_stats["search_payload"] = {**payload, "process_peak_rss_mb": _peak_rss_mb()}
+    snapshot_age_s = run_info.pop("snapshot_age_s", None)
+    run_stats["checkpoint"] = run_info
+    if req.refresh:
+        run_stats["refresh"] = {"snapshot_age_s": snapshot_age_s, **_refresh_report(final_state_dict)}
+
     return ResearchResponse(
         memo_depth=req.memo_depth,
+        run_id=run_id,
         final_report_markdown=markdown,
+        run_stats=run_stats,
+    )
+
+
+# ------------- Client disconnects -------------
+
+# Stop a run's searches and LLM calls once nobody is waiting for its memo
+CANCEL_ON_DISCONNECT = os.getenv("CANCEL_ON_DISCONNECT", "true").lower() in ("1", "true", "yes")
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # The body has been read, so the next ASGI message is the disconnect
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+def _report_cancellation(endpoint: str, req: ResearchRequest, work: Dict[str, Any]) -> None:
+    planned = section_token_budgets(build_plan(req.memo_depth))
+    unwritten = {key: tokens for key, tokens in planned.items() if key not in work["sections"]}
+    report = record_cancellation(endpoint, work, unwritten)
+    print(
+        f"[Cancel] {endpoint}: client disconnected for {req.company_name!r}; "
+        f"abandoned {report['abandoned']}, saved {report['saved']}."
+    )
+
+
+async def _until_disconnect(request: Request, req: ResearchRequest, endpoint: str, run: Any) -> Any:
+    """
+    Await the coroutine `run` unless the client disconnects first; then it
+    is cancelled (its pending HTTP requests and LLM calls with it) and
+    ClientDisconnected is raised.
+    """
+    if not CANCEL_ON_DISCONNECT:
+        return await run
+    work = start_work_tracking()
+    task = asyncio.ensure_future(run)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    if task not in done:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        _report_cancellation(endpoint, req, work)
+        raise ClientDisconnected()
+    return task.result()
+
+
+async def _events_until_disconnect(
+    request: Request, req: ResearchRequest, events: AsyncIterator[str]
+) -> AsyncIterator[str]:
+    """
+    Relay `events`, produced in a task of their own, until the client
+    disconnects; the graph run behind them is then cancelled. (The response
+    only notices a disconnect on its next write, which can be a long search
+    or LLM call away.)
+    """
+    if not CANCEL_ON_DISCONNECT:
+        async for event in events:
+            yield event
+        return
+    work = start_work_tracking()
+    queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+
+    async def pump() -> None:
+        try:
+            async for event in events:
+                queue.put_nowait(event)
+        finally:
+            queue.put_nowait(None)
+
+    producer = asyncio.ensure_future(pump())
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    getter: Optional["asyncio.Future[Optional[str]]"] = None
+    try:
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                return
+            event = getter.result()
+            if event is None:
+                return
+            yield event
+    finally:
+        watcher.cancel()
+        if getter is not None:
+            getter.cancel()
+        if not producer.done():
+            # Reported once the run has unwound; no awaiting here, since the
+            # response may itself be getting cancelled
+            producer.add_done_callback(lambda _task: _report_cancellation("stream", req, work))
+            producer.cancel()
+
+
+@app.post("/research", response_model=ResearchResponse)
+async def run_research(req: ResearchRequest, request: Request, response: Response):
+    spans = start_trace() if _wants_trace(request) else None
+    try:
+        result = await _until_disconnect(request, req, "research", _execute_research(req))
+        if spans is not None:
+            # Per-request timings (nodes, searches, LLM calls) for debugging
+            response.headers["X-Debug-Trace"] = json.dumps(spans, separators=(",", ":"))
+        if result.cache:
+            response.headers["X-Cache"] = result.cache["status"].upper()
+            if result.cache["status"] in ("hit", "stale"):
+                response.headers["Age"] = str(int(result.cache["age_s"]))
+        return result
+    except ClientDisconnected:
+        # Nobody is left to read it; 499 as in nginx's "client closed request"
+        return Response(status_code=499)
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"{type(e).__name__}: {e}",
+        )
+
+
+# ------------- Async jobs -------------
+
+job_manager = JobManager(
+    runner=_execute_research,
+    workers=int(os.getenv("JOB_WORKERS", "4")),
+    max_queue=int(os.getenv("JOB_QUEUE_DEPTH", "100")),
+    result_ttl_s=float(os.getenv("JOB_RESULT_TTL_S", "3600")),
+)
+
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str  # "queued" | "running" | "succeeded" | "failed"
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[ResearchResponse] = None
+    error: Optional[str] = None
+
+
+@app.post("/research/jobs", response_model=JobSubmitResponse, status_code=202)
+async def submit_research_job(req: ResearchRequest):
+    try:
+        job = job_manager.submit(await _request_key(req), req)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after_s)},
+        )
+    return JobSubmitResponse(job_id=job.id, status=job.status)
+
+
+@app.get("/research/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_research_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id")
+
+    return JobStatusResponse(
+        job_id=job.id,
+        status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        result=job.result,
+        error=job.error,
+    )
+
+
+# ------------- Streaming (SSE) -------------
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _evidence_counts(result: Dict[str, Any]) -> Dict[str, int]:
+    return {
+        field: len(value)
+        for field, value in result.items()
+        if (field.endswith("_data") or field == "curated_evidence") and isinstance(value, list)
+    }
+
+
+async def _research_events(req: ResearchRequest, trace: bool = False) -> AsyncIterator[str]:
+    # First bytes go out before any search or LLM call starts
+    yield _sse("run_started", {"company_name": req.company_name, "memo_depth": req.memo_depth})
+    spans = start_trace() if trace else None
+    start_deadline(req.deadline_s)
+
+    key, cached = await _lookup_memo(req)
+    if cached is not None:
+        yield _sse("cache", cached.cache)
+        yield _sse(
+            "final",
+            {"memo_depth": req.memo_depth, "final_report_markdown": cached.final_report_markdown},
+        )
+        return
+
+    final_markdown = ""
+    final_stats: Dict[str, Any] = {}
+    graph_input, config, run_info = await _start_run(req)
+    config["configurable"]["stream_tokens"] = True
+    if run_info["resumed"]:
+        yield _sse("run_resumed", run_info)
+
+    succeeded = False
+    try:
+        # subgraphs=True: with per-section scheduling the topic and section
+        # nodes run inside branch subgraphs
+        async for _namespace, mode, chunk in graph_app.astream(
+            graph_input,
+            config=config,
+            stream_mode=["tasks", "custom"],
+            subgraphs=True,
+        ):
+            if mode == "custom":
+                data = dict(chunk)
+                yield _sse(data.pop("event", "progress"), data)
+            elif "input" in chunk:
+                yield _sse("node_started", {"node": chunk["name"]})
+            else:
+                result = chunk.get("result") or {}
+                if isinstance(result, list):
+                    result = dict(result)
+
+                payload: Dict[str, Any] = {"node": chunk["name"]}
+                if chunk.get("error"):
+                    payload["error"] = str(chunk["error"])
+                counts = _evidence_counts(result)
+                if counts:
+                    payload["evidence_counts"] = counts
+                final_markdown = result.get("final_report_markdown") or final_markdown
+                if chunk["name"] == "qa_final":
+                    final_stats = result.get("run_stats") or {}
+
+                yield _sse("node_finished", payload)
+        succeeded = True
+    except Exception as e:
+        traceback.print_exc()
+        yield _sse("error", {"detail": f"{type(e).__name__}: {e}", "run_id": run_info["run_id"]})
+        return
+    finally:
+        await _finish_run(run_info["run_id"], succeeded)
+
+    # Cached with the memo's own run_stats (no payload or checkpoint info)
+    memo = ResearchResponse(
+        memo_depth=req.memo_depth,
+        run_id=run_info["run_id"],
+        final_report_markdown=final_markdown,
+        run_stats=final_stats,
+    )
+    await put_cached_memo(key, memo.model_dump(exclude={"cache"}))
+
+    if spans is not None:
+        yield _sse("trace", {"spans": spans})
+    yield _sse("cache", {"status": _cache_status(req), "age_s": 0.0, "refreshing": False})
+    yield _sse(
+        "final",
+        {"memo_depth": req.memo_depth, "final_report_markdown": final_markdown},
+    )
+
+
+@app.post("/research/stream")
+async def run_research_stream(req: ResearchRequest, request: Request):
+    """
+    Same pipeline as /research, streamed as server-sent events: node
+    start/finish, evidence counts per topic, section tokens, memo cache
+    status, final memo (plus a "trace" event when X-Debug-Trace is set).
+    A cached memo skips straight to the cache and final events.
+    """
+    return StreamingResponse(
+        _events_until_disconnect(request, req, _research_events(req, trace=_wants_trace(request))),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ------------- Batch research (NDJSON) -------------
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+# Shared by every batch in this worker, so two uploads can't double the load
+_batch_slots = asyncio.Semaphore(max(1, BATCH_CONCURRENCY))
+
+
+class BatchResearchRequest(BaseModel):
+    items: List[ResearchRequest]
+
+
+async def _run_batch_item(index: int, req: ResearchRequest) -> Dict[str, Any]:
+    async with _batch_slots:
+        started = time.perf_counter()
+        try:
+            result = await _execute_research(req)
+            line: Dict[str, Any] = {"status": "ok", "result": result.model_dump()}
+        except Exception as e:
+            traceback.print_exc()
+            line = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+
+    return {
+        "type": "result",
+        "index": index,
+        "company_name": req.company_name,
+        "elapsed_s": round(time.perf_counter() - started, 3),
+        **line,
+    }
+
+
+async def _batch_lines(items: List[ResearchRequest]) -> AsyncIterator[str]:
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(_run_batch_item(i, req)) for i, req in enumerate(items)]
+    succeeded = failed = 0
+
+    try:
+        # Emit each company as soon as it finishes, not in input order
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            if line["status"] == "ok":
+                succeeded += 1
+            else:
+                failed += 1
+            yield json.dumps(line) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    elapsed = time.perf_counter() - started
+    yield json.dumps(
+        {
+            "type": "summary",
+            "total": len(items),
+            "succeeded": succeeded,
+            "failed": failed,
+            "elapsed_s": round(elapsed, 3),
+            "companies_per_minute": round(len(items) / elapsed * 60, 2) if elapsed else 0.0,
+        }
+    ) + "\n"
+
+
+@app.post("/research/batch")
+async def run_research_batch(batch: BatchResearchRequest):
+    """
+    Research many companies in one call. Results stream back as NDJSON
+    lines as each company finishes; the last line is a throughput summary.
+    """
+    if not batch.items:
+        raise HTTPException(status_code=422, detail="Batch has no items")
+    if len(batch.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large ({len(batch.items)} > {BATCH_MAX_ITEMS} items)",
+        )
+
+    return StreamingResponse(
+        _batch_lines(batch.items),
+        media_type="application/x-ndjson",
     )
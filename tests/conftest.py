@@ -0,0 +1,21 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# Persistent caches off, and the SQLite files out of the working tree
+_tmp = tempfile.mkdtemp(prefix="deep-research-tests-")
+for name in ("SEARCH_CACHE", "LLM_CACHE", "MEMO_CACHE", "MEMO_SNAPSHOTS"):
+    os.environ[f"{name}_ENABLED"] = "false"
+for name, filename in (
+    ("COMPANY_ALIAS_PATH", "company_aliases.sqlite3"),
+    ("CHECKPOINT_PATH", "checkpoints.sqlite3"),
+    ("MEMO_CACHE_PATH", "memo_cache.sqlite3"),
+    ("MEMO_SNAPSHOT_PATH", "memo_snapshots.sqlite3"),
+    ("SEARCH_CACHE_PATH", "search_cache.sqlite3"),
+    ("LLM_CACHE_PATH", "llm_cache.sqlite3"),
+):
+    os.environ[name] = os.path.join(_tmp, filename)
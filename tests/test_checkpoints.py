@@ -0,0 +1,91 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.checkpoints import SqliteCheckpointer
+from app.state import ResearchState
+
+
+def _stub_search(monkeypatch, searches):
+    from app import tools
+
+    async def fake_fetch(key, query, topic, max_results, search_depth, include_raw_content):
+        searches.append(query)
+        results = [
+            {"url": f"https://example.com/{uuid.uuid5(uuid.NAMESPACE_URL, query)}/{i}", "content": f"{query} {i}"}
+            for i in range(3)
+        ]
+        return results, {"responses": 1, "bytes_received": 0, "results": len(results)}
+
+    monkeypatch.setattr(tools, "TAVILY_API_KEY", "test")
+    monkeypatch.setattr(tools, "_tavily_fetch", fake_fetch)
+
+
+def test_failed_run_resumes_without_rerunning_finished_nodes(monkeypatch, tmp_path):
+    from app import evidence_store
+    from app.graph import build_graph
+    from app.nodes import section_writer
+
+    searches = []
+    failing = {"on": True}
+
+    async def flaky_section(system_prompt, user_prompt, max_tokens=600, temperature=0.3, use_cache=True):
+        if failing["on"]:
+            raise RuntimeError("provider down")
+        return "Stub section text."
+
+    _stub_search(monkeypatch, searches)
+    monkeypatch.setattr(section_writer, "agenerate_section_with_hf", flaky_section)
+
+    path = str(tmp_path / "checkpoints.sqlite3")
+    run_id = uuid.uuid4().hex
+    config = {"configurable": {"thread_id": run_id}}
+    state = ResearchState(run_id=run_id, identity_basics={"name": "Acme", "website": "N/A", "industry": "N/A"})
+
+    try:
+        with pytest.raises(RuntimeError, match="provider down"):
+            asyncio.run(build_graph(checkpointer=SqliteCheckpointer(path)).ainvoke(state, config))
+        searched = list(searches)
+        assert searched
+        store = evidence_store.get_store(run_id)
+        rows = [(store.url[i], store.snippet[i]) for i in range(len(store))]
+
+        # A fresh process: new checkpointer, no evidence store in memory
+        evidence_store.release_store(run_id)
+        failing["on"] = False
+        checkpointer = SqliteCheckpointer(path)
+        final = asyncio.run(build_graph(checkpointer=checkpointer).ainvoke(None, config))
+
+        assert searches == searched
+        assert checkpointer.stats["restored_runs"] == 1
+        store = evidence_store.get_store(run_id)
+        assert [(store.url[i], store.snippet[i]) for i in range(len(rows))] == rows
+        ids = [i for name, value in final.items() if name.endswith("_data") for i in value]
+        ids += final["curated_evidence"]
+        assert ids and all(0 <= i < len(store) for i in ids)
+        assert "Stub section text." in final["final_report_markdown"]
+    finally:
+        evidence_store.release_store(run_id)
+
+
+def test_leased_run_cannot_be_claimed_by_another_worker(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite3")
+    first, second = SqliteCheckpointer(path), SqliteCheckpointer(path)
+
+    assert first.claim_run("run-1", "worker-a")
+    assert not second.claim_run("run-1", "worker-b")
+    # The holder may renew, and other threads are unaffected
+    assert first.claim_run("run-1", "worker-a")
+    assert second.claim_run("run-2", "worker-b")
+    assert second.stats["claims_refused"] == 1
+
+    first.release_run("run-1", "worker-a")
+    assert second.claim_run("run-1", "worker-b")
+    second.release_run("run-1", "worker-b")
+
+    # A crashed worker's claim lapses once its lease expires
+    assert first.claim_run("run-3", "worker-a", lease_s=-1)
+    assert second.claim_run("run-3", "worker-b")
+    assert not first.claim_run("run-3", "worker-a")
+
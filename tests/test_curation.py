@@ -0,0 +1,39 @@
+from app.evidence_store import EvidenceStore
+from app.nodes.curation import MAX_BUCKET_SIZE, _near_duplicate_groups, curate
+
+RELEASE = (
+    "Acme Capital today announced the final close of its fourth flagship fund at 2.5 billion dollars, "
+    "exceeding its target, with commitments from pension funds, endowments and sovereign wealth funds "
+    "across North America, Europe and Asia, the firm said in a statement on Monday."
+)
+
+
+def test_identical_copies_beyond_bucket_size_form_one_group():
+    copies = [RELEASE] * (MAX_BUCKET_SIZE + 8)
+    assert _near_duplicate_groups(copies) == [list(range(len(copies)))]
+
+
+def test_syndicated_copies_beyond_bucket_size_form_one_group():
+    copies = [f"NEW YORK, Wire {i} -- {RELEASE}" for i in range(MAX_BUCKET_SIZE + 8)]
+    assert len(_near_duplicate_groups(copies)) == 1
+
+
+def test_distinct_snippets_stay_apart():
+    snippets = [RELEASE, "Acme Capital's culture rewards long tenure and internal promotion of analysts."]
+    assert len(_near_duplicate_groups(snippets)) == 2
+
+
+def test_repeated_curation_reuses_merged_rows():
+    store = EvidenceStore()
+    ids = [
+        store.add("tavily", f"{RELEASE} ({i})", url=f"https://wire{i}.example", as_of=f"2024-01-0{i + 1}", score=0.1 * i)
+        for i in range(3)
+    ]
+    first, stats = curate(store, [ids])
+    rows = len(store)
+    assert len(first) == 1 and stats["near_duplicates_removed"] == 2
+
+    # Later sections see the same merged row and add nothing
+    assert curate(store, [ids])[0] == first
+    assert curate(store, [ids[:1]])[0] == first
+    assert len(store) == rows
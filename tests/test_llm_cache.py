@@ -0,0 +1,33 @@
+from collections import OrderedDict
+
+import pytest
+
+from app import llm
+from app.kv_store import SqliteKV
+
+
+@pytest.fixture
+def llm_caches(monkeypatch, tmp_path):
+    disk = SqliteKV(str(tmp_path / "llm_cache.sqlite3"), 1024 * 1024)
+    monkeypatch.setattr(llm, "_disk_cache", disk)
+    monkeypatch.setattr(llm, "_memory_cache", OrderedDict())
+    return disk
+
+
+@pytest.mark.parametrize("text", ["", "  \n\t", "[HF LLM ERROR] 503", "[HF LLM NOT CONFIGURED]"])
+def test_blank_and_sentinel_completions_are_not_cached(llm_caches, text):
+    llm._cache_put("k", text)
+    assert llm._cache_get_sync("k") == (None, "miss")
+    assert llm_caches.get("k") is None
+
+
+def test_completion_is_cached(llm_caches):
+    llm._cache_put("k", "Acme manages funds.")
+    assert llm._cache_get_sync("k") == ("Acme manages funds.", "memory")
+    llm._memory_cache.clear()
+    assert llm._cache_get_sync("k") == ("Acme manages funds.", "disk")
+
+
+def test_blank_completion_already_on_disk_is_a_miss(llm_caches):
+    llm_caches.put("k", " ")
+    assert llm._cache_get_sync("k") == (None, "miss")
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from app import memo_cache
+from app.kv_store import SqliteKV
+
+COMPLETE = {
+    "memo_depth": "standard",
+    "run_id": "r1",
+    "final_report_markdown": "# Company Research Memo: Acme\n\n## Overview\nAcme manages funds.\n",
+    "run_stats": {"timed_out": [], "sections": {"low_confidence": []}},
+}
+
+
+@pytest.fixture
+def memo_store(monkeypatch, tmp_path):
+    store = SqliteKV(str(tmp_path / "memo_cache.sqlite3"), 1024 * 1024)
+    monkeypatch.setattr(memo_cache, "MEMO_CACHE_ENABLED", True)
+    monkeypatch.setattr(memo_cache, "_store", store)
+    monkeypatch.setattr(memo_cache, "_stats", dict.fromkeys(memo_cache._stats, 0))
+    return store
+
+
+def _with(**changes):
+    response = {**COMPLETE, "run_stats": {**COMPLETE["run_stats"]}}
+    for field, value in changes.items():
+        if field in ("timed_out", "sections"):
+            response["run_stats"][field] = value
+        else:
+            response[field] = value
+    return response
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        _with(timed_out=[{"source": "tavily", "node": "aum"}]),
+        _with(sections={"low_confidence": ["aum"]}),
+        _with(final_report_markdown=COMPLETE["final_report_markdown"] + "[HF LLM error: 503]\n"),
+    ],
+    ids=["timed_out", "low_confidence", "sentinel"],
+)
+def test_incomplete_memos_are_not_stored(memo_store, response):
+    assert not memo_cache._cacheable(response)
+    asyncio.run(memo_cache.put_cached_memo("k", response))
+    assert asyncio.run(memo_cache.get_cached_memo("k")) is None
+    assert memo_cache._stats["skipped_incomplete"] == 1
+    assert memo_cache._stats["writes"] == 0
+
+
+def test_complete_memo_is_stored(memo_store):
+    asyncio.run(memo_cache.put_cached_memo("k", COMPLETE))
+    response, age = asyncio.run(memo_cache.get_cached_memo("k"))
+    assert response == COMPLETE
+    assert not memo_cache.is_stale(age)
+
+
+def test_stale_hit_returns_at_once_and_refreshes_once(memo_store, monkeypatch):
+    import main
+
+    monkeypatch.setattr(memo_cache, "MEMO_CACHE_TTL_S", 0.0)
+    req = main.ResearchRequest(company_name="Acme")
+    refreshed = {**COMPLETE, "final_report_markdown": COMPLETE["final_report_markdown"] + "Refreshed.\n"}
+
+    async def scenario():
+        gate = asyncio.Event()
+        runs = []
+
+        async def slow_run_graph(fresh):
+            runs.append(fresh)
+            await gate.wait()
+            return main.ResearchResponse(**refreshed)
+
+        monkeypatch.setattr(main, "_run_graph", slow_run_graph)
+        key = memo_cache.memo_cache_key(await main._request_key(req))
+        await memo_cache.put_cached_memo(key, COMPLETE)
+        await asyncio.sleep(0.01)
+
+        # Concurrent stale hits, then another worker that has no task here
+        hits = await asyncio.gather(*(main._execute_research(req) for _ in range(3)))
+        task = main._memo_refreshes[key]
+        main._memo_refreshes.clear()
+        hits.append(await main._execute_research(req))
+        main._memo_refreshes[key] = task
+        await asyncio.sleep(0.01)
+        assert not task.done()
+
+        gate.set()
+        await task
+        return key, hits, runs
+
+    key, hits, runs = asyncio.run(scenario())
+    for hit in hits:
+        assert hit.final_report_markdown == COMPLETE["final_report_markdown"]
+        assert hit.cache["status"] == "stale" and hit.cache["refreshing"]
+    assert len(runs) == 1 and runs[0].refresh and runs[0].run_id is None
+    assert memo_cache._stats["refreshes_started"] == 1
+    assert key not in main._memo_refreshes
+
+    response, _ = asyncio.run(memo_cache.get_cached_memo(key))
+    assert response["final_report_markdown"] == refreshed["final_report_markdown"]
+    # The lease was released with the refresh
+    assert memo_store.claim(f"refresh:{key}", 60)
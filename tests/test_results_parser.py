@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import pytest
+
+import app.tools as tools
+from app.tools import _ResultsParser, _read_results
+
+RESULTS = [
+    {"url": "https://example.com/a", "title": "Plain", "content": "Acme raised a fund.", "score": 0.9},
+    {"url": "https://example.com/b", "title": 'Quotes \\ "and" escapes', "content": 'He said "}]" twice \\'},
+    {"url": "https://example.com/c", "title": "Nested", "content": "{[x]}", "meta": {"tags": ["a", {"b": [1, 2]}]}},
+    {"url": "https://example.com/d", "title": "Unicode", "content": "Zürich – 東京 – é \U0001f4c8"},
+    {"url": "https://example.com/e", "title": None, "content": "", "raw_content": None, "score": 0},
+]
+BODY = json.dumps(
+    {
+        "query": "acme [results] {x}",
+        "answer": None,
+        "results": RESULTS,
+        "images": [{"url": "https://example.com/img"}],
+        "response_time": 1.2,
+    },
+    ensure_ascii=False,
+).encode("utf-8")
+
+
+def _chunks(body, size):
+    return [body[i : i + size] for i in range(0, len(body), size)]
+
+
+def _expected(body):
+    return [tools._trim_result(r) for r in json.loads(body)["results"]]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 4096, len(BODY)])
+def test_parser_matches_json_loads_at_any_chunk_boundary(size):
+    parser = _ResultsParser()
+    for chunk in _chunks(BODY, size):
+        parser.feed(chunk)
+        if parser.done:
+            break
+    assert parser.done
+    assert parser.results == _expected(BODY)
+
+
+def test_parser_trims_long_fields():
+    long_body = json.dumps({"results": [{"url": "u", "content": "word " * 1000}]}).encode()
+    parser = _ResultsParser()
+    for chunk in _chunks(long_body, 100):
+        parser.feed(chunk)
+    assert parser.results == _expected(long_body)
+    assert len(parser.results[0]["content"]) <= tools.SNIPPET_MAX_CHARS + 1
+
+
+def test_parser_without_results_array():
+    parser = _ResultsParser()
+    parser.feed(b'{"detail": {"error": "Unauthorized"}}')
+    assert parser.results == [] and not parser.done
+
+
+class _FakeResponse:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.sent = 0
+        self.closed = False
+
+    async def aiter_bytes(self):
+        try:
+            for chunk in self.chunks:
+                self.sent += 1
+                yield chunk
+        finally:
+            self.closed = True
+
+
+def test_read_results_keeps_parsed_results_past_the_size_limit(monkeypatch):
+    chunks = _chunks(BODY, 32)
+    # Cut off part-way through the third result
+    cut = BODY.index(b"https://example.com/c") + 10
+    monkeypatch.setattr(tools, "TAVILY_MAX_RESPONSE_BYTES", cut)
+    before = dict(tools._payload_stats)
+
+    resp = _FakeResponse(chunks)
+    results = asyncio.run(_read_results(resp, "news"))
+
+    assert results == _expected(BODY)[:2]
+    assert resp.closed and resp.sent < len(chunks)
+    assert tools._payload_stats["truncated_responses"] == before["truncated_responses"] + 1
+    assert tools._payload_stats["results"] == before["results"] + 2
+
+
+def test_read_results_stops_at_the_end_of_the_array():
+    padded = BODY + b" " * 10_000
+    resp = _FakeResponse(_chunks(padded, 256))
+    results = asyncio.run(_read_results(resp, "news"))
+    assert results == _expected(BODY)
+    assert resp.closed and resp.sent < len(resp.chunks)
@@ -0,0 +1,203 @@
+import asyncio
+import json
+
+import pytest
+
+import app.deadline as deadline
+import app.tools as tools
+from app.deadline import start_deadline, within_deadline
+from app.singleflight import SingleFlight
+
+
+async def _settle():
+    # Let every task started so far reach its first await
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight("test")
+        gate = asyncio.Event()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await gate.wait()
+            return ["result"]
+
+        waiters = [asyncio.ensure_future(flight.do("k", fetch)) for _ in range(5)]
+        await _settle()
+        gate.set()
+        results = await asyncio.gather(*waiters)
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results == [["result"]] * 5
+    assert flight.snapshot() == {"executions": 1, "requests_saved": 4, "in_flight": 0}
+
+
+def test_leader_exception_reaches_every_waiter():
+    async def scenario():
+        flight = SingleFlight("test")
+        gate = asyncio.Event()
+
+        async def fetch():
+            await gate.wait()
+            raise RuntimeError("upstream down")
+
+        waiters = [asyncio.ensure_future(flight.do("k", fetch)) for _ in range(3)]
+        await _settle()
+        gate.set()
+        return flight, await asyncio.gather(*waiters, return_exceptions=True)
+
+    flight, outcomes = asyncio.run(scenario())
+    assert [type(o) for o in outcomes] == [RuntimeError] * 3
+    assert flight.in_flight() == 0
+
+
+def test_cancelled_shared_fetch_reaches_every_waiter():
+    async def scenario():
+        flight = SingleFlight("test")
+        started = asyncio.Event()
+
+        async def fetch():
+            started.set()
+            await asyncio.sleep(10)
+
+        waiters = [asyncio.ensure_future(flight.do("k", fetch)) for _ in range(3)]
+        await started.wait()
+        flight._calls["k"].task.cancel()
+        return flight, await asyncio.gather(*waiters, return_exceptions=True)
+
+    flight, outcomes = asyncio.run(scenario())
+    assert all(isinstance(o, asyncio.CancelledError) for o in outcomes)
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.parametrize("cancelled", [0, 1], ids=["leader", "follower"])
+def test_cancelled_caller_does_not_cancel_shared_fetch(cancelled):
+    async def scenario():
+        flight = SingleFlight("test")
+        gate = asyncio.Event()
+        finished = []
+
+        async def fetch():
+            await gate.wait()
+            finished.append(1)
+            return "result"
+
+        waiters = [asyncio.ensure_future(flight.do("k", fetch)) for _ in range(2)]
+        await _settle()
+        waiters[cancelled].cancel()
+        await _settle()
+        gate.set()
+        return finished, await asyncio.gather(*waiters, return_exceptions=True)
+
+    finished, outcomes = asyncio.run(scenario())
+    assert finished == [1]
+    assert isinstance(outcomes[cancelled], asyncio.CancelledError)
+    assert outcomes[1 - cancelled] == "result"
+
+
+def test_last_waiter_leaving_cancels_shared_fetch():
+    async def scenario():
+        flight = SingleFlight("test")
+        cancelled = []
+
+        async def fetch():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        waiters = [asyncio.ensure_future(flight.do("k", fetch)) for _ in range(2)]
+        await _settle()
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await _settle()
+        return flight, cancelled
+
+    flight, cancelled = asyncio.run(scenario())
+    assert cancelled == [1]
+    assert flight.in_flight() == 0
+
+
+# ------------- coalesced Tavily searches -------------
+
+RESULTS = [{"url": f"https://example.com/{i}", "content": f"result {i}"} for i in range(3)]
+BODY = json.dumps({"query": "q", "results": RESULTS}).encode()
+
+
+class _FakeResponse:
+    async def aiter_bytes(self):
+        for i in range(0, len(BODY), 64):
+            yield BODY[i : i + 64]
+
+
+def _stub_upstream(monkeypatch, gate):
+    calls = []
+
+    async def fake_post(url, payload, headers, final_attempt):
+        calls.append(payload["query"])
+        await gate.wait()
+        return 200, None, await tools._read_results(_FakeResponse(), payload["topic"])
+
+    monkeypatch.setattr(tools, "TAVILY_API_KEY", "test-key")
+    monkeypatch.setattr(tools, "_post_search", fake_post)
+    return calls
+
+
+def test_coalesced_search_is_credited_to_every_run(monkeypatch):
+    gate = asyncio.Event()
+    calls = _stub_upstream(monkeypatch, gate)
+
+    async def run():
+        payload = tools.start_payload_tracking()
+        results = await tools._tavily_search("acme funding", "news")
+        return payload, results
+
+    async def scenario():
+        runs = [asyncio.ensure_future(run()) for _ in range(3)]
+        await _settle()
+        gate.set()
+        return await asyncio.gather(*runs)
+
+    outcomes = asyncio.run(scenario())
+    assert calls == ["acme funding"]
+    for payload, results in outcomes:
+        assert [r["url"] for r in results] == [r["url"] for r in RESULTS]
+        assert payload == {"responses": 1, "bytes_received": len(BODY), "results": len(RESULTS)}
+
+
+def test_follower_deadline_times_out_only_that_run(monkeypatch):
+    gate = asyncio.Event()
+    calls = _stub_upstream(monkeypatch, gate)
+    monkeypatch.setattr(deadline, "DEADLINE_RESERVE_S", 0.0)
+    monkeypatch.setattr(deadline, "DEADLINE_SEARCH_SHARE", 1.0)
+
+    async def run(budget_s):
+        start_deadline(budget_s)
+        payload = tools.start_payload_tracking()
+        timed_out = []
+        results = await within_deadline(tools._tavily_search("acme funding", "news"), [], timed_out, kind="search")
+        return payload, results, timed_out
+
+    async def scenario():
+        patient = asyncio.ensure_future(run(None))
+        await _settle()
+        hurried = asyncio.ensure_future(run(0.05))
+        _, _, timed_out = await hurried
+        assert timed_out == [{"kind": "search"}]
+        gate.set()
+        return await patient, await hurried
+
+    (payload, results, timed_out), (hurried_payload, hurried_results, _) = asyncio.run(scenario())
+    assert calls == ["acme funding"]
+    assert len(results) == len(RESULTS) and timed_out == []
+    assert hurried_results == []
+    assert hurried_payload["bytes_received"] == 0
+    assert payload["bytes_received"] == len(BODY)
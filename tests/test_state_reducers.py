@@ -0,0 +1,101 @@
+import asyncio
+import uuid
+from collections import Counter
+
+from app.state import DiscrepancyFlag, ResearchState, extend_list
+
+
+def test_extend_list_appends_only_new_ids():
+    assert extend_list([1, 2], [2, 3]) == [1, 2, 3]
+    assert extend_list([], [4, 4, 5]) == [4, 5]
+    assert extend_list([1], []) == [1]
+
+
+def test_replayed_delta_leaves_list_unchanged():
+    merged = extend_list([0, 1], [2, 3])
+    assert extend_list(merged, [2, 3]) == [0, 1, 2, 3]
+    # A replay interleaved with a new delta only adds the new ids
+    assert extend_list(extend_list(merged, [3, 4]), [2, 3, 4]) == [0, 1, 2, 3, 4]
+
+    flag = DiscrepancyFlag(section_key="aum", field="aum", message="m", severity="low")
+    flags = extend_list([], [flag])
+    assert extend_list(flags, [flag.model_copy()]) == [flag]
+
+
+def test_extend_list_keeps_repeated_items_within_an_update():
+    timed_out = [{"source": "tavily", "node": "aum"}, {"source": "tavily", "node": "aum"}]
+    assert extend_list([], timed_out) == timed_out
+    assert extend_list(timed_out, timed_out) == timed_out
+
+
+def _stub_search(monkeypatch):
+    from app import tools
+
+    async def fake_fetch(key, query, topic, max_results, search_depth, include_raw_content):
+        # The last result is the same page for every search
+        results = [
+            {"url": f"https://example.com/{uuid.uuid5(uuid.NAMESPACE_URL, query)}/{i}", "content": f"{query} {i}"}
+            for i in range(3)
+        ]
+        results.append({"url": "https://example.com/about", "content": "About Acme"})
+        return results, {"responses": 1, "bytes_received": 0, "results": len(results)}
+
+    monkeypatch.setattr(tools, "TAVILY_API_KEY", "test")
+    monkeypatch.setattr(tools, "_tavily_fetch", fake_fetch)
+
+
+def test_replayed_node_update_adds_no_evidence(monkeypatch):
+    from app.evidence_store import get_store, release_store
+    from app.nodes.fundamentals import fundamentals_node
+    from app.plans import build_plan
+
+    _stub_search(monkeypatch)
+    state = ResearchState(run_id=uuid.uuid4().hex, identity_basics={"name": "Acme"}, plan=build_plan("standard"))
+    try:
+        first = asyncio.run(fundamentals_node(state))
+        replay = asyncio.run(fundamentals_node(state))
+        assert first["fundamentals_data"] == [0, 1, 2, 3]
+        assert first["positioning_data"] == [4, 5, 6, 7]
+        # Same content, same store rows, so the replayed delta merges to nothing new
+        assert replay["fundamentals_data"] == first["fundamentals_data"]
+        merged = extend_list(first["fundamentals_data"], replay["fundamentals_data"])
+        assert merged == [0, 1, 2, 3]
+        assert len(get_store(state.run_id)) == 8
+    finally:
+        release_store(state.run_id)
+
+
+def test_stubbed_run_has_no_duplicated_evidence(monkeypatch):
+    from app.evidence_store import get_store, release_store
+    from app.graph import build_graph
+    from app.nodes import section_writer
+
+    async def fake_section(system_prompt, user_prompt, max_tokens=600, temperature=0.3, use_cache=True):
+        return "Stub section text."
+
+    _stub_search(monkeypatch)
+    monkeypatch.setattr(section_writer, "agenerate_section_with_hf", fake_section)
+
+    state = ResearchState(
+        run_id=uuid.uuid4().hex,
+        identity_basics={"name": "Acme", "website": "N/A", "industry": "N/A"},
+    )
+    try:
+        final = asyncio.run(build_graph().ainvoke(state))
+        store = get_store(state.run_id)
+
+        # Six searches of four results each, every row merged in exactly once
+        populated = {name: ids for name, ids in final.items() if name.endswith("_data") and ids}
+        assert len(populated) == 6
+        assert all(len(ids) == 4 for ids in populated.values()), populated
+        assert sorted(i for ids in populated.values() for i in ids) == list(range(24))
+        assert len(store) == 24
+
+        curated = final["curated_evidence"]
+        assert len(curated) == len(set(curated))
+        assert set(curated) <= set(range(24))
+
+        rows = Counter((store.topic(i), store.url[i], store.snippet[i]) for i in range(len(store)))
+        assert all(count == 1 for count in rows.values())
+    finally:
+        release_store(state.run_id)